@@ -1,5 +1,3 @@
-import os
-
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_openapi3.models.info import Info
@@ -8,20 +6,33 @@ from flask_openapi3.types import SecuritySchemesDict
 
 
 def create_app():
-    """Create a new Flask application instance"""
+    """Create a new Flask application instance.
+
+    No database work happens here, the schema and seed data are the bootstrap command's
+    job (scripts/bootstrap.py), run once before the server starts.
+    """
+
+    from app.utils.startup import StartupTimer
+
+    timer = StartupTimer()
 
     from app.config import get_config
-    from app.database import init_db
     from app.middlewares.auto_refresh import auto_refresh_expiring_tokens
+    from app.middlewares.compression import compress_response
     from app.middlewares.exceptions import register_error_handlers
+    from app.middlewares.unit_of_work import close_request_session, commit_request_session
     from app.routes.auth_routes import auth_router
     from app.routes.healthcheck_routes import healthcheck_router
     from app.routes.post_routes import posts_router
     from app.routes.user_routes import users_router
+    from app.utils.json_provider import PydanticJSONProvider
     from app.utils.logging import configure_logging
+    from app.utils.query_cache import install_query_cache
     from app.utils.response import validation_error_response
-    from scripts.seed_default_admin import seed_default_admin_if_needed
-    from scripts.seed_fake_data import seed_fake_data_if_needed
+    from app.utils.shared_json import install_shared_cores
+    from app.utils.user_cards import install_user_cards
+
+    timer.step("imports")
 
     config = get_config()
 
@@ -59,7 +70,11 @@ def create_app():
 
     app.config.from_object(config)
 
+    # Encode responses (UUID and datetime heavy lists) with pydantic-core instead of stdlib json
+    app.json = PydanticJSONProvider(app)
+
     configure_logging(app)
+    timer.step("app")
 
     # Initialize extensions
     CORS(app)
@@ -68,23 +83,33 @@ def create_app():
     # Initialize error handlers
     register_error_handlers(app)
 
+    # Cache the results of the opted in read paths, when a backend is configured
+    install_query_cache()
+
+    # Share the serialized cores of posts and profiles between their viewers
+    install_shared_cores(config.CORE_CACHE_ENTRIES)
+
+    # Share the cards of looked up users with the workers forked from this process
+    install_user_cards()
+    timer.step("extensions")
+
     # Initialize middlewares
+    # after_request functions run in reverse order: compression is registered first so it
+    # runs last, once the other middlewares are done with the response
+    app.after_request(compress_response)
     app.after_request(auto_refresh_expiring_tokens)
+    # Registered last to run first: the connection is back in the pool before the
+    # response is compressed and sent
+    app.after_request(commit_request_session)
+    app.teardown_request(close_request_session)
 
     # Initialize routes
     app.register_api(auth_router)
     app.register_api(healthcheck_router)
     app.register_api(posts_router)
     app.register_api(users_router)
+    timer.step("routes")
 
-    if os.getenv("SKIP_DB_INIT", "").lower() not in ("1", "true", "yes"):
-        # Initialize database
-        init_db()
-
-        # Seed fake data if seeding is enabled in environment variables
-        seed_fake_data_if_needed()
-
-        # Seed default admin user if needed
-        seed_default_admin_if_needed()
+    app.extensions["startup"] = timer.finish(config.STARTUP_BUDGET_MS)
 
     return app
@@ -40,6 +40,106 @@ class Config:
     JWT_COOKIE_DOMAIN = os.getenv("JWT_COOKIE_DOMAIN")
     JWT_ERROR_MESSAGE_KEY = "message"
 
+    # Database Config
+    # Connections kept open per worker process, sized to its threads (GUNICORN_THREADS)
+    # plus the requests streaming a response
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    # Extra connections opened under load, closed once checked in
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    # Seconds a request waits for a connection before failing
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    # Seconds after which a connection is replaced, before servers or proxies drop it
+    # (-1 keeps connections forever)
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # How checked out connections are known to be alive: "pre_ping" pings on every
+    # checkout (a round trip each), "idle" only pings connections idle for longer than
+    # DB_POOL_PING_IDLE seconds, "none" relies on the recycle and on disconnect errors
+    DB_POOL_LIVENESS = os.getenv("DB_POOL_LIVENESS", "idle")
+    DB_POOL_PING_IDLE = float(os.getenv("DB_POOL_PING_IDLE", "30"))
+    # Connections each server worker opens when it starts, so its first requests don't
+    # wait for connection setup (one per thread by default)
+    DB_POOL_WARM = int(os.getenv("DB_POOL_WARM", os.getenv("GUNICORN_THREADS", "2")))
+    # Compiled SQL statements kept by the engine (SQLAlchemy query_cache_size). Hot
+    # statements are built once with bound parameters, so they all fit
+    SQL_COMPILED_CACHE_SIZE = int(os.getenv("SQL_COMPILED_CACHE_SIZE", "1200"))
+
+    # Replica Config
+    # The heavy reads of GET requests (feed, search, follow lists) go to the replica at
+    # DATABASE_REPLICA_URL when it is set, writes always go to the primary. After a write,
+    # a client reads from the primary until the replica has replayed it, for at most this
+    # many seconds (the replica lag tolerated past it)
+    DB_READ_YOUR_WRITES_WINDOW = int(os.getenv("DB_READ_YOUR_WRITES_WINDOW", "10"))
+
+    # Feed Config
+    # "timeline" reads the materialized home timelines, "lateral" merges the top posts of
+    # each followed author at read time
+    FEED_ENGINE = os.getenv("FEED_ENGINE", "timeline")
+    # Authors with more followers than this are not fanned out on write, their posts are
+    # pulled into followers' feeds at read time instead
+    FEED_FANOUT_MAX_FOLLOWERS = int(os.getenv("FEED_FANOUT_MAX_FOLLOWERS", "10000"))
+    # Number of recent posts copied into a timeline when following someone
+    FEED_BACKFILL_POSTS = int(os.getenv("FEED_BACKFILL_POSTS", "100"))
+
+    # Streaming Config
+    # List pages at least this large are streamed as chunked JSON from a server-side cursor
+    STREAM_MIN_ITEMS_PER_PAGE = int(os.getenv("STREAM_MIN_ITEMS_PER_PAGE", "500"))
+    # Rows fetched from the server-side cursor (and encoded) at a time
+    STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+
+    # Compression Config
+    # Responses smaller than this (in bytes) are sent uncompressed. br and zstd are only
+    # offered when the brotli/zstandard packages are installed
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    # Number of compressed bodies kept to serve identical responses again
+    COMPRESSION_CACHE_ENTRIES = int(os.getenv("COMPRESSION_CACHE_ENTRIES", "64"))
+
+    # Shared Cores Config
+    # Number of serialized viewer-independent post/user cores reused across viewers,
+    # 0 serializes every response whole
+    CORE_CACHE_ENTRIES = int(os.getenv("CORE_CACHE_ENTRIES", "10000"))
+
+    # User Cards Config
+    # Compact cards of the users looked up by username, shared by the workers of a node in
+    # shared memory. Without a path, an unlinked file inherited by the workers forked once
+    # the app is created (gunicorn --preload), else a file every process maps
+    USER_CARDS_PATH = os.getenv("USER_CARDS_PATH", "")
+    # Number of card slots, 0 disables the cards
+    USER_CARDS_SLOTS = int(os.getenv("USER_CARDS_SLOTS", "16384"))
+    # Seconds a card is trusted, bounds staleness of writes made on other nodes
+    USER_CARDS_TTL = float(os.getenv("USER_CARDS_TTL", "60"))
+
+    # Micro Cache Config
+    # Seconds hot GET routes reuse their viewer-independent data, as "route=seconds" pairs
+    # (user_detail). Unlisted routes keep nothing, concurrent identical requests still wait
+    # on a single computation
+    MICROCACHE_TTLS = {
+        route.strip(): float(ttl)
+        for route, ttl in (
+            pair.split("=")
+            for pair in os.getenv("MICROCACHE_TTLS", "user_detail=1").split(",")
+            if pair.strip()
+        )
+    }
+    # Number of keys kept per route
+    MICROCACHE_MAX_ENTRIES = int(os.getenv("MICROCACHE_MAX_ENTRIES", "1024"))
+
+    # Query Cache Config
+    # "memory" caches the results of the opted in read paths per process, "network" in a
+    # Redis compatible server shared by every worker (needs the redis package), anything
+    # else disables the cache. Writes invalidate them through per-table versions
+    QUERY_CACHE_BACKEND = os.getenv("QUERY_CACHE_BACKEND", "")
+    QUERY_CACHE_URL = os.getenv("QUERY_CACHE_URL", "redis://localhost:6379/0")
+    # Seconds a result is kept, also bounds staleness across workers of the memory backend
+    QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "60"))
+    QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "10000"))
+    # Results larger than this (pickled, in bytes) are not cached
+    QUERY_CACHE_MAX_RESULT_SIZE = int(os.getenv("QUERY_CACHE_MAX_RESULT_SIZE", "262144"))
+
+    # Startup Config
+    # Milliseconds create_app() may take before a warning is logged (0 never warns). Each
+    # gunicorn worker creating the app pays it on every cold start
+    STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "2000"))
+
     # Swagger Config
     SWAGGER_CONFIG = {
         "docExpansion": "list",
@@ -57,6 +157,7 @@ class ProductionConfig(Config):
     JWT_COOKIE_HTTPONLY = True
     JWT_COOKIE_CSRF_PROTECT = True
     DATABASE_URL = os.getenv("DATABASE_URL")
+    DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
 
 
@@ -69,6 +170,7 @@ class DevelopmentConfig(Config):
     JWT_COOKIE_HTTPONLY = True
     JWT_COOKIE_CSRF_PROTECT = True
     DATABASE_URL = os.getenv("DATABASE_URL")
+    DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
 
 
@@ -81,6 +183,7 @@ class TestingConfig(Config):
     JWT_COOKIE_HTTPONLY = True
     JWT_COOKIE_CSRF_PROTECT = False  # Disable CSRF for easier testing
     DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+    DATABASE_REPLICA_URL = os.getenv("TEST_DATABASE_REPLICA_URL")
     SQLALCHEMY_DATABASE_URI = os.getenv("TEST_DATABASE_URL")
 
 
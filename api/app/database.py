@@ -1,29 +1,457 @@
+import inspect
+import re
+import time
+from bisect import bisect_left
+from collections import Counter
 from contextlib import contextmanager
+from functools import wraps
+from threading import Lock
+from typing import Any, Callable, Generator, TypeVar, cast
 
-from sqlmodel import Session, SQLModel, create_engine
+from flask import g, has_request_context, request
+from sqlalchemy import Engine, event, exc
+from sqlalchemy.orm import ORMExecuteState
+from sqlalchemy.orm import Session as SqlAlchemySession
+from sqlalchemy.pool import QueuePool
+from sqlmodel import Session, SQLModel, create_engine, text
 
 from app.config import get_config
 
 config = get_config()
 
-_engine = None
+_engines: dict[str, Engine] = {}
+_read_only_engines: dict[str, Engine] = {}
 
+# Executed statements by compiled cache outcome (CACHE_HIT, CACHE_MISS, NO_CACHE_KEY...)
+_compiled_cache_stats: Counter[str] = Counter()
 
-def get_engine():
-    """Get the engine for the database"""
-    global _engine
-    if _engine is None:
-        _engine = create_engine(config.DATABASE_URL, echo=False, pool_pre_ping=True)
-    return _engine
+
+def _count_compiled_cache(
+    conn: Any, cursor: Any, statement: Any, parameters: Any, context: Any, executemany: bool
+) -> None:
+    if context is not None:
+        _compiled_cache_stats[context.cache_hit.name] += 1
+
+
+# Upper bounds (seconds) of the checkout wait and hold histogram buckets, the last one is
+# unbounded
+_DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# Methods whose requests only read, their transactions are READ ONLY
+_READ_ONLY_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Session.info keys of the callbacks to run once the request's writes are committed and of
+# whether the request wrote anything
+_AFTER_COMMIT = "after_commit_callbacks"
+_WROTE = "wrote"
+
+# Cookie of the primary LSN of a client's last write, kept DB_READ_YOUR_WRITES_WINDOW
+READ_YOUR_WRITES_COOKIE = "db_lsn"
+# LSNs as pg_current_wal_lsn() prints them
+_LSN = re.compile(r"^[0-9A-F]{1,8}/[0-9A-F]{1,8}$")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class PoolStats:
+    """Counters of the connection pool, for monitoring and tuning its size"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.pings = 0
+            self.failed_pings = 0
+            self.wait_time = 0.0
+            self.wait_histogram = [0] * (len(_DURATION_BUCKETS) + 1)
+            self.hold_time = 0.0
+            self.hold_histogram = [0] * (len(_DURATION_BUCKETS) + 1)
+
+    def record_wait(self, seconds: float, timed_out: bool) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_time += seconds
+            self.wait_histogram[bisect_left(_DURATION_BUCKETS, seconds)] += 1
+
+    def record_hold(self, seconds: float) -> None:
+        with self._lock:
+            self.hold_time += seconds
+            self.hold_histogram[bisect_left(_DURATION_BUCKETS, seconds)] += 1
+
+    def increment(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self) -> dict[str, Any]:
+        with self._lock:
+            labels = [f"le_{bound * 1000:g}ms" for bound in _DURATION_BUCKETS] + ["inf"]
+            return {
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "pings": self.pings,
+                "failed_pings": self.failed_pings,
+                "wait_time": self.wait_time,
+                "wait_histogram": dict(zip(labels, self.wait_histogram, strict=True)),
+                "hold_time": self.hold_time,
+                "hold_histogram": dict(zip(labels, self.hold_histogram, strict=True)),
+            }
+
+
+pool_stats = PoolStats()
+
+
+class _TimedQueuePool(QueuePool):
+    """QueuePool recording how long checkouts wait for a connection"""
+
+    def _do_get(self) -> Any:
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_stats.record_wait(time.perf_counter() - start, timed_out=False)
+        return connection
+
+
+def _on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+    pool_stats.increment("connects")
+
+
+def _on_checkout(dbapi_connection: Any, connection_record: Any, connection_proxy: Any) -> None:
+    connection_record.info["checked_out_at"] = time.monotonic()
+
+
+def _on_checkin(dbapi_connection: Any, connection_record: Any) -> None:
+    if connection_record is not None:
+        now = time.monotonic()
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            pool_stats.record_hold(now - checked_out_at)
+        connection_record.info["checked_in_at"] = now
+
+
+def _on_invalidate(dbapi_connection: Any, connection_record: Any, exception: Any) -> None:
+    pool_stats.increment("invalidations")
+
+
+def _ping_idle_connection(
+    dbapi_connection: Any, connection_record: Any, connection_proxy: Any
+) -> None:
+    """Ping connections idle for longer than DB_POOL_PING_IDLE, only those can be stale"""
+    checked_in_at = connection_record.info.get("checked_in_at")
+    if checked_in_at is None or time.monotonic() - checked_in_at < config.DB_POOL_PING_IDLE:
+        return
+
+    pool_stats.increment("pings")
+    try:
+        get_engine().dialect.do_ping(dbapi_connection)
+    except Exception as error:
+        pool_stats.increment("failed_pings")
+        # The pool discards the connection and checks out another one
+        raise exc.DisconnectionError() from error
+
+
+def _create_engine(url: str | None) -> Engine:
+    engine = create_engine(
+        url,  # pyright: ignore[reportArgumentType]
+        echo=False,
+        poolclass=_TimedQueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_LIVENESS == "pre_ping",
+        query_cache_size=config.SQL_COMPILED_CACHE_SIZE,
+    )
+    event.listen(engine, "after_cursor_execute", _count_compiled_cache)
+    event.listen(engine.pool, "connect", _on_connect)
+    event.listen(engine.pool, "checkout", _on_checkout)
+    event.listen(engine.pool, "checkin", _on_checkin)
+    event.listen(engine.pool, "invalidate", _on_invalidate)
+    event.listen(engine.pool, "soft_invalidate", _on_invalidate)
+    if config.DB_POOL_LIVENESS == "idle":
+        event.listen(engine.pool, "checkout", _ping_idle_connection)
+    return engine
+
+
+def get_engine(name: str = "primary") -> Engine:
+    """Get a named engine: "primary", or "replica" (the primary without a replica URL)"""
+    engine = _engines.get(name)
+    if engine is None:
+        if name == "primary":
+            engine = _create_engine(config.DATABASE_URL)
+        elif name == "replica":
+            engine = (
+                _create_engine(config.DATABASE_REPLICA_URL)
+                if config.DATABASE_REPLICA_URL
+                else get_engine()
+            )
+        else:
+            raise ValueError(f"Unknown database engine: {name}")
+        _engines[name] = engine
+    return engine
+
+
+def set_engine(name: str, engine: Engine | None) -> None:
+    """Replace a named engine, None goes back to the configured one"""
+    _read_only_engines.pop(name, None)
+    if engine is None:
+        _engines.pop(name, None)
+    else:
+        _engines[name] = engine
+
+
+def has_replica() -> bool:
+    """Whether the replica is a database of its own rather than the primary"""
+    return get_engine("replica") is not get_engine()
+
+
+def get_read_only_engine(name: str = "primary") -> Engine:
+    """Get a named engine whose transactions are READ ONLY, sharing its pool"""
+    engine = _read_only_engines.get(name)
+    if engine is None:
+        # Sets the psycopg2 connection flag, BEGIN is then sent as BEGIN READ ONLY without
+        # an extra round trip. Reset when the connection goes back to the pool
+        engine = _read_only_engines[name] = get_engine(name).execution_options(
+            postgresql_readonly=True
+        )
+    return engine
+
+
+def dispose_engines(close: bool = True) -> None:
+    """Drop the pooled connections of every engine.
+
+    A forked process passes close=False: its parent still owns the sockets, the pools
+    only forget them.
+    """
+    for engine in set(_engines.values()):
+        engine.dispose(close=close)
+
+
+def warm_pools(connections: int) -> None:
+    """Open connections in the pools of the primary and replica, before the first requests"""
+    if connections <= 0:
+        return
+    for engine in {get_engine(), get_engine("replica")}:
+        # Overflow connections would be closed as soon as checked in
+        opened = [engine.connect() for _ in range(min(connections, config.DB_POOL_SIZE))]
+        for connection in opened:
+            connection.close()
+
+
+def get_pool_stats() -> dict[str, Any]:
+    """State of the primary connection pool (checked out, overflow...) and the counters of
+    every pool"""
+    pool: Any = get_engine().pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        **pool_stats.as_dict(),
+    }
+
+
+def get_compiled_cache_stats() -> dict[str, Any]:
+    """Executions served from the compiled statement cache, compiled, or never cacheable"""
+    hits = _compiled_cache_stats["CACHE_HIT"]
+    misses = _compiled_cache_stats["CACHE_MISS"]
+    return {
+        **_compiled_cache_stats,
+        "hit_rate": hits / (hits + misses) if hits + misses else None,
+    }
+
+
+def reset_compiled_cache_stats() -> None:
+    """Start counting compiled cache outcomes from zero"""
+    _compiled_cache_stats.clear()
+
+
+class RoutingSession(Session):
+    """A session sending the statements of routed service methods (reads_from) to their
+    engine, when it is READ ONLY.
+
+    A client that wrote recently sends the primary LSN of its last write (the
+    read-your-writes cookie): its reads stay on the primary until the replica has
+    replayed it. Decided on the first routed read, for the whole session.
+    """
+
+    def __init__(self, read_only: bool, client_lsn: str | None = None):
+        super().__init__(get_read_only_engine() if read_only else get_engine())
+        self.read_only = read_only
+        self.client_lsn = client_lsn
+        self._routes: list[str] = []
+        self._routable: dict[str, bool] = {}
+
+    @contextmanager
+    def routed_to(self, name: str) -> Generator[None, None, None]:
+        self._routes.append(name)
+        try:
+            yield
+        finally:
+            self._routes.pop()
+
+    def _can_route(self, name: str) -> bool:
+        routable = self._routable.get(name)
+        if routable is None:
+            routable = self._routable[name] = (
+                self.read_only and get_engine(name) is not get_engine() and self._replayed(name)
+            )
+        return routable
+
+    def _replayed(self, name: str) -> bool:
+        """Whether an engine shows the client's last write, on the connection it reads from"""
+        if self.client_lsn is None:
+            return True
+        connection = self.connection(bind_arguments={"bind": get_read_only_engine(name)})
+        # NULL on a server that is not a replica
+        replayed = connection.execute(
+            text("SELECT coalesce(pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn), false)"),
+            {"lsn": self.client_lsn},
+        ).scalar()
+        return bool(replayed)
+
+    def get_bind(self, mapper: Any = None, **kwargs: Any) -> Any:
+        if self._routes and self._can_route(self._routes[-1]):
+            return get_read_only_engine(self._routes[-1])
+        return super().get_bind(mapper, **kwargs)
+
+
+class RequestSession(RoutingSession):
+    """The session of a request, its unit of work.
+
+    Created on the first get_session() of the request, it only checks out a connection
+    for its first statement. The commits of the services only flush (and expire the
+    loaded objects, as a commit would), the request's writes are committed once when it
+    succeeds, which gives the connection back to the pool before the response is sent.
+    """
+
+    def commit(self) -> None:
+        self.flush()
+        self.expire_all()
+
+    def commit_request(self) -> bool:
+        """Commit the request's writes, then run the callbacks waiting for them.
+
+        Returns whether the request wrote anything.
+        """
+        wrote = self.info.pop(_WROTE, False)
+        super().commit()
+        for callback in self.info.pop(_AFTER_COMMIT, ()):
+            callback()
+        return wrote
+
+    def rollback(self) -> None:
+        self.info.pop(_AFTER_COMMIT, None)
+        self.info.pop(_WROTE, None)
+        super().rollback()
+
+
+def _track_statement_writes(orm_context: ORMExecuteState) -> None:
+    if orm_context.is_insert or orm_context.is_update or orm_context.is_delete:
+        orm_context.session.info[_WROTE] = True
+
+
+def _track_flush_writes(session: SqlAlchemySession, flush_context: Any) -> None:
+    session.info[_WROTE] = True
+
+
+event.listen(RequestSession, "do_orm_execute", _track_statement_writes)
+event.listen(RequestSession, "after_flush", _track_flush_writes)
+
+
+def reads_from(name: str) -> Callable[[F], F]:
+    """Route the statements of a service method to a named engine, in READ ONLY sessions.
+
+    Streams returned by the method stay routed while they are consumed.
+    """
+
+    def decorator(method: F) -> F:
+        @wraps(method)
+        def routed(*args: Any, **kwargs: Any) -> Any:
+            session = kwargs["session"] if "session" in kwargs else args[0]
+            if not isinstance(session, RoutingSession):
+                return method(*args, **kwargs)
+
+            with session.routed_to(name):
+                result = method(*args, **kwargs)
+            if inspect.isgenerator(result):
+                return _routed_stream(session, name, result)
+            return result
+
+        return cast(F, routed)
+
+    return decorator
+
+
+def _routed_stream(
+    session: RoutingSession, name: str, stream: Generator[Any, Any, Any]
+) -> Generator[Any, Any, Any]:
+    with session.routed_to(name):
+        return (yield from stream)
+
+
+def _get_client_lsn() -> str | None:
+    lsn = request.cookies.get(READ_YOUR_WRITES_COOKIE)
+    return lsn if lsn and _LSN.match(lsn) else None
+
+
+def get_primary_lsn() -> str:
+    """The current WAL position of the primary, a replica past it shows every committed write"""
+    with get_engine().connect() as connection:
+        return connection.execute(text("SELECT pg_current_wal_lsn()::text")).scalar_one()
+
+
+def get_request_session() -> RequestSession:
+    """Get the session of the current request, READ ONLY for GET requests"""
+    session = g.get("db_session")
+    if session is None:
+        read_only = request.method in _READ_ONLY_METHODS
+        session = RequestSession(read_only, _get_client_lsn() if read_only else None)
+        g.db_session = session
+    return session
+
+
+def get_read_session() -> RoutingSession:
+    """Get a READ ONLY session of its own, for a body streamed once its request has ended"""
+    return RoutingSession(read_only=True, client_lsn=_get_client_lsn())
 
 
 @contextmanager
 def get_session():
-    """Get a session for the database"""
+    """Get a session for the database, the request's one inside a request"""
+    if has_request_context():
+        yield get_request_session()
+        return
+
     with Session(get_engine()) as session:
         yield session
 
 
+def after_commit(session: Session, callback: Callable[[], Any]) -> None:
+    """Run a callback once the writes of a session are committed.
+
+    The commits of a request session wait for the end of the request, other sessions
+    are expected to be committed already.
+    """
+    if isinstance(session, RequestSession):
+        session.info.setdefault(_AFTER_COMMIT, []).append(callback)
+    else:
+        callback()
+
+
 def init_db():
     """Initialize the database and create all tables"""
     engine = get_engine()
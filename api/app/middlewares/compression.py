@@ -0,0 +1,107 @@
+import gzip
+import hashlib
+import time
+from functools import partial
+from typing import Callable
+
+from flask import Response, request
+
+from app.config import get_config
+from app.utils.cache import LRUCache
+from app.utils.logging import logger
+
+try:
+    import brotli  # pyright: ignore[reportMissingImports]
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard  # pyright: ignore[reportMissingImports]
+except ImportError:
+    zstandard = None
+
+config = get_config()
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/javascript",
+    "text/css",
+    "text/html",
+    "text/plain",
+}
+
+# Levels tuned for dynamic responses, compressed on every request
+_ENCODERS: dict[str, Callable[[bytes], bytes]] = {
+    "gzip": lambda data: gzip.compress(data, compresslevel=6, mtime=0),
+}
+if brotli is not None:
+    _ENCODERS["br"] = partial(brotli.compress, quality=5)
+if zstandard is not None:
+    _ENCODERS["zstd"] = partial(zstandard.compress, level=3)
+
+# Preferred first when the client accepts several encodings with the same quality
+_PREFERENCE = ("zstd", "br", "gzip")
+
+# Compressed bodies by (body digest, encoding), so identical responses (the OpenAPI
+# document, a popular public list...) are only compressed once
+_compressed_bodies: LRUCache[tuple[bytes, str], bytes] = LRUCache(
+    max_entries=config.COMPRESSION_CACHE_ENTRIES
+)
+
+
+def negotiate_encoding() -> str | None:
+    """Pick the best supported encoding from the request's Accept-Encoding header."""
+    best_encoding, best_quality = None, 0.0
+    for encoding in _PREFERENCE:
+        quality = request.accept_encodings.quality(encoding)
+        if encoding in _ENCODERS and quality > best_quality:
+            best_encoding, best_quality = encoding, quality
+    return best_encoding
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag of the representation of a response compressed with an encoding."""
+    return f"{etag}-{encoding}"
+
+
+def compress_response(response: Response) -> Response:
+    """Middleware compressing large text responses with the negotiated encoding."""
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+
+    data = response.get_data()
+    if len(data) < config.COMPRESSION_MIN_SIZE:
+        return response
+
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    cache_key = (hashlib.blake2b(data, digest_size=16).digest(), encoding)
+    compressed = _compressed_bodies.get(cache_key)
+    if compressed is None:
+        start = time.perf_counter()
+        compressed = _ENCODERS[encoding](data)
+        logger.debug(
+            f"Compressed {request.path} with {encoding}: {len(data)} -> {len(compressed)} "
+            f"bytes in {(time.perf_counter() - start) * 1000:.2f} ms"
+        )
+        _compressed_bodies.set(cache_key, compressed)
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+
+    # A strong ETag identifies the exact bytes, the compressed ones need their own
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+        response.set_etag(encoded_etag(etag, encoding))
+
+    return response
@@ -0,0 +1,35 @@
+from flask import Response, current_app, g
+
+from app.config import get_config
+from app.database import READ_YOUR_WRITES_COOKIE, get_primary_lsn, has_replica
+
+config = get_config()
+
+
+def commit_request_session(response: Response) -> Response:
+    """Middleware to commit the writes of a successful request at once, else roll them back."""
+    session = g.get("db_session")
+    if session is not None:
+        if response.status_code < 400:
+            if session.commit_request() and has_replica():
+                # The client's reads stay on the primary until the replica replays its writes
+                response.set_cookie(
+                    READ_YOUR_WRITES_COOKIE,
+                    get_primary_lsn(),
+                    max_age=config.DB_READ_YOUR_WRITES_WINDOW,
+                    domain=current_app.config.get("JWT_COOKIE_DOMAIN"),
+                    secure=current_app.config.get("JWT_COOKIE_SECURE", False),
+                    httponly=True,
+                    samesite=current_app.config.get("JWT_COOKIE_SAMESITE"),
+                )
+        else:
+            session.rollback()
+
+    return response
+
+
+def close_request_session(exception: BaseException | None) -> None:
+    """Close the session of the request, rolling back what an unhandled error left open."""
+    session = g.pop("db_session", None)
+    if session is not None:
+        session.close()
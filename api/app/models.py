@@ -1,7 +1,7 @@
 """Domain models and database tables.
 
 This module contains all domain-related models:
-- Database tables (User, Post, Profile, UserFollow, PostLike, etc.)
+- Database tables (User, Post, Profile, UserFollow, PostLike, TimelineEntry, etc.)
 - Domain entity models (UserPublic, PostPublic, PostDetail, UserDetail, etc.)
 - Create/Update models (UserCreate, PostCreate)
 - Base models and mixins (UserBase, PostBase, IdMixin, etc.)
@@ -10,14 +10,16 @@ This module contains all domain-related models:
 
 import re
 from datetime import date, datetime, timezone
-from typing import Any, Generic, TypeVar
+from typing import Any, ClassVar, Generic, TypeVar
 from uuid import UUID, uuid4
 
 from pydantic import BaseModel, EmailStr, field_validator
 from pydantic.alias_generators import to_camel
-from sqlmodel import TIMESTAMP, Field, Index, Relationship, SQLModel, col, func, select
+from sqlmodel import TIMESTAMP, Field, Index, Relationship, SQLModel, col, func, select, text
 
-T = TypeVar("T")
+from app.utils.shared_json import split_to_json
+
+T = TypeVar("T", bound="ApiBaseModel")
 
 # ------ API Base Model -------
 
@@ -45,6 +47,20 @@ class ApiBaseModel(BaseModel):
         else:
             return super().model_dump(*args, **kwargs)
 
+    # Fields that depend on the viewer, serialized apart from the core shared by all viewers
+    viewer_fields: ClassVar[set[str]] = set()
+
+    def core_version(self) -> tuple[Any, ...] | None:
+        """Markers changing whenever the viewer-independent fields change (None: no sharing)"""
+        return None
+
+    def to_json(self) -> bytes:
+        """Serialize straight to camelCase JSON bytes, without an intermediate dict"""
+        version = self.core_version() if self.viewer_fields else None
+        if version is not None:
+            return split_to_json(self, version, self.viewer_fields)
+        return self.__pydantic_serializer__.to_json(self, by_alias=True)
+
 
 # ------ Mixins -------
 
@@ -122,17 +138,27 @@ class PaginationQuery(ApiBaseModel):
         le=2400,
         description="Number of items per page",
     )
+    cursor: str | None = Field(
+        default=None,
+        description="Opaque cursor returned as nextCursor, takes precedence over page",
+    )
 
 
 class PaginationMeta(PaginationQuery):
-    total_count: int
+    total_count: int | None = None
     has_more: bool
+    next_cursor: str | None = None
 
 
 class PaginatedList(ApiBaseModel, Generic[T]):
     data: list[T]
     meta: PaginationMeta
 
+    def to_json(self) -> bytes:
+        """Serialize item by item, so items reuse their shared cores"""
+        data = b",".join(item.to_json() for item in self.data)
+        return b'{"data":[' + data + b'],"meta":' + self.meta.to_json() + b"}"
+
 
 # ------ User ------
 
@@ -176,6 +202,24 @@ class User(UserBase, SoftDeleteMixin, TimestampsMixin, IdMixin, SQLModel, table=
         max_length=255,
     )
 
+    # Maintained by follow/unfollow and post create/delete,
+    # UserService.reconcile_counters repairs them
+    followers_count: int = Field(
+        default=0,
+        ge=0,
+        sa_column_kwargs={"server_default": "0"},
+    )
+    following_count: int = Field(
+        default=0,
+        ge=0,
+        sa_column_kwargs={"server_default": "0"},
+    )
+    posts_count: int = Field(
+        default=0,
+        ge=0,
+        sa_column_kwargs={"server_default": "0"},
+    )
+
     profile: "Profile" = Relationship(
         back_populates="user",
         cascade_delete=True,
@@ -228,6 +272,23 @@ class UserPublic(UserBase, TimestampsMixin):
         default=0,
         ge=0,
     )
+    posts_count: int = Field(
+        default=0,
+        ge=0,
+    )
+
+    viewer_fields: ClassVar[set[str]] = {"is_following", "is_followed_by"}
+
+    def core_version(self) -> tuple[Any, ...]:
+        # Counter updates leave updated_at untouched. The same markers, in the same order,
+        # as the version columns of UserService
+        return (
+            self.id,
+            self.updated_at,
+            self.followers_count,
+            self.following_count,
+            self.posts_count,
+        )
 
 
 class UserList(PaginatedList[UserPublic]):
@@ -235,6 +296,8 @@ class UserList(PaginatedList[UserPublic]):
 
 
 class UserDetail(UserPublic):
+    # Shares the UserPublic core version, profiles have no updated_at so an edit path must
+    # touch the user's one
     profile: "ProfileBase"
 
 
@@ -308,6 +371,19 @@ class Post(PostBase, SoftDeleteMixin, TimestampsMixin, IdMixin, SQLModel, table=
     author_id: UUID = Field(
         foreign_key="user.id",
     )
+    # Maintained by like/unlike, PostService.reconcile_likes_counts repairs it
+    likes_count: int = Field(
+        default=0,
+        ge=0,
+        sa_column_kwargs={"server_default": "0"},
+    )
+    # False when the author had too many followers to fan the post out to their timelines,
+    # the feed then pulls it at read time
+    is_fanned_out: bool = Field(
+        default=True,
+        exclude=True,
+        sa_column_kwargs={"server_default": "true"},
+    )
 
     author: User = Relationship(
         back_populates="posts",
@@ -318,6 +394,17 @@ class Post(PostBase, SoftDeleteMixin, TimestampsMixin, IdMixin, SQLModel, table=
         back_populates="post",
     )
 
+    __table_args__ = (
+        Index("ix_post_author_id_created_at_id", "author_id", "created_at", "id"),
+        Index(
+            "ix_post_pulled_author_id_created_at_id",
+            "author_id",
+            "created_at",
+            "id",
+            postgresql_where=text("NOT is_fanned_out"),
+        ),
+    )
+
 
 class PostPublic(PostBase, TimestampsMixin):
     id: UUID
@@ -328,10 +415,31 @@ class PostPublic(PostBase, TimestampsMixin):
     )
     is_liked: bool = False
 
+    viewer_fields: ClassVar[set[str]] = {"is_liked"}
+
+    def core_version(self) -> tuple[Any, ...] | None:
+        # The content never changes without updated_at and the author's flags are left to
+        # their defaults. The same markers, in the same order, as the version columns of
+        # PostService
+        author = self.author
+        return (
+            self.id,
+            self.updated_at,
+            self.likes_count,
+            author.updated_at,
+            author.followers_count,
+            author.following_count,
+            author.posts_count,
+        )
+
 
 class PostDetail(PostPublic):
     likes: list[UserPublic]
 
+    def core_version(self) -> tuple[Any, ...] | None:
+        # The likers change without changing the post
+        return None
+
 
 class PostList(PaginatedList[PostPublic]):
     pass
@@ -373,6 +481,36 @@ class UserFollow(CreatedAtMixin, SQLModel, table=True):
     )
 
 
+# ------ TimelineEntry (Materialized Home Timeline) ------
+
+
+class TimelineEntry(CreatedAtMixin, SQLModel, table=True):
+    """A post fanned out to a user's home timeline (created_at is the post's one)"""
+
+    __tablename__: str = "home_timeline"
+
+    user_id: UUID = Field(
+        primary_key=True,
+        foreign_key="user.id",
+        ondelete="CASCADE",
+    )
+    post_id: UUID = Field(
+        primary_key=True,
+        foreign_key="post.id",
+        ondelete="CASCADE",
+    )
+    author_id: UUID = Field(
+        foreign_key="user.id",
+        ondelete="CASCADE",
+    )
+
+    __table_args__ = (
+        Index("ix_home_timeline_user_id_created_at_post_id", "user_id", "created_at", "post_id"),
+        Index("ix_home_timeline_user_id_author_id", "user_id", "author_id"),
+        Index("ix_home_timeline_post_id", "post_id"),
+    )
+
+
 # ------ PostLike (Post <-> User Link for Likes) ------
 
 
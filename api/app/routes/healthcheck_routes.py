@@ -1,9 +1,18 @@
+from typing import Any
+
 from flask_openapi3.blueprint import APIBlueprint
 from flask_openapi3.models.tag import Tag
+from werkzeug.exceptions import Forbidden
 
+from app.config import get_config
+from app.database import get_compiled_cache_stats, get_pool_stats, get_session
 from app.models import ApiBaseModel
+from app.services.user_service import UserService
+from app.utils.jwt import get_current_user_id, login_required
 from app.utils.response import abp_responses, success_response
 
+config = get_config()
+
 healthcheck_tag = Tag(name="Healthcheck", description="Healthcheck routes")
 healthcheck_router = APIBlueprint(
     "healthcheck", __name__, abp_tags=[healthcheck_tag], abp_responses=abp_responses
@@ -14,6 +23,11 @@ class HealthcheckResponse(ApiBaseModel):
     status: str
 
 
+class DatabaseStatsResponse(ApiBaseModel):
+    pool: dict[str, Any]
+    compiled_cache: dict[str, Any]
+
+
 @healthcheck_router.get(
     "/healthcheck",
     responses={200: HealthcheckResponse},
@@ -32,3 +46,22 @@ def healthcheck():
 def healthcheck_test():
     response = HealthcheckResponse(status="ok")
     return success_response(response.model_dump(), 200)
+
+
+@healthcheck_router.get(
+    "/healthcheck/database",
+    responses={200: DatabaseStatsResponse},
+    description="Connection pool and compiled statement cache statistics of this worker",
+)
+@login_required
+def database_stats():
+    # Internal figures, only for the admin account seeded from FIRST_ADMIN_USERNAME
+    with get_session() as session:
+        user = UserService.get_by_id(session, get_current_user_id())
+    if not config.FIRST_ADMIN_USERNAME or user.username != config.FIRST_ADMIN_USERNAME:
+        raise Forbidden(description="You are not allowed to read the database statistics")
+
+    response = DatabaseStatsResponse(
+        pool=get_pool_stats(), compiled_cache=get_compiled_cache_stats()
+    )
+    return success_response(response.model_dump(), 200)
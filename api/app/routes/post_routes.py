@@ -1,13 +1,23 @@
 from flask_openapi3.blueprint import APIBlueprint
 from flask_openapi3.models.tag import Tag
 
+from app.config import get_config
 from app.database import get_session
 from app.models import PaginationQuery, PostCreate, PostList, PostPublic
-from app.schemas import PostIdPath, UsernamePath
+from app.schemas import ExportQuery, PostIdPath, UsernamePath
 from app.services.post_service import PostService
 from app.services.user_service import UserService
+from app.utils.etag import conditional_response, make_etag
 from app.utils.jwt import get_current_user_id, login_required
-from app.utils.response import abp_responses, success_response
+from app.utils.pagination import CountStrategy
+from app.utils.response import (
+    abp_responses,
+    ndjson_response,
+    stream_list_response,
+    success_response,
+)
+
+config = get_config()
 
 posts_tag = Tag(name="Posts", description="Posts routes")
 posts_router = APIBlueprint("posts", __name__, abp_tags=[posts_tag], abp_responses=abp_responses)
@@ -41,18 +51,62 @@ def create_post(body: PostCreate):
 @login_required
 def get_user_posts(path: UsernamePath, query: PaginationQuery):
     current_user_id = get_current_user_id()
+
+    if query.items_per_page >= config.STREAM_MIN_ITEMS_PER_PAGE:
+        return stream_list_response(
+            lambda session: PostService.stream_user_posts(
+                session=session,
+                current_user_id=current_user_id,
+                author=UserService.get_card_by_username(session, path.username),
+                pagination=query,
+                count_strategy=CountStrategy.WINDOW,
+            )
+        )
+
     with get_session() as session:
-        user = UserService.get_by_username(session, path.username)
+        user = UserService.get_card_by_username(session, path.username)
 
-        posts, meta = PostService.get_user_posts(
+        version = PostService.get_user_posts_version(
             session=session,
             current_user_id=current_user_id,
             author=user,
             pagination=query,
+            count_strategy=CountStrategy.WINDOW,
         )
 
-        post_list = PostList.model_validate({"data": posts, "meta": meta})
-        return success_response(post_list.model_dump())
+        def build():
+            # Posts already serialized for another viewer are not loaded again
+            shared_page = PostService.get_shared_page(version)
+            posts, meta = shared_page or PostService.get_user_posts(
+                session=session,
+                current_user_id=current_user_id,
+                author=user,
+                pagination=query,
+                count_strategy=CountStrategy.WINDOW,
+                version=version,
+            )
+            post_list = PostList.model_construct(data=posts, meta=meta)
+            return success_response(post_list.to_json())
+
+        return conditional_response(make_etag(current_user_id, version), build)
+
+
+@posts_router.get(
+    "/posts/user/<string:username>/export",
+    description="Export all posts of a user as newline-delimited JSON",
+)
+@login_required
+def export_user_posts(path: UsernamePath, query: ExportQuery):
+    current_user_id = get_current_user_id()
+    return ndjson_response(
+        lambda session: PostService.export_user_posts(
+            session=session,
+            current_user_id=current_user_id,
+            author=UserService.get_card_by_username(session, path.username),
+        ),
+        filename=f"{path.username}-posts",
+        gzip=query.gzip,
+    )
 
 
 @posts_router.delete(
@@ -103,12 +157,37 @@ def unlike_post(path: PostIdPath):
 @login_required
 def get_feed_posts(query: PaginationQuery):
     current_user_id = get_current_user_id()
+
+    if query.items_per_page >= config.STREAM_MIN_ITEMS_PER_PAGE:
+        return stream_list_response(
+            lambda session: PostService.stream_feed_posts(
+                session=session,
+                current_user_id=current_user_id,
+                pagination=query,
+                count_strategy=CountStrategy.NONE,
+            )
+        )
+
     with get_session() as session:
-        posts, meta = PostService.get_feed_posts(
+        # Polling clients revalidate the page with its version, before it is ever built
+        version = PostService.get_feed_version(
             session=session,
             current_user_id=current_user_id,
             pagination=query,
+            count_strategy=CountStrategy.NONE,
         )
 
-        post_list = PostList.model_validate({"data": posts, "meta": meta})
-        return success_response(post_list.model_dump())
+        def build():
+            # Posts already serialized for another viewer are not loaded again
+            shared_page = PostService.get_shared_page(version)
+            posts, meta = shared_page or PostService.get_feed_posts(
+                session=session,
+                current_user_id=current_user_id,
+                pagination=query,
+                # The feed is an infinite scroll, its total is never shown
+                count_strategy=CountStrategy.NONE,
+            )
+            post_list = PostList.model_construct(data=posts, meta=meta)
+            return success_response(post_list.to_json())
+
+        return conditional_response(make_etag(current_user_id, version), build)
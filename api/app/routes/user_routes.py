@@ -1,16 +1,31 @@
+from functools import partial
+
 from flask_openapi3.blueprint import APIBlueprint
 from flask_openapi3.models.tag import Tag
 
-from app.database import get_session
+from app.config import get_config
+from app.database import after_commit, get_session
 from app.models import PaginationQuery, UserDetail, UserList, UserPublic
-from app.schemas import SearchQuery, UsernamePath
+from app.schemas import ExportQuery, SearchQuery, UsernamePath
 from app.services.user_service import UserService
+from app.utils.etag import conditional_response, make_etag
 from app.utils.jwt import get_current_user_id, login_required
-from app.utils.response import abp_responses, success_response
+from app.utils.microcache import microcache
+from app.utils.pagination import CountStrategy
+from app.utils.response import (
+    abp_responses,
+    ndjson_response,
+    stream_list_response,
+    success_response,
+)
+
+config = get_config()
 
 users_tag = Tag(name="User", description="User routes")
 users_router = APIBlueprint("user", __name__, abp_tags=[users_tag], abp_responses=abp_responses)
 
+user_detail_cache = microcache("user_detail")
+
 
 @users_router.get(
     "/users/me",
@@ -21,9 +36,14 @@ users_router = APIBlueprint("user", __name__, abp_tags=[users_tag], abp_response
 def get_current_user_route():
     user_id = get_current_user_id()
     with get_session() as session:
-        user = UserService.get_by_id(session, user_id)
-        user_public = UserPublic.model_validate(user)
-        return success_response(user_public.model_dump())
+        version = UserService.get_version_by_id(session, user_id)
+
+        def build():
+            user = UserService.get_by_id(session, user_id)
+            user_public = UserPublic.model_validate(user)
+            return success_response(user_public.model_dump())
+
+        return conditional_response(make_etag(user_id, version), build)
 
 
 @users_router.get(
@@ -35,8 +55,31 @@ def get_current_user_route():
 def get_user_detail_route(path: UsernamePath):
     current_user_id = get_current_user_id()
     with get_session() as session:
-        user_detail = UserService.get_detail_by_username(session, current_user_id, path.username)
-        return success_response(user_detail.model_dump())
+        # Polling clients revalidate the profile with its version, before it is ever built
+        version = UserService.get_detail_version_by_username(
+            session, current_user_id, path.username
+        )
+
+        *core_version, is_following, is_followed_by = version
+
+        def load_detail() -> UserDetail:
+            return UserService.get_detail_core_by_username(
+                session, path.username, tuple(core_version)
+            )
+
+        def build():
+            # A hot profile is loaded once per TTL by a single request, whatever the number
+            # of viewers asking for it at the same time
+            user_detail: UserDetail = user_detail_cache.get_or_compute(path.username, load_detail)
+            if user_detail.core_version() != tuple(core_version):
+                # Older than the ETag, another worker wrote it since: never pair the two
+                user_detail_cache.delete(path.username)
+                user_detail = user_detail_cache.get_or_compute(path.username, load_detail)
+
+            flags = {"is_following": is_following, "is_followed_by": is_followed_by}
+            return success_response(user_detail.model_copy(update=flags).to_json())
+
+        return conditional_response(make_etag(current_user_id, version), build)
 
 
 @users_router.get(
@@ -47,12 +90,28 @@ def get_user_detail_route(path: UsernamePath):
 @login_required
 def search_users_route(query: SearchQuery):
     current_user_id = get_current_user_id()
+
+    if query.items_per_page >= config.STREAM_MIN_ITEMS_PER_PAGE:
+        return stream_list_response(
+            lambda session: UserService.stream_search(
+                session=session,
+                current_user_id=current_user_id,
+                query=query.q,
+                pagination=query,
+                count_strategy=CountStrategy.WINDOW,
+            )
+        )
+
     with get_session() as session:
         users, meta = UserService.search(
-            session=session, current_user_id=current_user_id, query=query.q, pagination=query
+            session=session,
+            current_user_id=current_user_id,
+            query=query.q,
+            pagination=query,
+            count_strategy=CountStrategy.WINDOW,
         )
-        user_list = UserList.model_validate({"data": users, "meta": meta})
-        return success_response(user_list.model_dump())
+        user_list = UserList.model_construct(data=users, meta=meta)
+        return success_response(user_list.to_json())
 
 
 @users_router.delete(
@@ -65,6 +124,7 @@ def delete_user_route(path: UsernamePath):
     current_user_id = get_current_user_id()
     with get_session() as session:
         user = UserService.delete_by_id(session, current_user_id, path.username)
+        after_commit(session, partial(user_detail_cache.delete, path.username))
         user_public = UserPublic.model_validate(user)
         return success_response(user_public.model_dump())
 
@@ -83,6 +143,8 @@ def follow_user_route(path: UsernamePath):
             current_user_id=current_user_id,
             username=path.username,
         )
+        # Other workers catch up within the TTL
+        after_commit(session, partial(user_detail_cache.delete, path.username))
         return success_response(user_detail.model_dump())
 
 
@@ -100,6 +162,8 @@ def unfollow_user_route(path: UsernamePath):
             current_user_id=current_user_id,
             username=path.username,
         )
+        # Other workers catch up within the TTL
+        after_commit(session, partial(user_detail_cache.delete, path.username))
         return success_response(user_detail.model_dump())
 
 
@@ -111,15 +175,44 @@ def unfollow_user_route(path: UsernamePath):
 @login_required
 def get_user_followers_route(path: UsernamePath, query: PaginationQuery):
     current_user_id = get_current_user_id()
+
+    if query.items_per_page >= config.STREAM_MIN_ITEMS_PER_PAGE:
+        return stream_list_response(
+            lambda session: UserService.stream_follow_list_by_username(
+                session=session,
+                current_user_id=current_user_id,
+                username=path.username,
+                pagination=query,
+                followers=True,
+                count_strategy=CountStrategy.ESTIMATED,
+            )
+        )
+
     with get_session() as session:
-        users, meta = UserService.get_followers_by_username(
+        version = UserService.get_follow_list_version_by_username(
             session=session,
             current_user_id=current_user_id,
             username=path.username,
             pagination=query,
+            followers=True,
+            count_strategy=CountStrategy.ESTIMATED,
         )
-        user_list = UserList.model_validate({"data": users, "meta": meta})
-        return success_response(user_list.model_dump())
+
+        def build():
+            # Users already serialized for another viewer are not loaded again
+            shared_page = UserService.get_shared_page(version)
+            users, meta = shared_page or UserService.get_followers_by_username(
+                session=session,
+                current_user_id=current_user_id,
+                username=path.username,
+                pagination=query,
+                # Follow lists of popular accounts are huge, the profile holds the exact counts
+                count_strategy=CountStrategy.ESTIMATED,
+            )
+            user_list = UserList.model_construct(data=users, meta=meta)
+            return success_response(user_list.to_json())
+
+        return conditional_response(make_etag(current_user_id, version), build)
 
 
 @users_router.get(
@@ -130,12 +223,79 @@ def get_user_followers_route(path: UsernamePath, query: PaginationQuery):
 @login_required
 def get_user_following_route(path: UsernamePath, query: PaginationQuery):
     current_user_id = get_current_user_id()
+
+    if query.items_per_page >= config.STREAM_MIN_ITEMS_PER_PAGE:
+        return stream_list_response(
+            lambda session: UserService.stream_follow_list_by_username(
+                session=session,
+                current_user_id=current_user_id,
+                username=path.username,
+                pagination=query,
+                followers=False,
+                count_strategy=CountStrategy.ESTIMATED,
+            )
+        )
+
     with get_session() as session:
-        users, meta = UserService.get_following_by_username(
+        version = UserService.get_follow_list_version_by_username(
             session=session,
             current_user_id=current_user_id,
             username=path.username,
             pagination=query,
+            followers=False,
+            count_strategy=CountStrategy.ESTIMATED,
         )
-        user_list = UserList.model_validate({"data": users, "meta": meta})
-        return success_response(user_list.model_dump())
+
+        def build():
+            # Users already serialized for another viewer are not loaded again
+            shared_page = UserService.get_shared_page(version)
+            users, meta = shared_page or UserService.get_following_by_username(
+                session=session,
+                current_user_id=current_user_id,
+                username=path.username,
+                pagination=query,
+                # Follow lists of popular accounts are huge, the profile holds the exact counts
+                count_strategy=CountStrategy.ESTIMATED,
+            )
+            user_list = UserList.model_construct(data=users, meta=meta)
+            return success_response(user_list.to_json())
+
+        return conditional_response(make_etag(current_user_id, version), build)
+
+
+@users_router.get(
+    "/users/<string:username>/followers/export",
+    description="Export all followers of a user as newline-delimited JSON",
+)
+@login_required
+def export_user_followers_route(path: UsernamePath, query: ExportQuery):
+    current_user_id = get_current_user_id()
+    return ndjson_response(
+        lambda session: UserService.export_follow_list_by_username(
+            session=session,
+            current_user_id=current_user_id,
+            username=path.username,
+            followers=True,
+        ),
+        filename=f"{path.username}-followers",
+        gzip=query.gzip,
+    )
+
+
+@users_router.get(
+    "/users/<string:username>/following/export",
+    description="Export all users followed by a user as newline-delimited JSON",
+)
+@login_required
+def export_user_following_route(path: UsernamePath, query: ExportQuery):
+    current_user_id = get_current_user_id()
+    return ndjson_response(
+        lambda session: UserService.export_follow_list_by_username(
+            session=session,
+            current_user_id=current_user_id,
+            username=path.username,
+            followers=False,
+        ),
+        filename=f"{path.username}-following",
+        gzip=query.gzip,
+    )
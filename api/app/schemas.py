@@ -2,7 +2,7 @@
 
 This module contains API-specific schemas that do NOT represent business entities:
 - Path parameters (UserIdPath, UsernamePath)
-- Query parameters (SearchQuery)
+- Query parameters (SearchQuery, ExportQuery)
 - Route-specific request bodies (LoginCredentials)
 """
 
@@ -39,6 +39,13 @@ class SearchQuery(PaginationQuery):
     )
 
 
+class ExportQuery(ApiBaseModel):
+    gzip: bool = Field(
+        default=False,
+        description="Download the export as a gzip compressed file",
+    )
+
+
 # ------ Request Bodies (Route-Specific) ------
 
 
@@ -1,9 +1,26 @@
+from enum import StrEnum
+from functools import cache
+from typing import Any, Generator, Sequence
 from uuid import UUID
 
-from sqlalchemy.exc import IntegrityError
-from sqlmodel import Session, col, func, or_, select
+from sqlalchemy import Integer, Uuid, bindparam
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased, joinedload
+from sqlmodel import (
+    Session,
+    col,
+    delete,
+    func,
+    select,
+    true,
+    union_all,
+    update,
+)
+from sqlmodel.sql.expression import Select, SelectOfScalar
 from werkzeug.exceptions import Forbidden, NotFound
 
+from app.config import get_config
+from app.database import reads_from
 from app.models import (
     PaginationMeta,
     PaginationQuery,
@@ -12,8 +29,54 @@ from app.models import (
     PostPublic,
     User,
     UserFollow,
+    UserPublic,
+)
+from app.services.relationship_service import RelationshipService
+from app.services.timeline_service import TimelineService
+from app.services.user_service import UserService
+from app.utils.pagination import (
+    CountStrategy,
+    Keyset,
+    PageVersion,
+    get_page_version,
+    keyset_condition,
+    paginate_query,
+    stream_query,
+    stream_rows,
 )
-from app.utils.pagination import paginate_query
+from app.utils.projection import Projection
+from app.utils.shared_json import SharedJSON, get_shared
+from app.utils.user_cards import UserCard
+
+config = get_config()
+
+# Authors are selected through an alias so their columns don't clash with the post ones
+_author = aliased(User, name="author")
+_POST_ROW = Projection(Post, PostPublic)
+_AUTHOR_ROW = Projection(_author, UserPublic, prefix="author_")
+# Everything that can change on a listed post (the content only changes with updated_at),
+# also the key of its shared core (PostPublic.core_version)
+_POST_VERSION_COLUMNS: list[Any] = [
+    col(Post.id),
+    col(Post.updated_at),
+    col(Post.likes_count),
+    col(_author.updated_at),
+    col(_author.followers_count),
+    col(_author.following_count),
+    col(_author.posts_count),
+]
+# Bound at execution, so the hot statements below are built (and their cache keys
+# generated) once per shape rather than on every request
+_VIEWER_ID = bindparam("viewer_id", type_=Uuid)
+_AUTHOR_ID = bindparam("author_id", type_=Uuid)
+_PER_AUTHOR_LIMIT = bindparam("per_author_limit", type_=Integer)
+
+
+class FeedEngine(StrEnum):
+    """How the home feed is assembled"""
+
+    TIMELINE = "timeline"
+    LATERAL = "lateral"
 
 
 class PostService:
@@ -31,6 +94,10 @@ class PostService:
 
         post = Post(content=content, author_id=author.id)
         session.add(post)
+        session.flush()
+
+        UserService.increment_counters(session, author.id, posts_count=1)
+        TimelineService.fan_out_post(session, post)
         session.commit()
         session.refresh(post)
 
@@ -40,144 +107,424 @@ class PostService:
     def delete_post(session: Session, post_id: UUID, current_user_id: UUID) -> Post:
         """Delete a post."""
         post = session.get(Post, post_id)
-        if not post:
+        if not post or post.is_deleted:
             raise NotFound(description="Post not found")
 
         if post.author_id != current_user_id:
             raise Forbidden(description="You are not allowed to delete this post")
 
         post.soft_delete()
+        UserService.increment_counters(session, post.author_id, posts_count=-1)
+        TimelineService.remove_post(session, post_id)
         session.commit()
 
         return post
 
-    # @staticmethod
-    # def _build_likes_for_posts_statement(
-    #     base_statement: SelectOfScalar[Post],
-    #     current_user_id: UUID,
-    # ):
-    #     """Return a select statement enriched with likes count and is_liked flags."""
+    @staticmethod
+    def _select_posts_with_author() -> SelectOfScalar[Post]:
+        """Select posts with their author joined in, as PostPublic serializes it."""
+        return select(Post).options(joinedload(Post.author))  # pyright: ignore[reportArgumentType]
 
     @staticmethod
-    def get_user_posts(
-        session: Session,
-        current_user_id: UUID,
-        author: User,
-        pagination: PaginationQuery,
-    ) -> tuple[list[PostPublic], PaginationMeta]:
-        """Get all posts for a specific user with pagination."""
-        if not author.id:
-            raise ValueError("Author ID is required")
+    def _select_post_rows(columns: Sequence[Any] = ()) -> Select:
+        """Select the PostPublic columns (or the given ones) of posts and their authors."""
+        return select(*(columns or [*_POST_ROW.columns, *_AUTHOR_ROW.columns])).join(
+            _author, col(_author.id) == col(Post.author_id)
+        )
 
-        statement = (
+    @staticmethod
+    def _build_posts(
+        session: Session, current_user_id: UUID, rows: Sequence[Sequence[Any]]
+    ) -> list[PostPublic]:
+        """Build PostPublic models straight from projected rows, with the viewer's flags."""
+        posts = []
+        for row in rows:
+            post = _POST_ROW.to_dict(row)
+            post["author"] = UserPublic.model_construct(
+                **_AUTHOR_ROW.to_dict(row, len(_POST_ROW.fields))
+            )
+            posts.append(post)
+
+        RelationshipService.overlay_post_flags(session, current_user_id, posts)
+        return [PostPublic.model_construct(**post) for post in posts]
+
+    @staticmethod
+    def _version_columns() -> list[Any]:
+        """Version columns of listed posts, with the like flag of the bound viewer_id."""
+        is_liked = (
+            select(PostLike)
+            .where(col(PostLike.user_id) == _VIEWER_ID, col(PostLike.post_id) == col(Post.id))
+            .exists()
+        )
+        return [*_POST_VERSION_COLUMNS, is_liked]
+
+    @staticmethod
+    def get_shared_page(
+        version: PageVersion,
+    ) -> tuple[list[SharedJSON], PaginationMeta] | None:
+        """Rebuild a page from its version alone: the posts' shared cores and like flags.
+
+        None unless every post of the page was already serialized, for any viewer.
+        """
+        rows, meta = version
+        posts = []
+        for *core_version, is_liked in rows:
+            post = get_shared(PostPublic, tuple(core_version), {"is_liked": is_liked})
+            if post is None:
+                return None
+            posts.append(post)
+        return posts, meta
+
+    @staticmethod
+    def _get_active_post_with_author(session: Session, post_id: UUID) -> Post:
+        """Get a non-deleted post and its author in a single query."""
+        post = session.exec(
+            PostService._select_posts_with_author().where(col(Post.id) == post_id)
+        ).first()
+        if not post or post.is_deleted:
+            raise NotFound(description="Post not found")
+
+        return post
+
+    @staticmethod
+    def reconcile_likes_counts(session: Session) -> int:
+        """Recompute Post.likes_count from post_like, return the number of fixed posts."""
+        actual_counts = (
             select(
-                Post,
+                col(Post.id).label("post_id"),
                 func.count(col(PostLike.user_id)).label("likes_count"),
-                func.coalesce(func.bool_or(PostLike.user_id == current_user_id), False).label(
-                    "is_liked"
-                ),
             )
             .outerjoin(PostLike, col(PostLike.post_id) == col(Post.id))
-            .where(col(Post.author_id) == author.id, col(Post.deleted_at).is_(None))
             .group_by(col(Post.id))
-            .order_by(col(Post.created_at).desc())
-        )
-        result, meta = paginate_query(session=session, statement=statement, pagination=pagination)
-        posts_with_likes = [
-            PostPublic.model_validate(post).model_copy(
-                update={
-                    "likes_count": likes_count,
-                    "is_liked": is_liked,
-                }
+            .subquery()
+        )
+        result = session.exec(
+            update(Post)
+            .where(
+                col(Post.id) == actual_counts.c.post_id,
+                col(Post.likes_count) != actual_counts.c.likes_count,
             )
-            for post, likes_count, is_liked in result
-        ]
-        return posts_with_likes, meta
+            # Counter changes are not edits, keep updated_at untouched
+            .values(likes_count=actual_counts.c.likes_count, updated_at=col(Post.updated_at))
+        )
+        session.commit()
+
+        return result.rowcount
+
+    @staticmethod
+    @cache
+    def _select_user_posts(versioned: bool = False) -> tuple[Select, Keyset]:
+        """Select the rows (or version columns) of a user's posts, newest first, and their keyset.
+
+        Built once, the author_id (and viewer_id) are bound at execution.
+        """
+        columns = PostService._version_columns() if versioned else ()
+        statement = (
+            PostService._select_post_rows(columns)
+            .where(col(Post.author_id) == _AUTHOR_ID, col(Post.deleted_at).is_(None))
+            .order_by(col(Post.created_at).desc(), col(Post.id).desc())
+        )
+        if not versioned:
+            statement = statement.execution_options(query_cache=True)
+        return statement, (col(Post.created_at), col(Post.id))
+
+    @staticmethod
+    def _user_posts_params(current_user_id: UUID, author: User | UserCard) -> dict[str, Any]:
+        """Execution parameters of the user posts statements."""
+        if not author.id:
+            raise ValueError("Author ID is required")
+        return {"author_id": author.id, "viewer_id": current_user_id}
+
+    @staticmethod
+    def get_user_posts(
+        session: Session,
+        current_user_id: UUID,
+        author: User | UserCard,
+        pagination: PaginationQuery,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+        version: PageVersion | None = None,
+    ) -> tuple[list[PostPublic], PaginationMeta]:
+        """Get all posts for a specific user with pagination.
+
+        Given the page version behind an ETag, the cached page is never older than it.
+        """
+        statement, keyset = PostService._select_user_posts()
+        rows, meta = paginate_query(
+            session=session,
+            statement=statement,
+            pagination=pagination,
+            count_strategy=count_strategy,
+            keyset=keyset,
+            params=PostService._user_posts_params(current_user_id, author),
+            execution_options={"query_cache": version} if version is not None else None,
+        )
+        return PostService._build_posts(session, current_user_id, rows), meta
+
+    @staticmethod
+    def get_user_posts_version(
+        session: Session,
+        current_user_id: UUID,
+        author: User | UserCard,
+        pagination: PaginationQuery,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+    ) -> PageVersion:
+        """Version markers of a page of a user's posts, for conditional requests."""
+        statement, keyset = PostService._select_user_posts(versioned=True)
+        return get_page_version(
+            session=session,
+            statement=statement,
+            pagination=pagination,
+            keyset=keyset,
+            count_strategy=count_strategy,
+            params=PostService._user_posts_params(current_user_id, author),
+        )
+
+    @staticmethod
+    def stream_user_posts(
+        session: Session,
+        current_user_id: UUID,
+        author: User | UserCard,
+        pagination: PaginationQuery,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+    ) -> Generator[list[PostPublic], None, PaginationMeta]:
+        """Stream a page of a user's posts in batches (the meta is returned last)."""
+        statement, keyset = PostService._select_user_posts()
+        return stream_query(
+            session=session,
+            statement=statement,
+            pagination=pagination,
+            build=lambda rows: PostService._build_posts(session, current_user_id, rows),
+            count_strategy=count_strategy,
+            keyset=keyset,
+            batch_size=config.STREAM_BATCH_SIZE,
+            params=PostService._user_posts_params(current_user_id, author),
+        )
+
+    @staticmethod
+    def export_user_posts(
+        session: Session, current_user_id: UUID, author: User | UserCard
+    ) -> Generator[list[PostPublic], None, None]:
+        """Stream every post of a user in batches, from one server-side cursor."""
+        statement, _ = PostService._select_user_posts()
+        return stream_rows(
+            session=session,
+            statement=statement,
+            build=lambda rows: PostService._build_posts(session, current_user_id, rows),
+            batch_size=config.STREAM_BATCH_SIZE,
+            params=PostService._user_posts_params(current_user_id, author),
+        )
+
+    @staticmethod
+    def _increment_likes_count(session: Session, post_id: UUID, delta: int) -> None:
+        """Atomically shift a post's likes_count (no commit)."""
+        session.exec(
+            update(Post)
+            .where(col(Post.id) == post_id)
+            # Counter changes are not edits, keep updated_at untouched
+            .values(
+                likes_count=func.greatest(col(Post.likes_count) + delta, 0),
+                updated_at=col(Post.updated_at),
+            )
+        )
 
     @staticmethod
     def like_post(session: Session, post_id: UUID, user_id: UUID) -> PostPublic:
         """Like a post idempotently."""
-        post = session.get(Post, post_id)
-        if not post:
-            raise NotFound(description="Post not found")
-
-        if post.is_deleted:
-            raise NotFound(description="Post not found")
+        post = PostService._get_active_post_with_author(session, post_id)
 
-        post_like = PostLike(post_id=post_id, user_id=user_id)
-        try:
-            session.add(post_like)
-            session.commit()
-        except IntegrityError:
-            session.rollback()
+        inserted_like = session.exec(
+            insert(PostLike)
+            .values(post_id=post_id, user_id=user_id)
+            .on_conflict_do_nothing()
+            .returning(col(PostLike.post_id))
+        ).first()
+        if inserted_like:
+            PostService._increment_likes_count(session, post_id, 1)
+        session.commit()
 
-        session.refresh(post)
+        # Reload the expired post and author together rather than lazily one by one
+        post = session.exec(
+            PostService._select_posts_with_author().where(col(Post.id) == post_id)
+        ).one()
 
-        post_public = PostPublic.model_validate(post)
+        post_public = PostPublic.model_validate(post).model_copy(update={"is_liked": True})
 
         return post_public
 
     @staticmethod
     def unlike_post(session: Session, post_id: UUID, user_id: UUID) -> PostPublic:
         """Unlike a post idempotently."""
-        post = session.get(Post, post_id)
-        if not post:
-            raise NotFound(description="Post not found")
-
-        if post.is_deleted:
-            raise NotFound(description="Post not found")
+        post = PostService._get_active_post_with_author(session, post_id)
 
-        statement = select(PostLike).where(PostLike.post_id == post_id, PostLike.user_id == user_id)
-        post_like = session.exec(statement).first()
+        deleted_like = session.exec(
+            delete(PostLike)
+            .where(col(PostLike.post_id) == post_id, col(PostLike.user_id) == user_id)
+            .returning(col(PostLike.post_id))
+        ).first()
 
-        if not post_like:
+        if not deleted_like:
             raise NotFound(description="Post not found")
 
-        session.delete(post_like)
+        PostService._increment_likes_count(session, post_id, -1)
         session.commit()
 
-        session.refresh(post)
+        # Reload the expired post and author together rather than lazily one by one
+        post = session.exec(
+            PostService._select_posts_with_author().where(col(Post.id) == post_id)
+        ).one()
 
-        post_public = PostPublic.model_validate(post)
+        post_public = PostPublic.model_validate(post).model_copy(update={"is_liked": False})
 
         return post_public
 
     @staticmethod
+    def _select_feed_lateral(cursor: bool) -> Select:
+        """Select (post_id, created_at) of a feed by merging the top posts of each author.
+
+        Each followed author (and the viewer) only contributes the few newest posts the
+        requested page can need (the bound per_author_limit), read with a LATERAL index
+        scan on (author_id, created_at).
+        """
+        authors = union_all(
+            select(_VIEWER_ID.label("author_id")),
+            select(col(UserFollow.following_id).label("author_id")).where(
+                col(UserFollow.follower_id) == _VIEWER_ID
+            ),
+        ).subquery("feed_authors")
+
+        conditions = [col(Post.author_id) == authors.c.author_id, col(Post.deleted_at).is_(None)]
+        if cursor:
+            conditions.append(keyset_condition((col(Post.created_at), col(Post.id))))
+
+        author_posts = (
+            select(col(Post.id).label("post_id"), col(Post.created_at).label("created_at"))
+            .where(*conditions)
+            .order_by(col(Post.created_at).desc(), col(Post.id).desc())
+            .limit(_PER_AUTHOR_LIMIT)
+            .lateral("author_posts")
+        )
+
+        return select(author_posts.c.post_id, author_posts.c.created_at).select_from(
+            authors.join(author_posts, true())
+        )
+
+    @staticmethod
+    @cache
+    def _prepare_feed(engine: FeedEngine, cursor: bool, versioned: bool) -> tuple[Select, Keyset]:
+        """Feed statement of a shape and its keyset, built once (viewer_id bound at execution).
+
+        The timeline engine reads the materialized home timeline (plus pulled posts of
+        authors too popular to be fanned out), the lateral engine merges the top posts of
+        each followed author.
+        """
+        if engine == FeedEngine.LATERAL:
+            feed = PostService._select_feed_lateral(cursor).subquery()
+        else:
+            feed = TimelineService.select_timeline(_VIEWER_ID).subquery()
+
+        columns = PostService._version_columns() if versioned else ()
+        statement = (
+            PostService._select_post_rows(columns)
+            .join(feed, feed.c.post_id == col(Post.id))
+            .where(col(Post.deleted_at).is_(None))
+            .order_by(feed.c.created_at.desc(), feed.c.post_id.desc())
+        )
+        return statement, (feed.c.created_at, feed.c.post_id)
+
+    @staticmethod
+    def _select_feed(
+        current_user_id: UUID,
+        pagination: PaginationQuery,
+        count_strategy: CountStrategy,
+        engine: FeedEngine | None,
+        versioned: bool = False,
+    ) -> tuple[Select, Keyset, CountStrategy, dict[str, Any]]:
+        """Select the rows of a feed page, newest first, its keyset and usable count strategy.
+
+        The statement is built once per shape, the viewer and per author limit come back as
+        its execution parameters.
+        """
+        engine = engine or FeedEngine(config.FEED_ENGINE)
+        statement, keyset = PostService._prepare_feed(
+            engine, pagination.cursor is not None, versioned
+        )
+        params: dict[str, Any] = {"viewer_id": current_user_id}
+
+        if engine == FeedEngine.LATERAL:
+            # Only the candidates of the requested page are selected, they can't be counted
+            count_strategy = CountStrategy.NONE
+            per_author_limit = pagination.items_per_page + 1
+            if pagination.cursor is None:
+                per_author_limit += (pagination.page - 1) * pagination.items_per_page
+            params["per_author_limit"] = per_author_limit
+
+        return statement, keyset, count_strategy, params
+
+    @staticmethod
+    @reads_from("replica")
     def get_feed_posts(
         session: Session,
         current_user_id: UUID,
         pagination: PaginationQuery,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+        engine: FeedEngine | None = None,
     ) -> tuple[list[PostPublic], PaginationMeta]:
         """Get feed posts from users followed by the current user."""
-        statement = (
-            select(
-                Post,
-                func.count(col(PostLike.user_id)).label("likes_count"),
-                func.coalesce(func.bool_or(PostLike.user_id == current_user_id), False).label(
-                    "is_liked"
-                ),
-            )
-            .outerjoin(PostLike, col(PostLike.post_id) == col(Post.id))
-            .outerjoin(UserFollow, col(UserFollow.following_id) == col(Post.author_id))
-            .where(
-                or_(
-                    UserFollow.follower_id == current_user_id,
-                    col(Post.author_id) == current_user_id,
-                ),
-                col(Post.deleted_at).is_(None),
-            )
-            .group_by(col(Post.id))
-            .order_by(col(Post.created_at).desc())
+        statement, keyset, count_strategy, params = PostService._select_feed(
+            current_user_id, pagination, count_strategy, engine
+        )
+        rows, meta = paginate_query(
+            session=session,
+            statement=statement,
+            pagination=pagination,
+            count_strategy=count_strategy,
+            keyset=keyset,
+            params=params,
         )
+        return PostService._build_posts(session, current_user_id, rows), meta
 
-        result, meta = paginate_query(session=session, statement=statement, pagination=pagination)
-        posts_with_likes = [
-            PostPublic.model_validate(post).model_copy(
-                update={
-                    "likes_count": likes_count,
-                    "is_liked": is_liked,
-                }
-            )
-            for post, likes_count, is_liked in result
-        ]
-        return posts_with_likes, meta
+    @staticmethod
+    @reads_from("replica")
+    def get_feed_version(
+        session: Session,
+        current_user_id: UUID,
+        pagination: PaginationQuery,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+        engine: FeedEngine | None = None,
+    ) -> PageVersion:
+        """Version markers of a feed page, for conditional requests."""
+        statement, keyset, count_strategy, params = PostService._select_feed(
+            current_user_id, pagination, count_strategy, engine, versioned=True
+        )
+        return get_page_version(
+            session=session,
+            statement=statement,
+            pagination=pagination,
+            keyset=keyset,
+            count_strategy=count_strategy,
+            params=params,
+        )
+
+    @staticmethod
+    @reads_from("replica")
+    def stream_feed_posts(
+        session: Session,
+        current_user_id: UUID,
+        pagination: PaginationQuery,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+        engine: FeedEngine | None = None,
+    ) -> Generator[list[PostPublic], None, PaginationMeta]:
+        """Stream a feed page in batches (the meta is returned last)."""
+        statement, keyset, count_strategy, params = PostService._select_feed(
+            current_user_id, pagination, count_strategy, engine
+        )
+        return stream_query(
+            session=session,
+            statement=statement,
+            pagination=pagination,
+            build=lambda rows: PostService._build_posts(session, current_user_id, rows),
+            count_strategy=count_strategy,
+            keyset=keyset,
+            batch_size=config.STREAM_BATCH_SIZE,
+            params=params,
+        )
@@ -0,0 +1,72 @@
+from typing import Any, Iterable
+from uuid import UUID
+
+from sqlalchemy import ARRAY, Uuid, any_, bindparam
+from sqlmodel import Session, col, select
+
+from app.models import PostLike, UserFollow
+
+
+def _any_id(ids: Iterable[UUID]):
+    """`= ANY(:ids)` operand, a single array parameter whatever the number of ids"""
+    return any_(bindparam("ids", list(ids), type_=ARRAY(Uuid())))
+
+
+class RelationshipService:
+    """Service responsible for the viewer-specific flags (follows and likes) of a page.
+
+    Flags are loaded in one primary key lookup per page and overlaid onto row dicts that
+    don't depend on the viewer.
+    """
+
+    @staticmethod
+    def load_following_ids(session: Session, viewer_id: UUID, user_ids: list[UUID]) -> set[UUID]:
+        """Ids among user_ids that the viewer follows."""
+        if not user_ids:
+            return set()
+        statement = select(col(UserFollow.following_id)).where(
+            col(UserFollow.follower_id) == viewer_id,
+            col(UserFollow.following_id) == _any_id(user_ids),
+        )
+        return set(session.exec(statement).all())
+
+    @staticmethod
+    def load_followed_by_ids(session: Session, viewer_id: UUID, user_ids: list[UUID]) -> set[UUID]:
+        """Ids among user_ids that follow the viewer."""
+        if not user_ids:
+            return set()
+        statement = select(col(UserFollow.follower_id)).where(
+            col(UserFollow.follower_id) == _any_id(user_ids),
+            col(UserFollow.following_id) == viewer_id,
+        )
+        return set(session.exec(statement).all())
+
+    @staticmethod
+    def load_liked_post_ids(session: Session, viewer_id: UUID, post_ids: list[UUID]) -> set[UUID]:
+        """Ids among post_ids that the viewer liked."""
+        if not post_ids:
+            return set()
+        statement = select(col(PostLike.post_id)).where(
+            col(PostLike.user_id) == viewer_id,
+            col(PostLike.post_id) == _any_id(post_ids),
+        )
+        return set(session.exec(statement).all())
+
+    @staticmethod
+    def overlay_user_flags(session: Session, viewer_id: UUID, users: list[dict[str, Any]]) -> None:
+        """Set is_following/is_followed_by on user rows for the viewer, in place."""
+        user_ids = [user["id"] for user in users]
+        following_ids = RelationshipService.load_following_ids(session, viewer_id, user_ids)
+        followed_by_ids = RelationshipService.load_followed_by_ids(session, viewer_id, user_ids)
+        for user in users:
+            user["is_following"] = user["id"] in following_ids
+            user["is_followed_by"] = user["id"] in followed_by_ids
+
+    @staticmethod
+    def overlay_post_flags(session: Session, viewer_id: UUID, posts: list[dict[str, Any]]) -> None:
+        """Set is_liked on post rows for the viewer, in place."""
+        liked_ids = RelationshipService.load_liked_post_ids(
+            session, viewer_id, [post["id"] for post in posts]
+        )
+        for post in posts:
+            post["is_liked"] = post["id"] in liked_ids
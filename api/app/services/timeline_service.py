@@ -0,0 +1,133 @@
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql.expression import BindParameter, CompoundSelect
+from sqlmodel import Session, col, delete, literal, select, union_all, update
+
+from app.config import get_config
+from app.models import Post, TimelineEntry, User, UserFollow
+
+config = get_config()
+
+_TIMELINE_COLUMNS = ["user_id", "post_id", "author_id", "created_at"]
+
+
+class TimelineService:
+    """Service responsible for the materialized home timelines (fan-out on write)."""
+
+    @staticmethod
+    def _has_too_many_followers(session: Session, author_id: UUID) -> bool:
+        """Check if an author is above the fan-out threshold."""
+        followers_count = session.scalar(
+            select(col(User.followers_count)).where(col(User.id) == author_id)
+        )
+        return (followers_count or 0) > config.FEED_FANOUT_MAX_FOLLOWERS
+
+    @staticmethod
+    def fan_out_post(session: Session, post: Post) -> None:
+        """Copy a new post into its author's and followers' timelines (no commit).
+
+        Posts of authors above the fan-out threshold only land in the author's own
+        timeline and are flagged so the feed pulls them at read time.
+        """
+        own_entry = select(
+            col(Post.author_id), col(Post.id), col(Post.author_id), col(Post.created_at)
+        ).where(col(Post.id) == post.id)
+
+        if TimelineService._has_too_many_followers(session, post.author_id):
+            session.exec(update(Post).where(col(Post.id) == post.id).values(is_fanned_out=False))
+            entries = own_entry
+        else:
+            followers_entries = (
+                select(
+                    col(UserFollow.follower_id),
+                    col(Post.id),
+                    col(Post.author_id),
+                    col(Post.created_at),
+                )
+                .join(Post, col(Post.author_id) == col(UserFollow.following_id))
+                .where(col(Post.id) == post.id)
+            )
+            entries = union_all(own_entry, followers_entries)
+
+        session.exec(insert(TimelineEntry).from_select(_TIMELINE_COLUMNS, entries))
+
+    @staticmethod
+    def remove_post(session: Session, post_id: UUID) -> None:
+        """Remove a post from every timeline (no commit)."""
+        session.exec(delete(TimelineEntry).where(col(TimelineEntry.post_id) == post_id))
+
+    @staticmethod
+    def backfill_author(session: Session, user_id: UUID, author_id: UUID) -> None:
+        """Copy an author's recent fanned out posts into a user's timeline (no commit)."""
+        recent_posts = (
+            select(literal(user_id), col(Post.id), col(Post.author_id), col(Post.created_at))
+            .where(
+                col(Post.author_id) == author_id,
+                col(Post.is_fanned_out).is_(True),
+                col(Post.deleted_at).is_(None),
+            )
+            .order_by(col(Post.created_at).desc(), col(Post.id).desc())
+            .limit(config.FEED_BACKFILL_POSTS)
+        )
+        session.exec(
+            insert(TimelineEntry)
+            .from_select(_TIMELINE_COLUMNS, recent_posts)
+            .on_conflict_do_nothing()
+        )
+
+    @staticmethod
+    def remove_author(session: Session, user_id: UUID, author_id: UUID) -> None:
+        """Remove an author's posts from a user's timeline (no commit)."""
+        session.exec(
+            delete(TimelineEntry).where(
+                col(TimelineEntry.user_id) == user_id,
+                col(TimelineEntry.author_id) == author_id,
+            )
+        )
+
+    @staticmethod
+    def rebuild(session: Session) -> None:
+        """Rebuild every timeline from the follow graph and existing posts (no commit)."""
+        active_posts = select(Post).where(col(Post.deleted_at).is_(None))
+        own_entries = active_posts.with_only_columns(
+            col(Post.author_id), col(Post.id), col(Post.author_id), col(Post.created_at)
+        )
+        followers_entries = (
+            active_posts.with_only_columns(
+                col(UserFollow.follower_id),
+                col(Post.id),
+                col(Post.author_id),
+                col(Post.created_at),
+            )
+            .join(UserFollow, col(UserFollow.following_id) == col(Post.author_id))
+            .where(col(Post.is_fanned_out).is_(True))
+        )
+
+        session.exec(delete(TimelineEntry))
+        session.exec(
+            insert(TimelineEntry).from_select(
+                _TIMELINE_COLUMNS, union_all(own_entries, followers_entries)
+            )
+        )
+
+    @staticmethod
+    def select_timeline(user_id: UUID | BindParameter[Any]) -> CompoundSelect:
+        """Select (post_id, created_at) of a user's feed, fanned out and pulled posts."""
+        fanned_out = select(
+            col(TimelineEntry.post_id).label("post_id"),
+            col(TimelineEntry.created_at).label("created_at"),
+        ).where(col(TimelineEntry.user_id) == user_id)
+
+        pulled = (
+            select(col(Post.id).label("post_id"), col(Post.created_at).label("created_at"))
+            .join(UserFollow, col(UserFollow.following_id) == col(Post.author_id))
+            .where(
+                col(UserFollow.follower_id) == user_id,
+                col(Post.is_fanned_out).is_(False),
+                col(Post.deleted_at).is_(None),
+            )
+        )
+
+        return union_all(fanned_out, pulled)
@@ -1,21 +1,71 @@
-from typing import Tuple
+from functools import cache
+from typing import Any, Generator, Sequence
 from uuid import UUID
 
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import String, bindparam
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import aliased
-from sqlmodel import Session, and_, case, col, func, or_, select
+from sqlmodel import Session, and_, case, col, delete, func, or_, select, update
 from sqlmodel.sql.expression import Select
 from werkzeug.exceptions import BadRequest, Forbidden, NotFound
 
+from app.config import get_config
+from app.database import reads_from
 from app.models import (
     PaginationMeta,
     PaginationQuery,
+    Post,
+    Profile,
+    ProfileBase,
     User,
     UserDetail,
     UserFollow,
     UserPublic,
 )
-from app.utils.pagination import paginate_query
+from app.services.relationship_service import RelationshipService
+from app.services.timeline_service import TimelineService
+from app.utils.pagination import (
+    CountStrategy,
+    Keyset,
+    PageVersion,
+    get_page_version,
+    paginate_query,
+    stream_query,
+    stream_rows,
+)
+from app.utils.projection import Projection
+from app.utils.shared_json import SharedJSON, get_shared
+from app.utils.user_cards import (
+    UserCard,
+    get_user_card,
+    invalidate_on_commit,
+    set_user_card,
+    user_card_stamp,
+)
+
+config = get_config()
+
+_USER_ROW = Projection(User, UserPublic)
+_PROFILE_ROW = Projection(Profile, ProfileBase, prefix="profile_")
+# Everything that can change on a user (the profile has no edit path and no updated_at,
+# one must touch the user's updated_at), also the key of its shared core
+# (UserPublic.core_version)
+_USER_VERSION_COLUMNS: list[Any] = [
+    col(User.id),
+    col(User.updated_at),
+    col(User.followers_count),
+    col(User.following_count),
+    col(User.posts_count),
+]
+_USER_CARD_COLUMNS: list[Any] = [
+    col(User.id),
+    col(User.username),
+    col(User.name),
+    col(User.avatar),
+    col(User.followers_count),
+    col(User.following_count),
+    col(User.posts_count),
+]
 
 
 class UserService:
@@ -40,7 +90,9 @@ class UserService:
     @staticmethod
     def get_by_username(session: Session, username: str) -> User:
         """Get user by username."""
-        user = session.exec(select(User).where(col(User.username) == username)).first()
+        user = session.exec(
+            select(User).where(col(User.username) == username).execution_options(query_cache=True)
+        ).first()
 
         if not user:
             raise NotFound(description=f"User {username} not found")
@@ -50,6 +102,63 @@ class UserService:
 
         return user
 
+    @staticmethod
+    def get_card_by_username(session: Session, username: str) -> UserCard:
+        """Get an active user's card by username, shared by the workers of the node.
+
+        Counts may lag the session's own uncommitted writes, use the id.
+        """
+        card = get_user_card(username)
+        if card is not None:
+            return card
+
+        # Taken before the query: a commit landing in between keeps the card unshared
+        stamp = user_card_stamp(username)
+        columns: list[Any] = [*_USER_CARD_COLUMNS, col(User.deleted_at)]
+        row = session.exec(select(*columns).where(col(User.username) == username)).first()
+
+        if not row:
+            raise NotFound(description=f"User {username} not found")
+
+        *card_values, deleted_at = row
+        if deleted_at is not None:
+            raise NotFound(description=f"This account ({username}) has been deleted.")
+
+        card = UserCard(*card_values)
+        set_user_card(card, stamp)
+        return card
+
+    @staticmethod
+    def _version_columns(current_user_id: UUID) -> list[Any]:
+        """Version columns of listed users, with the viewer's follow flags."""
+        is_following = (
+            select(UserFollow)
+            .where(
+                col(UserFollow.follower_id) == current_user_id,
+                col(UserFollow.following_id) == col(User.id),
+            )
+            .exists()
+        )
+        is_followed_by = (
+            select(UserFollow)
+            .where(
+                col(UserFollow.follower_id) == col(User.id),
+                col(UserFollow.following_id) == current_user_id,
+            )
+            .exists()
+        )
+        return [*_USER_VERSION_COLUMNS, is_following, is_followed_by]
+
+    @staticmethod
+    def get_version_by_id(session: Session, user_id: UUID) -> tuple[Any, ...] | None:
+        """Version markers of an active user, for conditional requests."""
+        row = session.exec(
+            select(*_USER_VERSION_COLUMNS).where(
+                col(User.id) == user_id, col(User.deleted_at).is_(None)
+            )
+        ).first()
+        return tuple(row) if row else None
+
     @staticmethod
     def delete_by_id(session: Session, user_id: UUID, username: str) -> User:
         """Delete user account by ID."""
@@ -68,63 +177,151 @@ class UserService:
         return User.model_validate(user)
 
     @staticmethod
-    def _select_users_with_follow_data(
-        current_user_id: UUID,
-    ) -> Select[Tuple[User, int, int, bool, bool]]:
-        """Select users with follow data."""
-        uf_followers = aliased(UserFollow)
-        uf_following = aliased(UserFollow)
-
-        return (
-            select(  # pyright: ignore[reportCallIssue]
-                User,
-                func.count(func.distinct(uf_followers.follower_id)).label("followers_count"),
-                func.count(func.distinct(uf_following.following_id)).label("following_count"),
-                func.coalesce(
-                    func.bool_or(uf_followers.follower_id == current_user_id), False
-                ).label("is_following"),
-                func.coalesce(
-                    func.bool_or(uf_following.following_id == current_user_id), False
-                ).label("is_followed_by"),
+    def increment_counters(session: Session, user_id: UUID, **deltas: int) -> None:
+        """Atomically shift a user's denormalized counters (no commit)."""
+        values = {
+            name: func.greatest(col(getattr(User, name)) + delta, 0)
+            for name, delta in deltas.items()
+        }
+        username = session.exec(
+            update(User)
+            .where(col(User.id) == user_id)
+            # Counter changes are not edits, keep updated_at untouched
+            .values(**values, updated_at=col(User.updated_at))
+            .returning(col(User.username))
+        ).scalar_one()
+        invalidate_on_commit(session, username)
+
+    @staticmethod
+    def reconcile_counters(session: Session) -> int:
+        """Recompute followers/following/posts counts, return the number of fixed users."""
+        actual_counts = select(
+            col(User.id).label("user_id"),
+            select(func.count())
+            .where(col(UserFollow.following_id) == col(User.id))
+            .scalar_subquery()
+            .label("followers_count"),
+            select(func.count())
+            .where(col(UserFollow.follower_id) == col(User.id))
+            .scalar_subquery()
+            .label("following_count"),
+            select(func.count())
+            .where(col(Post.author_id) == col(User.id), col(Post.deleted_at).is_(None))
+            .scalar_subquery()
+            .label("posts_count"),
+        ).subquery()
+
+        result = session.exec(
+            update(User)
+            .where(
+                col(User.id) == actual_counts.c.user_id,
+                or_(
+                    col(User.followers_count) != actual_counts.c.followers_count,
+                    col(User.following_count) != actual_counts.c.following_count,
+                    col(User.posts_count) != actual_counts.c.posts_count,
+                ),
+            )
+            # Counter changes are not edits, keep updated_at untouched
+            .values(
+                followers_count=actual_counts.c.followers_count,
+                following_count=actual_counts.c.following_count,
+                posts_count=actual_counts.c.posts_count,
+                updated_at=col(User.updated_at),
             )
-            .join(uf_followers, uf_followers.following_id == col(User.id), isouter=True)
-            .join(uf_following, uf_following.follower_id == col(User.id), isouter=True)
-            .where(col(User.deleted_at).is_(None))
-            .group_by(col(User.id))
         )
+        invalidate_on_commit(session)
+        session.commit()
+
+        return result.rowcount
 
     @staticmethod
-    def get_detail_by_username(
-        session: Session,
-        current_user_id: UUID,
-        username: str,
+    def _select_active_user_rows(columns: Sequence[Any] = ()) -> Select:
+        """Select the UserPublic columns (or the given ones) of active users."""
+        return select(*(columns or _USER_ROW.columns)).where(col(User.deleted_at).is_(None))
+
+    @staticmethod
+    def _build_users(
+        session: Session, current_user_id: UUID, rows: Sequence[Sequence[Any]]
+    ) -> list[UserPublic]:
+        """Build UserPublic models straight from projected rows, with the viewer's flags."""
+        users = [_USER_ROW.to_dict(row) for row in rows]
+        RelationshipService.overlay_user_flags(session, current_user_id, users)
+        return [UserPublic.model_construct(**user) for user in users]
+
+    @staticmethod
+    def get_detail_core_by_username(
+        session: Session, username: str, version: tuple[Any, ...] | None = None
     ) -> UserDetail:
-        """Get a user's detail by username."""
+        """Get a user's detail by username, without the viewer's follow flags.
+
+        Given the user's version behind an ETag, the cached detail is never older than it.
+        """
 
-        statement = UserService._select_users_with_follow_data(current_user_id).where(
-            col(User.username) == username
+        statement = (
+            select(*_USER_ROW.columns, *_PROFILE_ROW.columns)
+            .join(Profile, col(Profile.user_id) == col(User.id), isouter=True)
+            .where(col(User.username) == username, col(User.deleted_at).is_(None))
+            .execution_options(query_cache=version or True)
         )
 
-        result = session.exec(statement).first()
-        if not result:
+        row = session.exec(statement).first()
+        if not row:
             raise NotFound(description=f"User {username} not found")
 
-        user, followers_count, following_count, is_following, is_followed_by = result
+        user = _USER_ROW.to_dict(row)
+        profile = _PROFILE_ROW.to_dict(row, len(_USER_ROW.fields))
 
-        if user.deleted_at:
-            raise NotFound(
-                description=f"This account ({username}) has been deleted. "
-                "Please contact support if you believe this is an error."
-            )
+        return UserDetail.model_construct(**user, profile=ProfileBase.model_construct(**profile))
 
-        return UserDetail.model_validate(user).model_copy(
-            update={
-                "followers_count": int(followers_count or 0),
-                "following_count": int(following_count or 0),
-                "is_following": bool(is_following),
-                "is_followed_by": bool(is_followed_by),
-            }
+    @staticmethod
+    def get_detail_version_by_username(
+        session: Session, current_user_id: UUID, username: str
+    ) -> tuple[Any, ...]:
+        """Version markers of a user's detail, with the viewer's follow flags (one query)."""
+        columns = [*UserService._version_columns(current_user_id), col(User.deleted_at)]
+        row = session.exec(select(*columns).where(col(User.username) == username)).first()
+
+        if not row:
+            raise NotFound(description=f"User {username} not found")
+
+        *version, deleted_at = row
+        if deleted_at is not None:
+            raise NotFound(description=f"This account ({username}) has been deleted.")
+
+        return tuple(version)
+
+    @staticmethod
+    def get_follow_flags(session: Session, current_user_id: UUID, user_id: UUID) -> dict[str, bool]:
+        """The viewer's is_following/is_followed_by flags for one user, in one query."""
+        is_following = (
+            select(UserFollow)
+            .where(
+                col(UserFollow.follower_id) == current_user_id,
+                col(UserFollow.following_id) == user_id,
+            )
+            .exists()
+        )
+        is_followed_by = (
+            select(UserFollow)
+            .where(
+                col(UserFollow.follower_id) == user_id,
+                col(UserFollow.following_id) == current_user_id,
+            )
+            .exists()
         )
+        following, followed_by = session.exec(select(is_following, is_followed_by)).one()
+        return {"is_following": following, "is_followed_by": followed_by}
+
+    @staticmethod
+    def get_detail_by_username(
+        session: Session,
+        current_user_id: UUID,
+        username: str,
+    ) -> UserDetail:
+        """Get a user's detail by username."""
+        user_detail = UserService.get_detail_core_by_username(session, username)
+        flags = UserService.get_follow_flags(session, current_user_id, user_detail.id)
+        return user_detail.model_copy(update=flags)
 
     @staticmethod
     def follow_by_username(
@@ -133,18 +330,21 @@ class UserService:
         username: str,
     ) -> UserDetail:
         """Follow a user idempotently and return updated detail."""
-        target = UserService.get_by_username(session, username)
-        if not target.id:
-            raise NotFound(description="User not found")
+        target = UserService.get_card_by_username(session, username)
         if current_user_id == target.id:
             raise BadRequest(description="You cannot follow yourself")
 
-        follow = UserFollow(follower_id=current_user_id, following_id=target.id)
-        try:
-            session.add(follow)
-            session.commit()
-        except IntegrityError:
-            session.rollback()
+        inserted_follow = session.exec(
+            insert(UserFollow)
+            .values(follower_id=current_user_id, following_id=target.id)
+            .on_conflict_do_nothing()
+            .returning(col(UserFollow.following_id))
+        ).first()
+        if inserted_follow:
+            UserService.increment_counters(session, current_user_id, following_count=1)
+            UserService.increment_counters(session, target.id, followers_count=1)
+            TimelineService.backfill_author(session, current_user_id, target.id)
+        session.commit()
 
         return UserService.get_detail_by_username(session, current_user_id, username)
 
@@ -155,113 +355,192 @@ class UserService:
         username: str,
     ) -> UserDetail:
         """Unfollow a user and return updated detail; raise 404 if not following."""
-        target = UserService.get_by_username(session, username)
-        if not target.id:
-            raise NotFound(description="User not found")
+        target = UserService.get_card_by_username(session, username)
 
-        follow = select(UserFollow).where(
-            UserFollow.follower_id == current_user_id,
-            UserFollow.following_id == target.id,
-        )
-        follow = session.exec(follow).first()
+        deleted_follow = session.exec(
+            delete(UserFollow)
+            .where(
+                col(UserFollow.follower_id) == current_user_id,
+                col(UserFollow.following_id) == target.id,
+            )
+            .returning(col(UserFollow.following_id))
+        ).first()
 
-        if not follow:
+        if not deleted_follow:
             raise NotFound(description="You are not following this user")
 
-        session.delete(follow)
+        UserService.increment_counters(session, current_user_id, following_count=-1)
+        UserService.increment_counters(session, target.id, followers_count=-1)
+        TimelineService.remove_author(session, current_user_id, target.id)
         session.commit()
 
         return UserService.get_detail_by_username(session, current_user_id, username)
 
     @staticmethod
-    def get_followers_by_username(
-        session: Session,
-        current_user_id: UUID,
-        username: str,
-        pagination: PaginationQuery,
-    ) -> tuple[list[UserPublic], PaginationMeta]:
-        """List followers (active users) of a target user with pagination."""
-
+    def _select_follow_list(
+        username: str, followers: bool, columns: Sequence[Any] = ()
+    ) -> tuple[Select, Keyset]:
+        """Select active users following (or followed by) a target user, latest first."""
         user_follow = aliased(UserFollow)
         target_user = aliased(User)
 
+        if followers:
+            listed_id, target_id = user_follow.follower_id, user_follow.following_id
+        else:
+            listed_id, target_id = user_follow.following_id, user_follow.follower_id
+
         statement = (
-            UserService._select_users_with_follow_data(current_user_id)
-            .join(user_follow, col(user_follow.follower_id) == col(User.id))
+            UserService._select_active_user_rows(columns)
+            .join(user_follow, col(listed_id) == col(User.id))
             .join(
                 target_user,
                 and_(
-                    col(target_user.id) == col(user_follow.following_id),
+                    col(target_user.id) == col(target_id),
                     col(target_user.username) == username,
                 ),
             )
+            .order_by(col(user_follow.created_at).desc(), col(User.id).desc())
         )
+        return statement, (col(user_follow.created_at), col(User.id))
 
-        result, meta = paginate_query(session=session, statement=statement, pagination=pagination)
+    @staticmethod
+    @reads_from("replica")
+    def get_followers_by_username(
+        session: Session,
+        current_user_id: UUID,
+        username: str,
+        pagination: PaginationQuery,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+    ) -> tuple[list[UserPublic], PaginationMeta]:
+        """List followers (active users) of a target user with pagination."""
+        statement, keyset = UserService._select_follow_list(username, followers=True)
+
+        rows, meta = paginate_query(
+            session=session,
+            statement=statement,
+            pagination=pagination,
+            count_strategy=count_strategy,
+            keyset=keyset,
+        )
 
-        users = [
-            UserPublic.model_validate(user).model_copy(
-                update={
-                    "followers_count": followers_count,
-                    "following_count": following_count,
-                    "is_following": is_following,
-                    "is_followed_by": is_followed_by,
-                }
-            )
-            for user, followers_count, following_count, is_following, is_followed_by in result
-        ]
+        users = UserService._build_users(session, current_user_id, rows)
 
         return users, meta
 
     @staticmethod
+    @reads_from("replica")
     def get_following_by_username(
         session: Session,
         current_user_id: UUID,
         username: str,
         pagination: PaginationQuery,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
     ) -> tuple[list[UserPublic], PaginationMeta]:
         """List users (active) that the target user is following with pagination."""
+        statement, keyset = UserService._select_follow_list(username, followers=False)
+
+        rows, meta = paginate_query(
+            session=session,
+            statement=statement,
+            pagination=pagination,
+            count_strategy=count_strategy,
+            keyset=keyset,
+        )
 
-        user_follow = aliased(UserFollow)
-        target_user = aliased(User)
+        users = UserService._build_users(session, current_user_id, rows)
 
-        statement = (
-            UserService._select_users_with_follow_data(current_user_id)
-            .join(user_follow, col(user_follow.following_id) == col(User.id))
-            .join(
-                target_user,
-                and_(
-                    col(target_user.id) == col(user_follow.follower_id),
-                    col(target_user.username) == username,
-                ),
-            )
-        )
+        return users, meta
 
-        result, meta = paginate_query(session=session, statement=statement, pagination=pagination)
+    @staticmethod
+    @reads_from("replica")
+    def get_follow_list_version_by_username(
+        session: Session,
+        current_user_id: UUID,
+        username: str,
+        pagination: PaginationQuery,
+        followers: bool,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+    ) -> PageVersion:
+        """Version markers of a page of followers (or followings), for conditional requests."""
+        statement, keyset = UserService._select_follow_list(
+            username, followers, UserService._version_columns(current_user_id)
+        )
+        return get_page_version(
+            session=session,
+            statement=statement,
+            pagination=pagination,
+            keyset=keyset,
+            count_strategy=count_strategy,
+        )
 
-        users = [
-            UserPublic.model_validate(user).model_copy(
-                update={
-                    "is_following": is_following,
-                    "is_followed_by": is_followed_by,
-                }
+    @staticmethod
+    def get_shared_page(
+        version: PageVersion,
+    ) -> tuple[list[SharedJSON], PaginationMeta] | None:
+        """Rebuild a page from its version alone: the users' shared cores and follow flags.
+
+        None unless every user of the page was already serialized, for any viewer.
+        """
+        rows, meta = version
+        users = []
+        for *core_version, is_following, is_followed_by in rows:
+            user = get_shared(
+                UserPublic,
+                tuple(core_version),
+                {"is_following": is_following, "is_followed_by": is_followed_by},
             )
-            for user, followers_count, following_count, is_following, is_followed_by in result
-        ]
-
+            if user is None:
+                return None
+            users.append(user)
         return users, meta
 
     @staticmethod
-    def search(
+    @reads_from("replica")
+    def stream_follow_list_by_username(
         session: Session,
         current_user_id: UUID,
-        query: str,
+        username: str,
         pagination: PaginationQuery,
-    ) -> tuple[list[UserPublic], PaginationMeta]:
-        """Search users by name/username, ordered by a relevance score."""
-        search_term = query.strip()
-        if not search_term:
-            raise BadRequest(description="Search query is required")
+        followers: bool,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+    ) -> Generator[list[UserPublic], None, PaginationMeta]:
+        """Stream a page of followers (or followings) in batches (the meta is returned last)."""
+        statement, keyset = UserService._select_follow_list(username, followers)
+        return stream_query(
+            session=session,
+            statement=statement,
+            pagination=pagination,
+            build=lambda rows: UserService._build_users(session, current_user_id, rows),
+            count_strategy=count_strategy,
+            keyset=keyset,
+            batch_size=config.STREAM_BATCH_SIZE,
+        )
+
+    @staticmethod
+    @reads_from("replica")
+    def export_follow_list_by_username(
+        session: Session, current_user_id: UUID, username: str, followers: bool
+    ) -> Generator[list[UserPublic], None, None]:
+        """Stream every follower (or following) of a user in batches, from one cursor."""
+        # An unknown or deleted user is a 404, not an empty download
+        UserService.get_card_by_username(session, username)
+        statement, _ = UserService._select_follow_list(username, followers)
+        return stream_rows(
+            session=session,
+            statement=statement,
+            build=lambda rows: UserService._build_users(session, current_user_id, rows),
+            batch_size=config.STREAM_BATCH_SIZE,
+        )
+
+    @staticmethod
+    @cache
+    def _select_search() -> Select:
+        """Select active users matching a search query, ordered by a relevance score.
+
+        Built once, the search_term and search_prefix are bound at execution.
+        """
+        search_term = bindparam("search_term", type_=String)
+        search_prefix = bindparam("search_prefix", type_=String)
 
         MIN_SIMILARITY_THRESHOLD = 0.3
         RELEVANCE_SCORES = {
@@ -274,8 +553,8 @@ class UserService:
 
         exact_username_condition = User.username == search_term
         exact_name_condition = User.name == search_term
-        prefix_username_condition = col(User.username).ilike(search_term + "%")
-        prefix_name_condition = col(User.name).ilike(search_term + "%")
+        prefix_username_condition = col(User.username).ilike(search_prefix)
+        prefix_name_condition = col(User.name).ilike(search_prefix)
         similarity_username_condition = (
             func.similarity(User.username, search_term) > MIN_SIMILARITY_THRESHOLD
         )
@@ -309,7 +588,7 @@ class UserService:
         ).label("relevance_score")
 
         statement = (
-            UserService._select_users_with_follow_data(current_user_id)
+            UserService._select_active_user_rows()
             .where(
                 or_(
                     exact_username_condition,
@@ -323,17 +602,53 @@ class UserService:
             .order_by(relevance_score.desc(), col(User.username).asc())
         )
 
-        users, meta = paginate_query(session=session, statement=statement, pagination=pagination)
-        users = [
-            UserPublic.model_validate(user).model_copy(
-                update={
-                    "followers_count": followers_count,
-                    "following_count": following_count,
-                    "is_following": is_following,
-                    "is_followed_by": is_followed_by,
-                }
-            )
-            for user, followers_count, following_count, is_following, is_followed_by in users
-        ]
+        return statement
+
+    @staticmethod
+    def _search_params(query: str) -> dict[str, Any]:
+        """Execution parameters of the search statement."""
+        search_term = query.strip()
+        if not search_term:
+            raise BadRequest(description="Search query is required")
+        return {"search_term": search_term, "search_prefix": search_term + "%"}
+
+    @staticmethod
+    @reads_from("replica")
+    def search(
+        session: Session,
+        current_user_id: UUID,
+        query: str,
+        pagination: PaginationQuery,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+    ) -> tuple[list[UserPublic], PaginationMeta]:
+        """Search users by name/username, ordered by a relevance score."""
+        rows, meta = paginate_query(
+            session=session,
+            statement=UserService._select_search(),
+            pagination=pagination,
+            count_strategy=count_strategy,
+            params=UserService._search_params(query),
+        )
+        users = UserService._build_users(session, current_user_id, rows)
 
         return users, meta
+
+    @staticmethod
+    @reads_from("replica")
+    def stream_search(
+        session: Session,
+        current_user_id: UUID,
+        query: str,
+        pagination: PaginationQuery,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+    ) -> Generator[list[UserPublic], None, PaginationMeta]:
+        """Stream a page of search results in batches (the meta is returned last)."""
+        return stream_query(
+            session=session,
+            statement=UserService._select_search(),
+            pagination=pagination,
+            build=lambda rows: UserService._build_users(session, current_user_id, rows),
+            count_strategy=count_strategy,
+            batch_size=config.STREAM_BATCH_SIZE,
+            params=UserService._search_params(query),
+        )
@@ -0,0 +1,35 @@
+import hashlib
+from typing import Any, Callable
+
+from flask import Response, current_app, request
+
+from app.middlewares.compression import encoded_etag, negotiate_encoding
+
+
+def make_etag(*markers: Any) -> str:
+    """Strong ETag of a resource from its version markers (ids, timestamps, counters...)"""
+    return hashlib.blake2b(repr(markers).encode(), digest_size=16).hexdigest()
+
+
+def conditional_response(etag: str, build: Callable[[], Response]) -> Response:
+    """Answer 304 Not Modified when the client already has this ETag, else build the response.
+
+    The ETag comes from cheap version markers, so `build` (the expensive queries and the
+    serialization) only runs when the resource changed. A client holding the compressed
+    representation sends its encoded ETag back, which matches too.
+    """
+    encoding = negotiate_encoding()
+    candidates = [etag] if encoding is None else [etag, encoded_etag(etag, encoding)]
+    matched = next((tag for tag in candidates if request.if_none_match.contains(tag)), None)
+
+    if matched is not None:
+        response = current_app.response_class(status=304)
+        response.set_etag(matched)
+        response.vary.add("Accept-Encoding")
+    else:
+        response = build()
+        response.set_etag(etag)
+
+    # Responses depend on the viewer and must always be revalidated
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
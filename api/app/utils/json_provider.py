@@ -0,0 +1,31 @@
+from typing import Any
+
+from flask import Response, current_app
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+from pydantic_core import from_json, to_json
+
+
+class PydanticJSONProvider(JSONProvider):
+    """Flask JSON provider backed by pydantic-core's Rust encoder and decoder.
+
+    UUID, datetime/date (ISO 8601), Enum and Pydantic models are encoded natively, other
+    types fall back to Flask's default conversions.
+    """
+
+    mimetype = "application/json"
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize data as JSON (Flask's json.dumps keyword arguments are ignored)"""
+        return self.dumps_bytes(obj).decode()
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        """Serialize data as compact JSON bytes"""
+        return to_json(obj, fallback=DefaultJSONProvider.default)
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        """Deserialize JSON, raises ValueError on invalid documents"""
+        return from_json(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return current_app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
@@ -0,0 +1,96 @@
+import time
+from threading import Event, Lock
+from typing import Any, Callable, Generic, Hashable, TypeVar
+
+from app.config import get_config
+from app.utils.cache import LRUCache
+
+config = get_config()
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class _Flight:
+    """A computation in progress, awaited by the concurrent requests for its key"""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = Event()
+        self.value: Any = None
+        self.error: BaseException | None = None
+
+
+class MicroCache(Generic[K, V]):
+    """Values kept a few seconds, computed once however many requests want them at once.
+
+    The first request for a missing key computes it, the concurrent ones wait for its
+    result (or its error) instead of stampeding the database. With a TTL of 0 nothing is
+    kept, only concurrent requests share a computation.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self._values: LRUCache[K, tuple[float, V]] = LRUCache(max_entries=max_entries)
+        self._flights: dict[K, _Flight] = {}
+        # Guards the flights and the counters, every request thread updates them
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_compute(self, key: K, compute: Callable[[], V]) -> V:
+        entry = self._values.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            with self._lock:
+                self.hits += 1
+            return entry[1]
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+            if self.ttl > 0:
+                self._values.set(key, (time.monotonic() + self.ttl, flight.value))
+            return flight.value
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def delete(self, key: K) -> None:
+        """Forget a key, after a write this process knows about"""
+        self._values.delete(key)
+
+    def stats(self) -> dict[str, int]:
+        """Hits, misses (computations) and requests that waited on another's computation"""
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
+
+_caches: dict[str, MicroCache[Any, Any]] = {}
+
+
+def microcache(route: str) -> MicroCache[Any, Any]:
+    """The micro cache of a route, kept for its configured TTL (MICROCACHE_TTLS)"""
+    cache = _caches.get(route)
+    if cache is None:
+        ttl = config.MICROCACHE_TTLS.get(route, 0.0)
+        cache = _caches[route] = MicroCache(ttl, config.MICROCACHE_MAX_ENTRIES)
+    return cache
@@ -1,35 +1,345 @@
-from typing import TypeVar, Union
+import base64
+import json
+import weakref
+from datetime import datetime
+from enum import StrEnum
+from typing import Any, Callable, Generator, NamedTuple, TypeVar, Union
+from uuid import UUID
 
+from sqlalchemy import Integer, bindparam, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session as SqlAlchemySession
+from sqlalchemy.sql.expression import ClauseElement, Executable
 from sqlmodel import func, select
 from sqlmodel.sql.expression import Select, SelectOfScalar
+from werkzeug.exceptions import BadRequest
 
 from app.database import Session
 from app.models import PaginationMeta, PaginationQuery
 
 T = TypeVar("T")
+U = TypeVar("U")
+
+# (created_at, id) columns a statement is ordered by, both descending
+Keyset = tuple[Any, Any]
+
+# Names the position of a cursor is bound to, in keyset order
+_CURSOR_KEYS = ("cursor_created_at", "cursor_id")
+
+
+class CountStrategy(StrEnum):
+    """How paginate_query computes the total count of a paginated query"""
+
+    # Separate COUNT(*) round trip over the whole query
+    EXACT = "exact"
+    # count(*) OVER () folded into the data query
+    WINDOW = "window"
+    # Planner row estimate, cheap but approximate on huge sets
+    ESTIMATED = "estimated"
+    # No total at all, for infinite scroll clients
+    NONE = "none"
+
+
+def encode_cursor(created_at: datetime, id: UUID) -> str:
+    """Encode a (created_at, id) keyset position into an opaque cursor"""
+    payload = json.dumps([created_at.isoformat(), str(id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """Decode an opaque cursor back into its (created_at, id) keyset position"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(payload)
+        return datetime.fromisoformat(created_at), UUID(id)
+    except (ValueError, TypeError) as error:
+        raise BadRequest(description="Invalid pagination cursor") from error
+
+
+def keyset_condition(keyset: Keyset) -> Any:
+    """Condition selecting the rows after a cursor in a keyset ordered statement.
+
+    The position is bound at execution (cursor_params), so the condition can be part of a
+    statement built once.
+    """
+    bound_position = [
+        bindparam(key, type_=column.type) for key, column in zip(_CURSOR_KEYS, keyset, strict=True)
+    ]
+    return tuple_(*keyset) < tuple_(*bound_position)
+
+
+def cursor_params(cursor: str) -> dict[str, Any]:
+    """Execution parameters of the position of a cursor, for keyset_condition"""
+    return dict(zip(_CURSOR_KEYS, decode_cursor(cursor), strict=True))
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) wrapper so the statement keeps its usual bind processing"""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Any):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element: _Explain, compiler: Any, **kwargs: Any) -> str:
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kwargs)}"
+
+
+def estimate_count(
+    session: Session,
+    statement: Union[SelectOfScalar[T], Select[T]],
+    params: dict[str, Any] | None = None,
+) -> int:
+    """Estimate the number of rows of a query from the Postgres planner (no scan)"""
+    plan = session.connection().execute(_Explain(statement), params).scalar_one()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+# Data statements of the pages of a statement, by shape. OFFSET, LIMIT and the cursor
+# position are bound at execution, so a statement built once (with its parameters bound
+# at execution too) gets the same data statement object, and its memoized cache key, on
+# every request. Entries go away with their statement.
+_data_statements: weakref.WeakKeyDictionary[Any, dict[tuple[bool, bool, bool], Any]] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _data_statement(
+    statement: Any, keyset: Keyset | None, use_window_count: bool, use_cursor: bool
+) -> Any:
+    """Statement of a page of rows, with the window count and keyset columns if needed"""
+    shapes = _data_statements.get(statement)
+    if shapes is None:
+        shapes = _data_statements[statement] = {}
+    shape = (keyset is not None, use_window_count, use_cursor)
+    data_statement = shapes.get(shape)
+    if data_statement is not None:
+        return data_statement
+
+    data_statement = statement
+    extra_columns: list[Any] = []
+    if use_window_count:
+        # Evaluated after GROUP BY and before LIMIT, so it counts every row of the result
+        extra_columns.append(func.count().over().label("_total_count"))
+    if keyset is not None:
+        if use_cursor:
+            data_statement = data_statement.where(keyset_condition(keyset))
+        extra_columns.extend(keyset)
+    if extra_columns:
+        data_statement = data_statement.add_columns(*extra_columns)
+
+    data_statement = data_statement.offset(bindparam("page_offset", type_=Integer)).limit(
+        bindparam("page_limit", type_=Integer)
+    )
+    shapes[shape] = data_statement
+    return data_statement
+
+
+class _Page:
+    """Data statement of a page and what is needed to read its rows back"""
+
+    def __init__(
+        self,
+        session: Session,
+        statement: Union[SelectOfScalar[Any], Select[Any]],
+        pagination: PaginationQuery,
+        keyset: Keyset | None,
+        count_strategy: CountStrategy,
+        params: dict[str, Any] | None = None,
+    ):
+        self.session = session
+        self.statement = statement
+        self.pagination = pagination
+        self.keyset = keyset
+        self.params = dict(params or {})
+        self.width = len(statement.selected_columns)
+
+        use_cursor = keyset is not None and pagination.cursor is not None
+        self.use_window_count = count_strategy == CountStrategy.WINDOW and not use_cursor
+
+        self.total_count = None
+        self.offset = 0
+        if not use_cursor:
+            self.offset = (pagination.page - 1) * pagination.items_per_page
+            if count_strategy == CountStrategy.EXACT:
+                self.total_count = self.count()
+            elif count_strategy == CountStrategy.ESTIMATED:
+                self.total_count = estimate_count(session, statement, self.params)
+        else:
+            self.params.update(cursor_params(pagination.cursor or ""))
+
+        self.has_extra_columns = self.use_window_count or keyset is not None
+        self.data_statement = _data_statement(statement, keyset, self.use_window_count, use_cursor)
+        # Fetch one extra row to know if there is a next page without relying on the count
+        self.params.update(page_offset=self.offset, page_limit=pagination.items_per_page + 1)
+
+    def count(self) -> int:
+        """Exact number of rows of the whole query, in a separate round trip"""
+        total_count_statement = select(func.count("*")).select_from(self.statement.subquery())
+        return self.session.scalar(total_count_statement, self.params) or 0
+
+    def execute(self, **execution_options: Any) -> Any:
+        """Execute the data statement"""
+        if self.has_extra_columns:
+            # Plain ORM execution, session.exec would reduce a SelectOfScalar to its first column
+            return SqlAlchemySession.execute(
+                self.session,
+                self.data_statement,
+                self.params,
+                execution_options=execution_options,
+            )
+        return self.session.exec(
+            self.data_statement, params=self.params, execution_options=execution_options
+        )
+
+    def data(self, rows: list[Any]) -> list[Any]:
+        """Strip the window and keyset columns from rows"""
+        if not self.has_extra_columns:
+            return rows
+        if isinstance(self.statement, SelectOfScalar):
+            return [row[0] for row in rows]
+        return [tuple(row[: self.width]) for row in rows]
+
+    def meta(self, first_row: Any, last_row: Any, has_more: bool) -> PaginationMeta:
+        """Pagination meta of the page, from its first and last rows (None if empty)"""
+        total_count = self.total_count
+        if self.use_window_count:
+            if first_row is not None:
+                total_count = first_row[self.width]
+            elif self.offset:
+                # Past the last page, the window has no row to report the total on
+                total_count = self.count()
+            else:
+                total_count = 0
+
+        next_cursor = None
+        if self.keyset is not None and has_more and last_row is not None:
+            next_cursor = encode_cursor(*last_row[-len(self.keyset) :])
+
+        return PaginationMeta(
+            page=self.pagination.page,
+            items_per_page=self.pagination.items_per_page,
+            cursor=self.pagination.cursor,
+            total_count=total_count,
+            has_more=has_more,
+            next_cursor=next_cursor,
+        )
 
 
 def paginate_query(
     session: Session,
     statement: Union[SelectOfScalar[T], Select[T]],
     pagination: PaginationQuery,
+    keyset: Keyset | None = None,
+    count_strategy: CountStrategy = CountStrategy.EXACT,
+    params: dict[str, Any] | None = None,
+    execution_options: dict[str, Any] | None = None,
 ) -> tuple[list[T], PaginationMeta]:
-    """Paginate a query"""
-    total_count_statement = select(func.count("*")).select_from(statement.subquery())
-    total_count = session.scalar(total_count_statement) or 0
+    """Paginate a query.
+
+    When a keyset is given, the statement must be ordered by it (descending). Every
+    page then exposes a `next_cursor`, and a request carrying a cursor seeks directly
+    past it instead of counting and skipping the previous pages with OFFSET.
+
+    The `count_strategy` decides how `total_count` is obtained on offset pages
+    (cursor pages never count). `has_more` never depends on it.
+
+    `params` are bound at execution to the parameters of a statement built once, and
+    `execution_options` apply to the data statement without copying it.
+    """
+    page = _Page(session, statement, pagination, keyset, count_strategy, params)
+
+    rows = list(page.execute(**(execution_options or {})).all())
+    has_more = len(rows) > pagination.items_per_page
+    rows = rows[: pagination.items_per_page]
+
+    meta = page.meta(rows[0] if rows else None, rows[-1] if rows else None, has_more)
 
-    offset = (pagination.page - 1) * pagination.items_per_page
+    return page.data(rows), meta
 
-    data_statement = statement.offset(offset).limit(pagination.items_per_page)
-    data = list(session.exec(data_statement).all())
 
-    has_more = (offset + len(data)) < total_count
+class PageVersion(NamedTuple):
+    """Version markers of the rows of a page, for conditional requests, and its meta"""
 
-    meta = PaginationMeta(
-        page=pagination.page,
-        items_per_page=pagination.items_per_page,
-        total_count=total_count,
-        has_more=has_more,
+    rows: tuple[tuple[Any, ...], ...]
+    meta: PaginationMeta
+
+
+def get_page_version(
+    session: Session,
+    statement: Select[Any],
+    pagination: PaginationQuery,
+    keyset: Keyset | None = None,
+    count_strategy: CountStrategy = CountStrategy.EXACT,
+    params: dict[str, Any] | None = None,
+) -> PageVersion:
+    """Paginate a statement selecting version columns, as paginate_query would its rows"""
+    rows, meta = paginate_query(
+        session=session,
+        statement=statement,
+        pagination=pagination,
+        keyset=keyset,
+        count_strategy=count_strategy,
+        params=params,
     )
+    return PageVersion(tuple(tuple(row) for row in rows), meta)
+
+
+def stream_rows(
+    session: Session,
+    statement: Union[SelectOfScalar[T], Select[T]],
+    build: Callable[[list[T]], list[U]],
+    batch_size: int = 500,
+    params: dict[str, Any] | None = None,
+) -> Generator[list[U], None, None]:
+    """Read every row of a query from one server-side cursor, yielding built batches"""
+    result = session.exec(statement, params=params, execution_options={"yield_per": batch_size})
+    try:
+        for rows in result.partitions():
+            yield build(list(rows))
+    finally:
+        # Release the server-side cursor when the stream is abandoned
+        result.close()
+
+
+def stream_query(
+    session: Session,
+    statement: Union[SelectOfScalar[T], Select[T]],
+    pagination: PaginationQuery,
+    build: Callable[[list[T]], list[U]],
+    keyset: Keyset | None = None,
+    count_strategy: CountStrategy = CountStrategy.EXACT,
+    batch_size: int = 500,
+    params: dict[str, Any] | None = None,
+) -> Generator[list[U], None, PaginationMeta]:
+    """Paginate a query like paginate_query, reading the page from a server-side cursor.
+
+    Rows are fetched `batch_size` at a time and each batch is yielded once passed through
+    `build`, so only one batch is held in memory. The pagination meta, only known once
+    the page is read, is the generator's return value.
+    """
+    page = _Page(session, statement, pagination, keyset, count_strategy, params)
+    result = page.execute(yield_per=batch_size)
+
+    first_row = last_row = None
+    remaining = pagination.items_per_page
+    has_more = False
+    try:
+        for rows in result.partitions():
+            if len(rows) > remaining:
+                has_more = True
+                rows = rows[:remaining]
+            if rows:
+                first_row = rows[0] if first_row is None else first_row
+                last_row = rows[-1]
+                remaining -= len(rows)
+                yield build(page.data(list(rows)))
+            if has_more:
+                break
+    finally:
+        # Release the server-side cursor when the stream is abandoned or cut short
+        result.close()
 
-    return data, meta
+    return page.meta(first_row, last_row, has_more)
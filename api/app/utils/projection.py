@@ -0,0 +1,23 @@
+from typing import Any, Sequence
+
+from pydantic import BaseModel
+from sqlalchemy import inspect
+
+
+class Projection:
+    """Columns of a table model (or an alias of it) backing the fields of a response schema.
+
+    Selecting these columns instead of the entity skips ORM hydration and the identity map,
+    rows are turned back into plain dicts keyed by field name. Their values come typed from
+    our own columns, so the schema is built from them with model_construct, without
+    validation.
+    """
+
+    def __init__(self, entity: Any, schema: type[BaseModel], prefix: str = ""):
+        mapper = inspect(entity).mapper
+        self.fields = [name for name in schema.model_fields if name in mapper.columns]
+        self.columns = [getattr(entity, name).label(prefix + name) for name in self.fields]
+
+    def to_dict(self, row: Sequence[Any], start: int = 0) -> dict[str, Any]:
+        """Map the projected columns of a row, found from `start`, to their field names"""
+        return dict(zip(self.fields, row[start : start + len(self.fields)], strict=True))
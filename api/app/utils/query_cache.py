@@ -0,0 +1,265 @@
+import hashlib
+import pickle
+import time
+from abc import ABC, abstractmethod
+from threading import Lock
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy import Table, event
+from sqlalchemy.orm import ORMExecuteState, loading, object_mapper
+from sqlalchemy.orm import Session as SqlAlchemySession
+from sqlalchemy.sql import visitors
+from sqlmodel import Session
+
+from app.config import get_config
+from app.utils.cache import LRUCache
+from app.utils.logging import logger
+
+config = get_config()
+
+# Session.info key of the tables written by the session's ongoing transaction
+_WRITTEN_TABLES = "query_cache_written_tables"
+
+
+class QueryCacheBackend(ABC):
+    """Storage of the cached results and of the table versions they depend on"""
+
+    @abstractmethod
+    def get(self, key: str) -> bytes | None:
+        """A cached result, None when missing or expired"""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes) -> None:
+        """Cache a result for the backend's TTL"""
+
+    @abstractmethod
+    def get_versions(self, tables: Sequence[str]) -> list[int]:
+        """Current versions of tables, in the same order (0 for a never written table)"""
+
+    @abstractmethod
+    def bump_versions(self, tables: Iterable[str]) -> None:
+        """Move tables to a new version, results keyed on the previous ones are never read"""
+
+
+class MemoryBackend(QueryCacheBackend):
+    """In-process LRU of results expiring after a TTL.
+
+    Versions are per process: with several workers, a write only reaches the caches of
+    the other workers once their entries expire. Statements cached under a version marker
+    (see QueryCache) are never served older than it.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.ttl = ttl
+        self._results: LRUCache[str, tuple[float, bytes]] = LRUCache(max_entries=max_entries)
+        self._versions: dict[str, int] = {}
+        self._lock = Lock()
+
+    def get(self, key: str) -> bytes | None:
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._results.delete(key)
+            return None
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        self._results.set(key, (time.monotonic() + self.ttl, value))
+
+    def get_versions(self, tables: Sequence[str]) -> list[int]:
+        return [self._versions.get(table, 0) for table in tables]
+
+    def bump_versions(self, tables: Iterable[str]) -> None:
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+
+class NetworkBackend(QueryCacheBackend):
+    """Cache shared by every process on a Redis compatible server (GET, SET PX, MGET, INCR).
+
+    Results are pickled, the server must be trusted. Its errors never fail a request,
+    they are logged and the query runs uncached.
+    """
+
+    def __init__(self, client: Any, ttl: float, prefix: str = "query-cache:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, ttl: float) -> "NetworkBackend":
+        try:
+            import redis  # pyright: ignore[reportMissingImports]
+        except ImportError as error:
+            raise RuntimeError("The network query cache needs the redis package") from error
+        return cls(redis.Redis.from_url(url), ttl)
+
+    def get(self, key: str) -> bytes | None:
+        try:
+            return self.client.get(f"{self.prefix}result:{key}")
+        except Exception as error:
+            logger.warning(f"Query cache read failed: {error}")
+            return None
+
+    def set(self, key: str, value: bytes) -> None:
+        try:
+            self.client.set(f"{self.prefix}result:{key}", value, px=int(self.ttl * 1000))
+        except Exception as error:
+            logger.warning(f"Query cache write failed: {error}")
+
+    def get_versions(self, tables: Sequence[str]) -> list[int]:
+        keys = [f"{self.prefix}version:{table}" for table in tables]
+        return [int(version or 0) for version in self.client.mget(keys)]
+
+    def bump_versions(self, tables: Iterable[str]) -> None:
+        try:
+            for table in tables:
+                self.client.incr(f"{self.prefix}version:{table}")
+        except Exception as error:
+            # Results of these tables stay cached until their TTL
+            logger.error(f"Query cache invalidation failed: {error}")
+
+
+class QueryCache:
+    """Cache of the results of statements executed with the `query_cache` option.
+
+    Results are keyed on the compiled statement, its parameters and the versions of the
+    tables it reads. Every commit bumps the versions of the tables its transaction wrote
+    to (DML statements and flushed objects), so the results depending on them are never
+    read again. A session reads its own uncommitted writes uncached.
+
+    Usage: `session.exec(statement.execution_options(query_cache=True))`. Any other value
+    of the option, such as the version markers behind an ETag, joins the key: the result
+    is then never older than that version, even when a write on another worker has not
+    bumped the versions of a per-process backend yet.
+    """
+
+    def __init__(self, backend: QueryCacheBackend, max_result_size: int):
+        self.backend = backend
+        self.max_result_size = max_result_size
+        # (compiled SQL, tables read) by statement structure
+        self._statements: LRUCache[Any, tuple[str, tuple[str, ...]]] = LRUCache(max_entries=1024)
+
+    def install(self) -> None:
+        event.listen(Session, "do_orm_execute", self._do_orm_execute)
+        event.listen(Session, "after_flush", self._after_flush)
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_rollback", self._after_rollback)
+
+    def uninstall(self) -> None:
+        event.remove(Session, "do_orm_execute", self._do_orm_execute)
+        event.remove(Session, "after_flush", self._after_flush)
+        event.remove(Session, "after_commit", self._after_commit)
+        event.remove(Session, "after_rollback", self._after_rollback)
+
+    @staticmethod
+    def _written_tables(session: SqlAlchemySession) -> set[str]:
+        return session.info.setdefault(_WRITTEN_TABLES, set())
+
+    def _describe(self, statement: Any, cache_key: Any) -> tuple[str, tuple[str, ...]]:
+        """Compiled SQL of a statement and the tables it reads"""
+        description = self._statements.get(cache_key.key)
+        if description is None:
+            tables = {
+                element.name
+                for element in visitors.iterate(statement)
+                if isinstance(element, Table)
+            }
+            description = (str(statement), tuple(sorted(tables)))
+            self._statements.set(cache_key.key, description)
+        return description
+
+    def _do_orm_execute(self, orm_context: ORMExecuteState) -> Any:
+        if orm_context.is_insert or orm_context.is_update or orm_context.is_delete:
+            table = getattr(orm_context.statement, "table", None)
+            if isinstance(table, Table):
+                self._written_tables(orm_context.session).add(table.name)
+            return None
+
+        options = orm_context.execution_options
+        if not orm_context.is_select or not options.get("query_cache") or "yield_per" in options:
+            return None
+
+        statement: Any = orm_context.statement
+        # Private but stable API, the one the SQLAlchemy caching examples rely on
+        cache_key = statement._generate_cache_key()
+        if cache_key is None:
+            return None
+
+        sql, tables = self._describe(statement, cache_key)
+        if self._written_tables(orm_context.session).intersection(tables):
+            return None
+
+        parameters: Any = orm_context.parameters or {}
+        values = tuple(
+            parameters.get(bindparam.key, bindparam.effective_value)
+            for bindparam in cache_key.bindparams
+        )
+        try:
+            versions = self.backend.get_versions(tables)
+        except Exception as error:
+            logger.warning(f"Query cache versions read failed: {error}")
+            return None
+        marker = options["query_cache"]
+        key = hashlib.blake2b(
+            repr((sql, values, versions, marker)).encode(), digest_size=20
+        ).hexdigest()
+
+        cached = self.backend.get(key)
+        if cached is not None:
+            frozen_result = pickle.loads(cached)
+        else:
+            frozen_result = orm_context.invoke_statement().freeze()
+            # Pickled right away, later changes to the loaded objects don't leak in the cache
+            value = pickle.dumps(frozen_result)
+            if len(value) <= self.max_result_size:
+                self.backend.set(key, value)
+
+        # Entities are merged into the session as if they had been loaded by it
+        return loading.merge_frozen_result(
+            orm_context.session, statement, frozen_result, load=False
+        )()
+
+    def _after_flush(self, session: SqlAlchemySession, flush_context: Any) -> None:
+        written_tables = self._written_tables(session)
+        for instance in (*session.new, *session.dirty, *session.deleted):
+            written_tables.update(table.name for table in object_mapper(instance).tables)
+
+    def _after_commit(self, session: SqlAlchemySession) -> None:
+        written_tables = session.info.pop(_WRITTEN_TABLES, None)
+        if written_tables:
+            self.backend.bump_versions(sorted(written_tables))
+
+    def _after_rollback(self, session: SqlAlchemySession) -> None:
+        session.info.pop(_WRITTEN_TABLES, None)
+
+
+_query_cache: QueryCache | None = None
+
+
+def install_query_cache(backend: QueryCacheBackend | None = None) -> QueryCache | None:
+    """Install the query cache on every session, with the configured backend by default"""
+    global _query_cache
+    if backend is None:
+        if config.QUERY_CACHE_BACKEND == "memory":
+            backend = MemoryBackend(config.QUERY_CACHE_MAX_ENTRIES, config.QUERY_CACHE_TTL)
+        elif config.QUERY_CACHE_BACKEND == "network":
+            backend = NetworkBackend.from_url(config.QUERY_CACHE_URL, config.QUERY_CACHE_TTL)
+        else:
+            return None
+
+    uninstall_query_cache()
+    _query_cache = QueryCache(backend, config.QUERY_CACHE_MAX_RESULT_SIZE)
+    _query_cache.install()
+    return _query_cache
+
+
+def uninstall_query_cache() -> None:
+    """Remove the installed query cache, statements then always hit the database"""
+    global _query_cache
+    if _query_cache is not None:
+        _query_cache.uninstall()
+        _query_cache = None
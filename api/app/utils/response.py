@@ -1,11 +1,14 @@
-from typing import Optional
+import zlib
+from contextlib import closing
+from typing import Callable, Generator, Iterator, Optional, Sequence
 
-from flask import Response, make_response
+from flask import Response, current_app, make_response
 from flask_openapi3.types import ResponseDict
 from pydantic import Field, ValidationError
 from pydantic_core import ErrorDetails
 
-from app.models import ApiBaseModel
+from app.database import Session, get_read_session
+from app.models import ApiBaseModel, PaginationMeta
 
 
 # Standard API error models
@@ -58,13 +61,89 @@ abp_responses = ResponseDict(
 
 
 def success_response(
-    data: dict | list,
+    data: dict | list | bytes,
     status: int = 200,
 ) -> Response:
-    """Create a standardized success response"""
+    """Create a standardized success response (bytes are sent as already serialized JSON)"""
+    if isinstance(data, bytes):
+        return current_app.response_class(data, status=status, mimetype="application/json")
     return make_response(data, status)
 
 
+def stream_list_response(
+    stream_page: Callable[[Session], Generator[Sequence[ApiBaseModel], None, PaginationMeta]],
+) -> Response:
+    """Create a chunked `{"data": [...], "meta": {...}}` response from a page stream.
+
+    The session stays open while the body is sent. The first batch is read before
+    returning, so errors (unknown user, invalid cursor...) still get a proper error
+    response rather than a truncated body.
+    """
+
+    def generate() -> Generator[bytes, None, None]:
+        with get_read_session() as session, closing(stream_page(session)) as page:
+            chunk, separator = b'{"data":[', b""
+            while True:
+                try:
+                    batch = next(page)
+                except StopIteration as stop:
+                    meta: PaginationMeta = stop.value
+                    break
+                if batch:
+                    yield chunk + separator + b",".join(item.to_json() for item in batch)
+                    chunk, separator = b"", b","
+
+            yield chunk + b'],"meta":' + meta.to_json() + b"}"
+
+    return current_app.response_class(_started(generate()), mimetype="application/json")
+
+
+def ndjson_response(
+    export: Callable[[Session], Iterator[Sequence[ApiBaseModel]]],
+    filename: str,
+    gzip: bool = False,
+) -> Response:
+    """Create a streamed newline-delimited JSON download, one item per line.
+
+    Like stream_list_response, the session stays open while the body is sent and the
+    first batch is read before returning. With gzip, the body is a .gz file compressed
+    on the fly.
+    """
+
+    def generate() -> Generator[bytes, None, None]:
+        # wbits=31 writes a gzip container (header and trailer) instead of raw zlib
+        compressor = zlib.compressobj(wbits=31) if gzip else None
+        with get_read_session() as session:
+            for batch in export(session):
+                chunk = b"".join(item.to_json() + b"\n" for item in batch)
+                yield compressor.compress(chunk) if compressor else chunk
+
+        if compressor:
+            yield compressor.flush()
+
+    if gzip:
+        filename, mimetype = f"{filename}.ndjson.gz", "application/gzip"
+    else:
+        filename, mimetype = f"{filename}.ndjson", "application/x-ndjson"
+
+    return current_app.response_class(
+        _started(generate()),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _started(body: Generator[bytes, None, None]) -> Generator[bytes, None, None]:
+    """Run a body generator up to its first chunk now, while errors can still be answered"""
+    first_chunk = next(body, b"")
+
+    def stream() -> Generator[bytes, None, None]:
+        yield first_chunk
+        yield from body
+
+    return stream()
+
+
 def error_response(
     message: str = "An error occurred",
     status: int = 500,
@@ -0,0 +1,67 @@
+import gc
+import os
+import time
+
+from app.config import get_config
+from app.database import dispose_engines, pool_stats, warm_pools
+from app.utils.logging import logger
+
+config = get_config()
+
+
+def prepare_fork() -> None:
+    """Get the master ready to fork workers sharing the memory of the preloaded app.
+
+    Its connections are closed, a socket must not be used by several processes. The
+    objects left by the app creation move to a permanent generation the collections of
+    the workers never visit, updating their headers would copy the pages holding them.
+    Collections should be disabled in the master until then (gc.disable()), freed
+    objects would leave holes that new objects fill in every worker.
+    """
+    dispose_engines()
+    gc.freeze()
+
+
+def init_worker() -> None:
+    """Start a forked worker: forget the inherited pools, collect its own objects again"""
+    dispose_engines(close=False)
+    pool_stats.reset()
+    gc.enable()
+
+
+def warm_worker(started_at: float) -> None:
+    """Open the worker's connections ahead of its first requests, then log its boot.
+
+    The boot time runs from started_at, a perf_counter() value taken right after the fork.
+    """
+    try:
+        warm_pools(config.DB_POOL_WARM)
+    except Exception as error:
+        # Connections are opened on demand instead
+        logger.warning(f"Connection pool warm up failed: {error}")
+
+    boot_ms = (time.perf_counter() - started_at) * 1000
+    memory = ", ".join(f"{name}={kib / 1024:.1f} MiB" for name, kib in memory_usage().items())
+    logger.info(f"Worker {os.getpid()} ready in {boot_ms:.0f} ms ({memory})")
+
+
+def memory_usage() -> dict[str, int]:
+    """Resident (rss), proportional (pss) and private (uss) memory of this process in KiB.
+
+    Pages shared with the master and the other workers count in rss only, uss is what the
+    process costs on its own. Empty where /proc/self/smaps_rollup is missing (not Linux).
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as smaps:
+            fields = {
+                name: int(value.split()[0])
+                for name, _, value in (line.partition(":") for line in smaps)
+                if value.strip().endswith("kB")
+            }
+    except OSError:
+        return {}
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
@@ -0,0 +1,85 @@
+from typing import Any
+
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from app.utils.cache import LRUCache
+
+# Serialized viewer-independent cores by (model class, core version), shared by every
+# viewer of a popular post or profile. Sized by install_shared_cores: app.models imports
+# this module, which must not load the config before the tests set its environment
+_cores: LRUCache[tuple[Any, ...], bytes] = LRUCache(max_entries=0)
+
+# '"alias":' key prefixes of viewer fields by (model class, field name)
+_keys: dict[tuple[type, str], bytes] = {}
+
+
+def _key(model_class: type[BaseModel], name: str) -> bytes:
+    key = _keys.get((model_class, name))
+    if key is None:
+        field = model_class.model_fields[name]
+        key = _keys[(model_class, name)] = to_json(field.alias or name) + b":"
+    return key
+
+
+def _merge(model_class: type[BaseModel], core: bytes, overlay: dict[str, Any]) -> bytes:
+    """Append the viewer fields (plain values) to a serialized core"""
+    fields = b",".join(_key(model_class, name) + to_json(value) for name, value in overlay.items())
+    if core == b"{}":
+        return b"{" + fields + b"}"
+    return core[:-1] + b"," + fields + b"}"
+
+
+class SharedJSON:
+    """A cached core and a viewer's fields, serialized like the model they come from"""
+
+    __slots__ = ("model_class", "core", "overlay")
+
+    def __init__(self, model_class: type[BaseModel], core: bytes, overlay: dict[str, Any]):
+        self.model_class = model_class
+        self.core = core
+        self.overlay = overlay
+
+    def to_json(self) -> bytes:
+        return _merge(self.model_class, self.core, self.overlay)
+
+
+def split_to_json(model: BaseModel, version: tuple[Any, ...], viewer_fields: set[str]) -> bytes:
+    """Serialize a model as its shared core, cached for other viewers, and its viewer fields"""
+    if not _cores.max_entries:
+        return model.__pydantic_serializer__.to_json(model, by_alias=True)
+
+    model_class = type(model)
+    cache_key = (model_class, *version)
+
+    core = _cores.get(cache_key)
+    if core is None:
+        core = model.__pydantic_serializer__.to_json(model, by_alias=True, exclude=viewer_fields)
+        _cores.set(cache_key, core)
+
+    return _merge(model_class, core, {name: getattr(model, name) for name in viewer_fields})
+
+
+def get_shared(
+    model_class: type[BaseModel], version: tuple[Any, ...], overlay: dict[str, Any]
+) -> SharedJSON | None:
+    """A model's JSON rebuilt from the core cached for its version, None if not cached.
+
+    The version and overlay come from cheap version queries, so a popular post or profile
+    already serialized for another viewer is sent without loading it again.
+    """
+    core = _cores.get((model_class, *version))
+    if core is None:
+        return None
+    return SharedJSON(model_class, core, overlay)
+
+
+def install_shared_cores(max_entries: int) -> None:
+    """Cache up to `max_entries` serialized cores (CORE_CACHE_ENTRIES), 0 disables them"""
+    _cores.clear()
+    _cores.max_entries = max_entries
+
+
+def clear_cores() -> None:
+    """Forget every cached core"""
+    _cores.clear()
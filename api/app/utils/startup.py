@@ -0,0 +1,30 @@
+import time
+
+from app.utils.logging import logger
+
+
+class StartupTimer:
+    """Durations of the steps of the app creation, to catch cold start regressions"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self._step_started_at = self.started_at
+        self.steps: dict[str, float] = {}
+
+    def step(self, name: str) -> None:
+        """Record the step ending now, since the previous one ended"""
+        now = time.perf_counter()
+        self.steps[name] = (now - self._step_started_at) * 1000
+        self._step_started_at = now
+
+    def finish(self, budget_ms: float) -> dict[str, float]:
+        """Log the steps (a warning past the budget) and return them in ms, with the total"""
+        total_ms = (time.perf_counter() - self.started_at) * 1000
+        steps = ", ".join(f"{name}={duration:.0f} ms" for name, duration in self.steps.items())
+        if budget_ms and total_ms > budget_ms:
+            logger.warning(
+                f"App created in {total_ms:.0f} ms, over the {budget_ms:.0f} ms budget ({steps})"
+            )
+        else:
+            logger.info(f"App created in {total_ms:.0f} ms ({steps})")
+        return {**self.steps, "total": total_ms}
@@ -0,0 +1,339 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Any, Generator, Iterable, NamedTuple
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as SqlAlchemySession
+from sqlalchemy.orm.attributes import get_history
+from sqlmodel import Session
+
+from app.config import get_config
+from app.models import User
+
+config = get_config()
+
+# Session.info keys of the cards the session's ongoing transaction changed
+_CHANGED_USERNAMES = "user_cards_changed_usernames"
+_CHANGED_ALL = "user_cards_changed_all"
+
+# magic, slots, slot size, version buckets, generation
+_HEADER = struct.Struct("<8sIIII")
+_MAGIC = b"UCARDS01"
+_HEADER_SIZE = 64
+_VERSION_BUCKETS = 4096
+_BUCKET = struct.Struct("<I")
+# sequence (odd while written), key hash, generation, bucket version, expires at, length
+_SLOT = struct.Struct("<IQIIdH")
+_SLOT_SIZE = 640
+_MAX_PAYLOAD = _SLOT_SIZE - _SLOT.size
+# id, followers, following, posts, then the lengths of username, name and avatar
+_CARD = struct.Struct("<16sIIIBBH")
+
+
+class UserCard(NamedTuple):
+    """What most routes need of a user they look up by username"""
+
+    id: UUID
+    username: str
+    name: str
+    avatar: str | None
+    followers_count: int
+    following_count: int
+    posts_count: int
+
+
+def _encode(card: UserCard) -> bytes:
+    username = card.username.encode()
+    name = card.name.encode()
+    # 0xFFFF marks a missing avatar, an empty one stays distinct
+    avatar = card.avatar.encode() if card.avatar is not None else b""
+    return (
+        _CARD.pack(
+            card.id.bytes,
+            card.followers_count,
+            card.following_count,
+            card.posts_count,
+            len(username),
+            len(name),
+            len(avatar) if card.avatar is not None else 0xFFFF,
+        )
+        + username
+        + name
+        + avatar
+    )
+
+
+def _decode(payload: bytes) -> UserCard:
+    id_bytes, followers, following, posts, username_length, name_length, avatar_length = (
+        _CARD.unpack_from(payload)
+    )
+    start = _CARD.size
+    username = payload[start : start + username_length].decode()
+    start += username_length
+    name = payload[start : start + name_length].decode()
+    start += name_length
+    avatar = None if avatar_length == 0xFFFF else payload[start : start + avatar_length].decode()
+    return UserCard(UUID(bytes=id_bytes), username, name, avatar, followers, following, posts)
+
+
+def _key_hash(username: str) -> int:
+    # 0 marks an empty slot
+    return int.from_bytes(hashlib.blake2b(username.encode(), digest_size=8).digest(), "little") or 1
+
+
+class UserCardTable:
+    """Fixed-size hash table of user cards in memory shared by the processes of a node.
+
+    Slots are read without locks, a per-slot sequence number detects a concurrent write
+    and the read then counts as a miss. Writes take a file lock. Each card records the
+    generation and the version of its username's bucket, stamped before the card was read
+    from the database: bumping them invalidates it on every process, including a card
+    whose query raced a commit. Cards also expire after a TTL, which bounds the staleness
+    of writes made on other nodes.
+    """
+
+    def __init__(self, slots: int, ttl: float, path: str = ""):
+        self.slots = max(slots // 2, 1) * 2
+        self.ttl = ttl
+        self.path = path
+        self.size = _HEADER_SIZE + _VERSION_BUCKETS * _BUCKET.size + self.slots * _SLOT_SIZE
+        self._slots_offset = _HEADER_SIZE + _VERSION_BUCKETS * _BUCKET.size
+        # File locks exclude other processes, not the threads of this one
+        self._lock = Lock()
+        # Per process, shared memory counters would race between lock-free readers
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.fills = 0
+
+        if path:
+            self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        else:
+            # Unlinked right away: only shared with the processes forked from this one
+            directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+            self._fd, temp_path = tempfile.mkstemp(prefix="user-cards-", dir=directory)
+            os.unlink(temp_path)
+
+        with self._write_lock():
+            layout = _HEADER.pack(_MAGIC, self.slots, _SLOT_SIZE, _VERSION_BUCKETS, 0)[:-4]
+            if (
+                os.fstat(self._fd).st_size != self.size
+                or os.pread(self._fd, len(layout), 0) != layout
+            ):
+                # New file or another layout: start over from zeroes
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, self.size)
+                os.pwrite(self._fd, layout + b"\0\0\0\0", 0)
+            self._memory = mmap.mmap(self._fd, self.size)
+
+    @contextmanager
+    def _write_lock(self) -> Generator[None, None, None]:
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def _generation(self) -> int:
+        return _BUCKET.unpack_from(self._memory, _HEADER.size - _BUCKET.size)[0]
+
+    def _bucket_offset(self, key_hash: int) -> int:
+        return _HEADER_SIZE + (key_hash % _VERSION_BUCKETS) * _BUCKET.size
+
+    def _bucket_version(self, key_hash: int) -> int:
+        return _BUCKET.unpack_from(self._memory, self._bucket_offset(key_hash))[0]
+
+    def _offsets(self, key_hash: int) -> tuple[int, int]:
+        """Offsets of the two slots a key can live in"""
+        first = self._slots_offset + (key_hash % (self.slots // 2)) * 2 * _SLOT_SIZE
+        return first, first + _SLOT_SIZE
+
+    def get(self, username: str) -> UserCard | None:
+        """The card of an active user, None when not cached, stale or being written"""
+        key_hash = _key_hash(username)
+        memory = self._memory
+        for offset in self._offsets(key_hash):
+            sequence, slot_key, generation, bucket_version, expires_at, length = _SLOT.unpack_from(
+                memory, offset
+            )
+            if slot_key != key_hash or sequence & 1 or length > _MAX_PAYLOAD:
+                continue
+            payload = memory[offset + _SLOT.size : offset + _SLOT.size + length]
+            if _SLOT.unpack_from(memory, offset)[0] != sequence:
+                continue
+            try:
+                card = _decode(payload)
+            except (struct.error, UnicodeDecodeError):
+                continue
+            if card.username != username:
+                continue
+            if (
+                expires_at < time.time()
+                or generation != self._generation()
+                or bucket_version != self._bucket_version(key_hash)
+            ):
+                self.stale += 1
+                break
+            self.hits += 1
+            return card
+        self.misses += 1
+        return None
+
+    def stamp(self, username: str) -> tuple[int, int]:
+        """Generation and bucket version of a username, to take before reading its card"""
+        return self._generation(), self._bucket_version(_key_hash(username))
+
+    def set(self, card: UserCard, stamp: tuple[int, int]) -> None:
+        """Cache a card read from the database after `stamp`.
+
+        Skipped when it doesn't fit a slot, or when a commit invalidated it since the stamp.
+        """
+        payload = _encode(card)
+        if len(payload) > _MAX_PAYLOAD:
+            return
+        key_hash = _key_hash(card.username)
+        memory = self._memory
+        with self._write_lock():
+            generation, bucket_version = stamp
+            if (generation, bucket_version) != (
+                self._generation(),
+                self._bucket_version(key_hash),
+            ):
+                return
+            # The slot already holding this key, else the one closest to expiry
+            slots = [
+                (offset, _SLOT.unpack_from(memory, offset)) for offset in self._offsets(key_hash)
+            ]
+            offset, (sequence, *_) = next(
+                (slot for slot in slots if slot[1][1] == key_hash),
+                min(slots, key=lambda slot: slot[1][4]),
+            )
+            _SLOT.pack_into(memory, offset, sequence + 1, 0, 0, 0, 0.0, 0)
+            memory[offset + _SLOT.size : offset + _SLOT.size + len(payload)] = payload
+            _SLOT.pack_into(
+                memory,
+                offset,
+                (sequence + 2) & 0xFFFFFFFF,
+                key_hash,
+                generation,
+                bucket_version,
+                time.time() + self.ttl,
+                len(payload),
+            )
+        self.fills += 1
+
+    def invalidate(self, usernames: Iterable[str]) -> None:
+        """Invalidate the cards of these users (and of the few sharing their buckets)"""
+        with self._write_lock():
+            for offset in {self._bucket_offset(_key_hash(username)) for username in usernames}:
+                version = _BUCKET.unpack_from(self._memory, offset)[0]
+                _BUCKET.pack_into(self._memory, offset, (version + 1) & 0xFFFFFFFF)
+
+    def invalidate_all(self) -> None:
+        """Invalidate every card"""
+        with self._write_lock():
+            generation = (self._generation() + 1) & 0xFFFFFFFF
+            _BUCKET.pack_into(self._memory, _HEADER.size - _BUCKET.size, generation)
+
+    def stats(self) -> dict[str, int]:
+        """Hits, misses (stale reads included) and fills of this process"""
+        return {"hits": self.hits, "misses": self.misses, "stale": self.stale, "fills": self.fills}
+
+    def close(self) -> None:
+        self._memory.close()
+        os.close(self._fd)
+
+
+def _after_flush(session: SqlAlchemySession, flush_context: Any) -> None:
+    for instance in (*session.dirty, *session.deleted):
+        if isinstance(instance, User):
+            # The username before and after the flush, both cards are outdated
+            usernames = get_history(instance, "username").sum()
+            session.info.setdefault(_CHANGED_USERNAMES, set()).update(usernames)
+
+
+def _after_commit(session: SqlAlchemySession) -> None:
+    changed_usernames = session.info.pop(_CHANGED_USERNAMES, None)
+    changed_all = session.info.pop(_CHANGED_ALL, False)
+    if _table is None:
+        return
+    if changed_all:
+        _table.invalidate_all()
+    elif changed_usernames:
+        _table.invalidate(changed_usernames)
+
+
+def _after_rollback(session: SqlAlchemySession) -> None:
+    session.info.pop(_CHANGED_USERNAMES, None)
+    session.info.pop(_CHANGED_ALL, None)
+
+
+_table: UserCardTable | None = None
+
+
+def install_user_cards(table: UserCardTable | None = None) -> UserCardTable | None:
+    """Share user cards between the processes of a node, with the configured table by default.
+
+    Cards of users changed through the ORM are invalidated when the change commits, bulk
+    statements report theirs with `invalidate_on_commit`.
+    """
+    global _table
+    if table is None:
+        if config.USER_CARDS_SLOTS <= 0:
+            return None
+        table = UserCardTable(
+            config.USER_CARDS_SLOTS, config.USER_CARDS_TTL, config.USER_CARDS_PATH
+        )
+
+    uninstall_user_cards()
+    _table = table
+    event.listen(Session, "after_flush", _after_flush)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_rollback", _after_rollback)
+    return _table
+
+
+def uninstall_user_cards() -> None:
+    """Stop sharing user cards, lookups then always hit the database"""
+    global _table
+    if _table is not None:
+        event.remove(Session, "after_flush", _after_flush)
+        event.remove(Session, "after_commit", _after_commit)
+        event.remove(Session, "after_rollback", _after_rollback)
+        _table.close()
+        _table = None
+
+
+def get_user_card(username: str) -> UserCard | None:
+    """The shared card of an active user, None when not cached"""
+    return _table.get(username) if _table is not None else None
+
+
+def user_card_stamp(username: str) -> tuple[int, int] | None:
+    """Stamp to take before reading a user's card from the database, for set_user_card"""
+    return _table.stamp(username) if _table is not None else None
+
+
+def set_user_card(card: UserCard, stamp: tuple[int, int] | None) -> None:
+    """Share the card of an active user read from the database after `stamp`"""
+    if _table is not None and stamp is not None:
+        _table.set(card, stamp)
+
+
+def invalidate_on_commit(session: Session, username: str | None = None) -> None:
+    """Invalidate a user's card (every card without one) once the session commits"""
+    if _table is None:
+        return
+    if username is None:
+        session.info[_CHANGED_ALL] = True
+    else:
+        session.info.setdefault(_CHANGED_USERNAMES, set()).add(username)
@@ -0,0 +1,77 @@
+"""Benchmark the CPU cost of compressing list responses against the bytes it saves.
+
+Encodes PostList pages of several sizes and compresses them with each available codec
+(br and zstd need the brotli/zstandard packages), no database needed:
+
+    poetry run python -m benchmarks.compression
+"""
+
+import gzip
+import timeit
+from functools import partial
+from typing import Callable
+
+from app.models import PaginationMeta, PostList, PostPublic, UserPublic
+from benchmarks.trusted_models import make_post_row
+
+PAGE_SIZES = (24, 240, 2_400)
+REPEATS = 20
+
+
+def _codecs() -> dict[str, Callable[[bytes], bytes]]:
+    codecs: dict[str, Callable[[bytes], bytes]] = {
+        f"gzip-{level}": lambda data, level=level: gzip.compress(data, level, mtime=0)
+        for level in (1, 6, 9)
+    }
+    try:
+        import brotli  # pyright: ignore[reportMissingImports]
+
+        for quality in (4, 5, 11):
+            codecs[f"br-{quality}"] = lambda data, quality=quality: brotli.compress(
+                data, quality=quality
+            )
+    except ImportError:
+        print("brotli is not installed, skipping br")
+    try:
+        import zstandard  # pyright: ignore[reportMissingImports]
+
+        for level in (1, 3, 9):
+            codecs[f"zstd-{level}"] = lambda data, level=level: zstandard.compress(data, level)
+    except ImportError:
+        print("zstandard is not installed, skipping zstd")
+    return codecs
+
+
+def _page_body(items_per_page: int) -> bytes:
+    rows = [make_post_row(index) for index in range(items_per_page)]
+    return PostList.model_construct(
+        data=[
+            PostPublic.model_construct(
+                **{**row, "author": UserPublic.model_construct(**row["author"])}
+            )
+            for row in rows
+        ],
+        meta=PaginationMeta(items_per_page=items_per_page, has_more=False),
+    ).to_json()
+
+
+def main() -> None:
+    codecs = _codecs()
+    for items_per_page in PAGE_SIZES:
+        body = _page_body(items_per_page)
+        print(
+            f"\nPostList of {items_per_page} items, {len(body) / 1024:.1f} KiB (best of {REPEATS})"
+        )
+        for label, compress in codecs.items():
+            duration_ms = (
+                min(timeit.repeat(partial(compress, body), number=1, repeat=REPEATS)) * 1000
+            )
+            saved_kib = (len(body) - len(compress(body))) / 1024
+            print(
+                f"  {label:<8} {duration_ms:8.2f} ms  saved {saved_kib:8.1f} KiB"
+                f"  ({saved_kib / duration_ms:8.1f} KiB per CPU ms)"
+            )
+
+
+if __name__ == "__main__":
+    main()
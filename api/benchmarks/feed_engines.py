@@ -0,0 +1,123 @@
+"""Benchmark the home feed engines (materialized timeline vs per-author LATERAL merge).
+
+Seeds a viewer following 1k and 10k authors inside a transaction that is rolled back,
+so it can run against any development database:
+
+    poetry run python -m benchmarks.feed_engines
+"""
+
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, col, select, text
+
+from app.database import get_session
+from app.models import PaginationQuery, Post, TimelineEntry, User, UserFollow
+from app.services.post_service import FeedEngine, PostService
+from app.utils.pagination import CountStrategy
+
+FOLLOWEES_COUNTS = (1_000, 10_000)
+POSTS_PER_AUTHOR = 20
+REPEATS = 20
+INSERT_BATCH_SIZE = 5_000
+
+
+def _insert_users(session: Session, count: int) -> list:
+    users = [
+        {
+            "id": uuid4(),
+            "name": "Benchmark user",
+            "username": f"bench_{uuid4().hex[:16]}",
+            "email": f"{uuid4().hex}@bench.example.com",
+            "hashed_password": "not-a-real-hash",
+        }
+        for _ in range(count)
+    ]
+    for start in range(0, len(users), INSERT_BATCH_SIZE):
+        session.exec(insert(User).values(users[start : start + INSERT_BATCH_SIZE]))
+    return [user["id"] for user in users]
+
+
+def _seed(session: Session, followees_count: int):
+    viewer_id, *author_ids = _insert_users(session, followees_count + 1)
+
+    session.exec(
+        insert(UserFollow).values(
+            [{"follower_id": viewer_id, "following_id": author_id} for author_id in author_ids]
+        )
+    )
+    now = datetime.now(timezone.utc)
+    posts = [
+        {
+            "id": uuid4(),
+            "author_id": author_id,
+            "content": f"Post {index}",
+            "created_at": now - timedelta(minutes=random.randint(0, 60 * 24 * 365)),
+        }
+        for author_id in author_ids
+        for index in range(POSTS_PER_AUTHOR)
+    ]
+    for start in range(0, len(posts), INSERT_BATCH_SIZE):
+        session.exec(insert(Post).values(posts[start : start + INSERT_BATCH_SIZE]))
+
+    followed_posts = select(
+        col(UserFollow.follower_id), col(Post.id), col(Post.author_id), col(Post.created_at)
+    ).join(Post, col(Post.author_id) == col(UserFollow.following_id))
+    session.exec(
+        insert(TimelineEntry).from_select(
+            ["user_id", "post_id", "author_id", "created_at"],
+            followed_posts.where(col(UserFollow.follower_id) == viewer_id),
+        )
+    )
+    session.exec(text("ANALYZE post, user_follow, home_timeline"))
+
+    return viewer_id
+
+
+def _measure(session: Session, viewer_id, engine: FeedEngine, pagination: PaginationQuery):
+    durations = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        posts, _ = PostService.get_feed_posts(
+            session, viewer_id, pagination, count_strategy=CountStrategy.NONE, engine=engine
+        )
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations), [post.id for post in posts]
+
+
+def main() -> None:
+    for followees_count in FOLLOWEES_COUNTS:
+        with get_session() as session:
+            viewer_id = _seed(session, followees_count)
+
+            first_page, meta = PostService.get_feed_posts(
+                session, viewer_id, PaginationQuery(), count_strategy=CountStrategy.NONE
+            )
+            assert first_page, "Seeded feed is empty"
+
+            pages = {
+                "first page": PaginationQuery(),
+                "page 10": PaginationQuery(page=10),
+                "cursor page": PaginationQuery(cursor=meta.next_cursor),
+            }
+
+            print(f"\n{followees_count} followees, {POSTS_PER_AUTHOR} posts each")
+            for label, pagination in pages.items():
+                timeline_ms, timeline_ids = _measure(
+                    session, viewer_id, FeedEngine.TIMELINE, pagination
+                )
+                lateral_ms, lateral_ids = _measure(
+                    session, viewer_id, FeedEngine.LATERAL, pagination
+                )
+                assert timeline_ids == lateral_ids, "Feed engines returned different posts"
+                print(f"  {label:<12} timeline={timeline_ms:8.2f} ms  lateral={lateral_ms:8.2f} ms")
+
+            session.rollback()
+
+
+if __name__ == "__main__":
+    main()
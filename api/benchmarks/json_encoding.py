@@ -0,0 +1,54 @@
+"""Benchmark JSON encoding of a 2400 items PostList response.
+
+Compares Flask's default stdlib provider on the model_dump() dict, the pydantic-core
+provider on the same dict, and direct serialization of the model to bytes (no database
+needed):
+
+    poetry run python -m benchmarks.json_encoding
+"""
+
+import timeit
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.models import PaginationMeta, PostList, PostPublic, UserPublic
+from app.utils.json_provider import PydanticJSONProvider
+from benchmarks.trusted_models import make_post_row
+
+ITEMS_PER_PAGE = 2_400
+REPEATS = 20
+
+
+def main() -> None:
+    rows = [make_post_row(index) for index in range(ITEMS_PER_PAGE)]
+    post_list = PostList.model_construct(
+        data=[
+            PostPublic.model_construct(
+                **{**row, "author": UserPublic.model_construct(**row["author"])}
+            )
+            for row in rows
+        ],
+        meta=PaginationMeta(items_per_page=ITEMS_PER_PAGE, has_more=False),
+    )
+
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    pydantic_provider = PydanticJSONProvider(app)
+
+    cases = {
+        "stdlib json(model_dump())": lambda: default_provider.dumps(post_list.model_dump()),
+        "pydantic-core(model_dump())": lambda: pydantic_provider.dumps_bytes(
+            post_list.model_dump()
+        ),
+        "model to_json()": post_list.to_json,
+    }
+
+    print(f"\nEncoding a PostList of {ITEMS_PER_PAGE} items (best of {REPEATS})")
+    for label, encode in cases.items():
+        duration_ms = min(timeit.repeat(encode, number=1, repeat=REPEATS)) * 1000
+        print(f"  {label:<28} {duration_ms:8.2f} ms  {len(encode()) / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
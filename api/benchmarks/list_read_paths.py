@@ -0,0 +1,128 @@
+"""Benchmark the projected list read path against full ORM entity hydration.
+
+Seeds an author with a 2400 posts page inside a transaction that is rolled back, so it
+can run against any development database:
+
+    poetry run python -m benchmarks.list_read_paths
+"""
+
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from uuid import UUID, uuid4
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import joinedload
+from sqlmodel import Session, col, select, text
+
+from app.database import get_session
+from app.models import PaginationQuery, Post, PostPublic, User
+from app.services.post_service import PostService
+from app.services.relationship_service import RelationshipService
+from app.utils.pagination import CountStrategy
+
+ITEMS_PER_PAGE = 2_400
+REPEATS = 10
+
+
+def _seed(session: Session) -> tuple[UUID, User]:
+    viewer_id, author_id = uuid4(), uuid4()
+    session.exec(
+        insert(User).values(
+            [
+                {
+                    "id": user_id,
+                    "name": "Benchmark user",
+                    "username": f"bench_{uuid4().hex[:16]}",
+                    "email": f"{uuid4().hex}@bench.example.com",
+                    "hashed_password": "not-a-real-hash",
+                }
+                for user_id in (viewer_id, author_id)
+            ]
+        )
+    )
+    now = datetime.now(timezone.utc)
+    session.exec(
+        insert(Post).values(
+            [
+                {
+                    "author_id": author_id,
+                    "content": f"Post {index}",
+                    "created_at": now - timedelta(seconds=index),
+                }
+                for index in range(ITEMS_PER_PAGE)
+            ]
+        )
+    )
+    session.exec(text("ANALYZE post"))
+
+    author = session.exec(select(User).where(col(User.id) == author_id)).one()
+    return viewer_id, author
+
+
+def _entity_path(session: Session, viewer_id: UUID, author: User) -> list[PostPublic]:
+    """The previous read path: ORM entities, then a validation and a copy per row"""
+    posts = session.exec(
+        select(Post)
+        .options(joinedload(Post.author))  # pyright: ignore[reportArgumentType]
+        .where(col(Post.author_id) == author.id, col(Post.deleted_at).is_(None))
+        .order_by(col(Post.created_at).desc(), col(Post.id).desc())
+        .limit(ITEMS_PER_PAGE + 1)
+    ).all()[:ITEMS_PER_PAGE]
+    liked_ids = RelationshipService.load_liked_post_ids(
+        session, viewer_id, [post.id for post in posts if post.id]
+    )
+    return [
+        PostPublic.model_validate(post).model_copy(update={"is_liked": post.id in liked_ids})
+        for post in posts
+    ]
+
+
+def _projected_path(session: Session, viewer_id: UUID, author: User) -> list[PostPublic]:
+    posts, _ = PostService.get_user_posts(
+        session,
+        viewer_id,
+        author,
+        PaginationQuery(items_per_page=ITEMS_PER_PAGE),
+        count_strategy=CountStrategy.NONE,
+    )
+    return posts
+
+
+def _measure(session: Session, read_path, viewer_id: UUID, author: User):
+    durations = []
+    for _ in range(REPEATS):
+        # Start from an empty identity map, as a new request would
+        session.expunge_all()
+        start = time.perf_counter()
+        posts = read_path(session, viewer_id, author)
+        durations.append((time.perf_counter() - start) * 1000)
+
+    session.expunge_all()
+    tracemalloc.start()
+    read_path(session, viewer_id, author)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return statistics.median(durations), peak_bytes, [post.id for post in posts]
+
+
+def main() -> None:
+    with get_session() as session:
+        viewer_id, author = _seed(session)
+
+        print(f"\nUser posts page of {ITEMS_PER_PAGE} items")
+        results = {}
+        for label, read_path in (("entities", _entity_path), ("projected", _projected_path)):
+            duration_ms, peak_bytes, post_ids = _measure(session, read_path, viewer_id, author)
+            results[label] = post_ids
+            print(f"  {label:<10} {duration_ms:8.2f} ms  peak={peak_bytes / 1024:10.1f} KiB")
+
+        assert results["entities"] == results["projected"], "Read paths returned different posts"
+
+        session.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Benchmark a follow request on per-call sessions against the request-scoped session.
+
+Each request follows then unfollows a user and reads the updated detail, as the routes
+do. With per-call sessions every commit releases the connection and the detail read
+checks out another one, the request session commits once. Reports connection checkouts
+and hold time per request from the pool counters. The two seeded users are deleted at
+the end (needs a development database):
+
+    poetry run python -m benchmarks.request_sessions
+"""
+
+import statistics
+import time
+from collections.abc import Callable
+from uuid import UUID, uuid4
+
+from flask import Flask, Response
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, col, delete
+
+from app.database import get_engine, get_session, pool_stats
+from app.middlewares.unit_of_work import close_request_session, commit_request_session
+from app.models import User
+from app.services.user_service import UserService
+
+REQUESTS = 200
+
+
+def _seed() -> tuple[UUID, UUID, str]:
+    viewer_id, author_id = uuid4(), uuid4()
+    author_username = f"bench_{uuid4().hex[:16]}"
+    with Session(get_engine()) as session:
+        session.exec(
+            insert(User).values(
+                [
+                    {
+                        "id": user_id,
+                        "name": "Benchmark user",
+                        "username": username,
+                        "email": f"{uuid4().hex}@bench.example.com",
+                        "hashed_password": "not-a-real-hash",
+                    }
+                    for user_id, username in (
+                        (viewer_id, f"bench_{uuid4().hex[:16]}"),
+                        (author_id, author_username),
+                    )
+                ]
+            )
+        )
+        session.commit()
+    return viewer_id, author_id, author_username
+
+
+def _per_call_sessions(app: Flask, viewer_id: UUID, username: str) -> None:
+    """The previous routes: a session per request block, committed by each service"""
+    for follow in (UserService.follow_by_username, UserService.unfollow_by_username):
+        with Session(get_engine()) as session:
+            follow(session, viewer_id, username).to_json()
+
+
+def _request_session(app: Flask, viewer_id: UUID, username: str) -> None:
+    for follow in (UserService.follow_by_username, UserService.unfollow_by_username):
+        with app.test_request_context(method="POST"):
+            with get_session() as session:
+                follow(session, viewer_id, username).to_json()
+            commit_request_session(Response())
+
+
+def _measure(
+    label: str, request: Callable[[Flask, UUID, str], None], app: Flask, viewer_id, username
+) -> None:
+    durations = []
+    pool_stats.reset()
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        request(app, viewer_id, username)
+        durations.append((time.perf_counter() - start) * 1000 / 2)
+
+    requests = REQUESTS * 2
+    print(
+        f"  {label:<20} {statistics.median(durations):6.2f} ms/request"
+        f"  checkouts={pool_stats.checkouts / requests:4.1f}/request"
+        f"  held={pool_stats.hold_time * 1000 / requests:6.2f} ms/request"
+    )
+
+
+def main() -> None:
+    app = Flask(__name__)
+    app.after_request(commit_request_session)
+    app.teardown_request(close_request_session)
+
+    viewer_id, author_id, username = _seed()
+    try:
+        print(f"\nFollow then unfollow, {REQUESTS * 2} requests")
+        _measure("per-call sessions", _per_call_sessions, app, viewer_id, username)
+        _measure("request session", _request_session, app, viewer_id, username)
+    finally:
+        with Session(get_engine()) as session:
+            session.exec(delete(User).where(col(User.id).in_([viewer_id, author_id])))
+            session.commit()
+
+
+if __name__ == "__main__":
+    main()
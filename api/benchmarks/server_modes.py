@@ -0,0 +1,82 @@
+"""Benchmark worker boot time and memory with and without the preloaded app.
+
+Starts gunicorn (gunicorn.conf.py) with a few workers in each mode and reads the ready
+line every worker logs: its boot time since the fork and its resident, proportional and
+private memory. The database is not touched (no pool warm up), no database needed:
+
+    poetry run python -m benchmarks.server_modes
+"""
+
+import os
+import re
+import selectors
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+WORKERS = 4
+TIMEOUT = 60
+
+_READY = re.compile(
+    r"Worker \d+ ready in (?P<boot>\d+) ms "
+    r"\(rss=(?P<rss>[\d.]+) MiB, pss=(?P<pss>[\d.]+) MiB, uss=(?P<uss>[\d.]+) MiB\)"
+)
+
+
+def _start_workers(preload: bool) -> list[dict[str, float]]:
+    env = {
+        **os.environ,
+        "DB_POOL_WARM": "0",
+        "PORT": "0",
+        "WEB_CONCURRENCY": str(WORKERS),
+        "GUNICORN_PRELOAD": "true" if preload else "false",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn"],
+        env=env,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    assert server.stderr is not None
+    selector = selectors.DefaultSelector()
+    selector.register(server.stderr, selectors.EVENT_READ)
+
+    workers = []
+    deadline = time.monotonic() + TIMEOUT
+    try:
+        while len(workers) < WORKERS and time.monotonic() < deadline:
+            if not selector.select(timeout=1):
+                continue
+            line = server.stderr.readline()
+            if not line:
+                break
+            match = _READY.search(line)
+            if match:
+                workers.append({name: float(value) for name, value in match.groupdict().items()})
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+
+    if len(workers) < WORKERS:
+        raise RuntimeError(f"Only {len(workers)} of {WORKERS} workers got ready")
+    return workers
+
+
+def main() -> None:
+    print(f"\n{WORKERS} workers, median per worker")
+    for label, preload in (("imported per worker", False), ("preloaded", True)):
+        workers = _start_workers(preload)
+        medians = {
+            name: statistics.median(worker[name] for worker in workers)
+            for name in ("boot", "rss", "pss", "uss")
+        }
+        print(
+            f"  {label:<20} boot={medians['boot']:6.0f} ms  rss={medians['rss']:6.1f} MiB"
+            f"  pss={medians['pss']:6.1f} MiB  uss={medians['uss']:6.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark building a feed page for a new viewer with and without shared cores.
+
+Every viewer of a popular post gets the same content, author and counts, only is_liked
+differs. Compares building the page's models from rows and serializing them whole, the
+same with cores split off and cached (first viewer), and rebuilding the page from the
+cached cores and the viewer's version rows (every next viewer). That last path also
+skips the page and like flags queries, not measured here (no database needed):
+
+    poetry run python -m benchmarks.shared_cores
+"""
+
+import timeit
+
+from app.config import get_config
+from app.models import PaginationMeta, PostList, PostPublic, UserPublic
+from app.services.post_service import PostService
+from app.utils.shared_json import clear_cores, install_shared_cores
+from benchmarks.trusted_models import make_post_row
+
+ITEMS_PER_PAGE = 24
+NUMBER = 200
+REPEATS = 20
+# A typical post, well under the 1024 characters limit
+CONTENT = "Shipping a new release today, with faster feeds and smaller payloads! " * 4
+
+
+def main() -> None:
+    install_shared_cores(get_config().CORE_CACHE_ENTRIES)
+    rows = [{**make_post_row(index), "content": CONTENT} for index in range(ITEMS_PER_PAGE)]
+    meta = PaginationMeta(items_per_page=ITEMS_PER_PAGE, has_more=False)
+
+    def build_page() -> PostList:
+        return PostList.model_construct(
+            data=[
+                PostPublic.model_construct(
+                    **{**row, "author": UserPublic.model_construct(**row["author"])}
+                )
+                for row in rows
+            ],
+            meta=meta,
+        )
+
+    def plain() -> bytes:
+        post_list = build_page()
+        return post_list.__pydantic_serializer__.to_json(post_list, by_alias=True)
+
+    def cold() -> bytes:
+        clear_cores()
+        return build_page().to_json()
+
+    # What the page version query returns: the posts' core markers and like flags
+    version_rows = tuple(
+        (
+            row["id"],
+            row["updated_at"],
+            row["likes_count"],
+            row["author"]["updated_at"],
+            row["author"]["followers_count"],
+            row["author"]["following_count"],
+            row["author"]["posts_count"],
+            not row["is_liked"],
+        )
+        for row in rows
+    )
+
+    def shared() -> bytes:
+        posts, page_meta = PostService.get_shared_page((version_rows, meta)) or ([], meta)
+        return PostList.model_construct(data=posts, meta=page_meta).to_json()
+
+    cases = {
+        "models, whole": plain,
+        "models, cores cached": cold,
+        "shared cores": shared,
+    }
+
+    print(f"\nBuilding a PostList of {ITEMS_PER_PAGE} items (best of {REPEATS})")
+    for label, encode in cases.items():
+        best = min(timeit.repeat(encode, number=NUMBER, repeat=REPEATS))
+        duration_us = best / NUMBER * 1_000_000
+        print(f"  {label:<22} {duration_us:8.1f} us  {len(encode()) / 1024:6.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
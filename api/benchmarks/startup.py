@@ -0,0 +1,65 @@
+"""Benchmark the cold start of the app, as paid by every worker that creates it.
+
+Creates the app in fresh interpreters and reports the median duration of each startup
+step (app.extensions["startup"]), the whole process included, then the slowest imports
+(python -X importtime). No database needed, create_app() never touches it:
+
+    poetry run python -m benchmarks.startup
+"""
+
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+RUNS = 5
+SLOWEST_IMPORTS = 10
+
+_CREATE_APP = (
+    "import json\n"
+    "from app import create_app\n"
+    "print(json.dumps(create_app().extensions['startup']))\n"
+)
+
+# import time: self [us] | cumulative | imported package
+_IMPORT_TIME = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)")
+
+
+def _create_app(*options: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *options, "-c", _CREATE_APP],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def main() -> None:
+    runs = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = _create_app()
+        process_ms = (time.perf_counter() - start) * 1000
+        runs.append({**json.loads(result.stdout.splitlines()[-1]), "process": process_ms})
+
+    print(f"\nApp cold start, median of {RUNS} fresh interpreters")
+    for step in runs[0]:
+        print(f"  {step:<12} {statistics.median(run[step] for run in runs):8.1f} ms")
+
+    # Top level imports only, their cumulative time includes what they import
+    imports = [
+        (int(cumulative), package)
+        for cumulative, indent, package in _IMPORT_TIME.findall(
+            _create_app("-X", "importtime").stderr
+        )
+        if len(indent) == 1
+    ]
+    print("\nSlowest top level imports (create_app ones included)")
+    for cumulative, package in sorted(imports, reverse=True)[:SLOWEST_IMPORTS]:
+        print(f"  {package:<40} {cumulative / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Benchmark the Python-side cost of preparing hot statements for execution.
+
+Before a statement reaches the compiled cache, SQLAlchemy needs its cache key. A
+statement rebuilt on every request is constructed, paged and keyed again each time; a
+statement built once with bound parameters reuses its paged variant and memoized key.
+Compiling, what a compiled cache miss costs on top, is shown for reference (no database
+needed):
+
+    poetry run python -m benchmarks.statement_cache
+"""
+
+import timeit
+from functools import partial
+from typing import Any, Callable
+
+from sqlalchemy.dialects import postgresql
+
+from app.services.post_service import FeedEngine, PostService
+from app.services.user_service import UserService
+from app.utils.pagination import _data_statement
+
+NUMBER = 500
+REPEATS = 20
+
+
+def _prepare(build: Callable[[], tuple[Any, Any]], use_window_count: bool) -> Any:
+    statement, keyset = build()
+    data_statement = _data_statement(statement, keyset, use_window_count, False)
+    return data_statement._generate_cache_key()
+
+
+def main() -> None:
+    dialect = postgresql.dialect()
+    statements: dict[str, tuple[Callable[[], tuple[Any, Any]], Callable[[], tuple[Any, Any]]]] = {
+        "feed (timeline)": (
+            lambda: PostService._prepare_feed.__wrapped__(FeedEngine.TIMELINE, False, False),
+            lambda: PostService._prepare_feed(FeedEngine.TIMELINE, False, False),
+        ),
+        "feed (lateral)": (
+            lambda: PostService._prepare_feed.__wrapped__(FeedEngine.LATERAL, False, False),
+            lambda: PostService._prepare_feed(FeedEngine.LATERAL, False, False),
+        ),
+        "feed version": (
+            lambda: PostService._prepare_feed.__wrapped__(FeedEngine.TIMELINE, False, True),
+            lambda: PostService._prepare_feed(FeedEngine.TIMELINE, False, True),
+        ),
+        "user search": (
+            lambda: (UserService._select_search.__wrapped__(), None),
+            lambda: (UserService._select_search(), None),
+        ),
+    }
+
+    print(f"\nPreparing a statement for execution, per request (best of {REPEATS})")
+    print(f"  {'statement':<18} {'rebuilt':>10} {'prepared':>10} {'compile':>10}")
+    for label, (rebuild, prepared) in statements.items():
+        rebuilt_best = min(
+            timeit.repeat(partial(_prepare, rebuild, True), number=NUMBER, repeat=REPEATS)
+        )
+        prepared_best = min(
+            timeit.repeat(partial(_prepare, prepared, True), number=NUMBER, repeat=REPEATS)
+        )
+        statement, keyset = prepared()
+        data_statement = _data_statement(statement, keyset, True, False)
+        compile_best = min(
+            timeit.repeat(
+                partial(data_statement.compile, dialect=dialect), number=NUMBER // 10, repeat=5
+            )
+        )
+        print(
+            f"  {label:<18} {rebuilt_best / NUMBER * 1_000_000:7.1f} us"
+            f" {prepared_best / NUMBER * 1_000_000:7.1f} us"
+            f" {compile_best / (NUMBER // 10) * 1_000_000:7.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Micro-benchmark validated vs trusted (model_construct) construction of list responses.
+
+Builds a PostList and a UserList of 1000 rows shaped like the projected database rows,
+no database needed:
+
+    poetry run python -m benchmarks.trusted_models
+"""
+
+import timeit
+from datetime import datetime, timezone
+from typing import Any
+from uuid import uuid4
+
+from app.models import PaginationMeta, PostList, PostPublic, UserList, UserPublic
+
+ROWS = 1_000
+REPEATS = 20
+
+
+def make_user_row(index: int) -> dict[str, Any]:
+    return {
+        "id": uuid4(),
+        "created_at": datetime.now(timezone.utc),
+        "updated_at": None,
+        "name": f"Benchmark user {index}",
+        "username": f"bench_{index}",
+        "email": f"bench_{index}@bench.example.com",
+        "avatar": None,
+        "followers_count": index,
+        "following_count": index,
+        "posts_count": index,
+        "is_following": index % 2 == 0,
+        "is_followed_by": index % 3 == 0,
+    }
+
+
+def make_post_row(index: int) -> dict[str, Any]:
+    return {
+        "id": uuid4(),
+        "created_at": datetime.now(timezone.utc),
+        "updated_at": None,
+        "content": f"Post {index}",
+        "likes_count": index,
+        "is_liked": index % 2 == 0,
+        "author": make_user_row(index),
+    }
+
+
+def main() -> None:
+    user_rows = [make_user_row(index) for index in range(ROWS)]
+    post_rows = [make_post_row(index) for index in range(ROWS)]
+    meta = PaginationMeta(items_per_page=ROWS, has_more=False)
+
+    cases = {
+        "UserList validated": lambda: UserList.model_validate(
+            {"data": [UserPublic.model_validate(row) for row in user_rows], "meta": meta}
+        ),
+        "UserList trusted": lambda: UserList.model_construct(
+            data=[UserPublic.model_construct(**row) for row in user_rows], meta=meta
+        ),
+        "PostList validated": lambda: PostList.model_validate(
+            {"data": [PostPublic.model_validate(row) for row in post_rows], "meta": meta}
+        ),
+        "PostList trusted": lambda: PostList.model_construct(
+            data=[
+                PostPublic.model_construct(
+                    **{**row, "author": UserPublic.model_construct(**row["author"])}
+                )
+                for row in post_rows
+            ],
+            meta=meta,
+        ),
+    }
+
+    print(f"\nBuilding a list response of {ROWS} rows (best of {REPEATS})")
+    for label, build in cases.items():
+        duration_ms = min(timeit.repeat(build, number=1, repeat=REPEATS)) * 1000
+        print(f"  {label:<20} {duration_ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Benchmark reading a user by username from the shared user cards.
+
+Compares a card read from the shared memory table (hit, miss and fill) with unpickling
+a cached User, what the query cache network backend does on a hit. Both skip the
+database, not measured here (no database needed):
+
+    poetry run python -m benchmarks.user_cards
+"""
+
+import pickle
+import timeit
+import uuid
+
+from app.models import User
+from app.utils.user_cards import UserCard, UserCardTable
+
+NUMBER = 10_000
+REPEATS = 20
+
+
+def main() -> None:
+    table = UserCardTable(slots=16384, ttl=60)
+    user = User(
+        id=uuid.uuid4(),
+        name="Grace Hopper",
+        username="grace_hopper",
+        email="grace@example.com",
+        avatar="https://example.com/avatars/grace_hopper.png",
+        hashed_password="x" * 60,
+        followers_count=48_213,
+        following_count=310,
+        posts_count=1_204,
+    )
+    card = UserCard(
+        user.id,
+        user.username,
+        user.name,
+        user.avatar,
+        user.followers_count,
+        user.following_count,
+        user.posts_count,
+    )
+    table.set(card, table.stamp(card.username))
+    pickled_user = pickle.dumps(user)
+
+    cases = {
+        "card hit": lambda: table.get(user.username),
+        "card miss": lambda: table.get("nobody"),
+        "card fill": lambda: table.set(card, table.stamp(card.username)),
+        "unpickled User": lambda: pickle.loads(pickled_user),
+    }
+
+    print(f"\nLooking up a user by username (best of {REPEATS})")
+    for label, lookup in cases.items():
+        best = min(timeit.repeat(lookup, number=NUMBER, repeat=REPEATS))
+        print(f"  {label:<16} {best / NUMBER * 1_000_000:8.2f} us")
+    table.close()
+
+
+if __name__ == "__main__":
+    main()
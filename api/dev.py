@@ -1,10 +1,15 @@
 import os
 
 from app import create_app
+from scripts.bootstrap import bootstrap
 
 if __name__ == "__main__":
     # Set development environment variables
     os.environ["FLASK_ENV"] = "development"
 
+    # Once, not again in the reloader's child process
+    if os.getenv("WERKZEUG_RUN_MAIN") != "true":
+        bootstrap()
+
     app = create_app()
     app.run(host="0.0.0.0", port=8000, debug=True)
@@ -0,0 +1,44 @@
+"""Gunicorn settings, read from the environment (see the Dockerfile).
+
+The app is preloaded by default (GUNICORN_PRELOAD): imported and created once in the
+master, then forked into workers that share its memory pages copy-on-write and boot
+without importing anything. Workers restarted by the master fork from it just as fast.
+"""
+
+import gc
+import os
+import time
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+threads = int(os.getenv("GUNICORN_THREADS", "2"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+keepalive = int(os.getenv("GUNICORN_KEEP_ALIVE", "10"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+wsgi_app = "wsgi:app"
+
+if preload_app:
+    # Collections in the master would free objects and leave holes in the pages the
+    # workers share, prepare_fork() freezes what the app creation allocated instead
+    gc.disable()
+
+
+def when_ready(server):
+    if preload_app:
+        from app.utils.server import prepare_fork
+
+        prepare_fork()
+
+
+def post_fork(server, worker):
+    worker.started_at = time.perf_counter()
+    if preload_app:
+        from app.utils.server import init_worker
+
+        init_worker()
+
+
+def post_worker_init(worker):
+    from app.utils.server import warm_worker
+
+    warm_worker(worker.started_at)
@@ -0,0 +1,37 @@
+"""Add the (author_id, created_at, id) index on post for keyset pages
+
+Revision ID: 5b1e0c7a9d42
+Revises:
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5b1e0c7a9d42"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A new database has no tables yet, the bootstrap command creates them up to date
+    if not sa.inspect(op.get_bind()).has_table("post"):
+        return
+
+    op.create_index(
+        "ix_post_author_id_created_at_id",
+        "post",
+        ["author_id", "created_at", "id"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_post_author_id_created_at_id", table_name="post", if_exists=True)
@@ -0,0 +1,98 @@
+"""Add the materialized home timeline and fill it from follows and posts
+
+Revision ID: 8c4f2d6e1a07
+Revises: 5b1e0c7a9d42
+Create Date: 2026-10-17 09:10:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8c4f2d6e1a07"
+down_revision: Union[str, Sequence[str], None] = "5b1e0c7a9d42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    # A new database has no tables yet, the bootstrap command creates them up to date
+    if not inspector.has_table("post"):
+        return
+
+    if "is_fanned_out" not in {column["name"] for column in inspector.get_columns("post")}:
+        op.add_column(
+            "post",
+            sa.Column("is_fanned_out", sa.Boolean(), server_default="true", nullable=False),
+        )
+    op.create_index(
+        "ix_post_pulled_author_id_created_at_id",
+        "post",
+        ["author_id", "created_at", "id"],
+        postgresql_where=sa.text("NOT is_fanned_out"),
+        if_not_exists=True,
+    )
+
+    if not inspector.has_table("home_timeline"):
+        op.create_table(
+            "home_timeline",
+            sa.Column(
+                "created_at",
+                sa.TIMESTAMP(timezone=True),
+                server_default=sa.func.now(),
+                nullable=False,
+            ),
+            sa.Column("user_id", sa.Uuid(), nullable=False),
+            sa.Column("post_id", sa.Uuid(), nullable=False),
+            sa.Column("author_id", sa.Uuid(), nullable=False),
+            sa.ForeignKeyConstraint(["author_id"], ["user.id"], ondelete="CASCADE"),
+            sa.ForeignKeyConstraint(["post_id"], ["post.id"], ondelete="CASCADE"),
+            sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("user_id", "post_id"),
+        )
+    op.create_index(
+        "ix_home_timeline_user_id_created_at_post_id",
+        "home_timeline",
+        ["user_id", "created_at", "post_id"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_home_timeline_user_id_author_id",
+        "home_timeline",
+        ["user_id", "author_id"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_home_timeline_post_id", "home_timeline", ["post_id"], if_not_exists=True
+    )
+
+    # Same rows as TimelineService.rebuild: every active post in its author's timeline and
+    # the fanned out ones in their followers' timelines
+    op.execute("DELETE FROM home_timeline")
+    op.execute(
+        """
+        INSERT INTO home_timeline (user_id, post_id, author_id, created_at)
+        SELECT post.author_id, post.id, post.author_id, post.created_at
+        FROM post
+        WHERE post.deleted_at IS NULL
+        UNION ALL
+        SELECT user_follow.follower_id, post.id, post.author_id, post.created_at
+        FROM post
+        JOIN user_follow ON user_follow.following_id = post.author_id
+        WHERE post.deleted_at IS NULL AND post.is_fanned_out
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("home_timeline", if_exists=True)
+    op.drop_index(
+        "ix_post_pulled_author_id_created_at_id", table_name="post", if_exists=True
+    )
+    op.drop_column("post", "is_fanned_out")
@@ -0,0 +1,53 @@
+"""Add the denormalized post.likes_count and backfill it from post_like
+
+Revision ID: 2d7a9e4b6c13
+Revises: 8c4f2d6e1a07
+Create Date: 2026-10-17 09:20:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2d7a9e4b6c13"
+down_revision: Union[str, Sequence[str], None] = "8c4f2d6e1a07"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    # A new database has no tables yet, the bootstrap command creates them up to date
+    if not inspector.has_table("post"):
+        return
+
+    if "likes_count" not in {column["name"] for column in inspector.get_columns("post")}:
+        op.add_column(
+            "post",
+            sa.Column("likes_count", sa.Integer(), server_default="0", nullable=False),
+        )
+
+    # Same as PostService.reconcile_likes_counts, counter changes keep updated_at untouched
+    op.execute(
+        """
+        UPDATE post
+        SET likes_count = actual_counts.likes_count
+        FROM (
+            SELECT post.id AS post_id, count(post_like.user_id) AS likes_count
+            FROM post
+            LEFT OUTER JOIN post_like ON post_like.post_id = post.id
+            GROUP BY post.id
+        ) AS actual_counts
+        WHERE post.id = actual_counts.post_id
+            AND post.likes_count != actual_counts.likes_count
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("post", "likes_count")
@@ -0,0 +1,75 @@
+"""Add the denormalized user follower, following and post counters and backfill them
+
+Revision ID: 9e3b5f1c8a26
+Revises: 2d7a9e4b6c13
+Create Date: 2026-10-17 09:30:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9e3b5f1c8a26"
+down_revision: Union[str, Sequence[str], None] = "2d7a9e4b6c13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTERS = ("followers_count", "following_count", "posts_count")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    # A new database has no tables yet, the bootstrap command creates them up to date
+    if not inspector.has_table("user"):
+        return
+
+    existing_columns = {column["name"] for column in inspector.get_columns("user")}
+    for counter in COUNTERS:
+        if counter not in existing_columns:
+            op.add_column(
+                "user",
+                sa.Column(counter, sa.Integer(), server_default="0", nullable=False),
+            )
+
+    # Same as UserService.reconcile_counters, counter changes keep updated_at untouched
+    op.execute(
+        """
+        UPDATE "user"
+        SET followers_count = actual_counts.followers_count,
+            following_count = actual_counts.following_count,
+            posts_count = actual_counts.posts_count
+        FROM (
+            SELECT
+                "user".id AS user_id,
+                (
+                    SELECT count(*) FROM user_follow
+                    WHERE user_follow.following_id = "user".id
+                ) AS followers_count,
+                (
+                    SELECT count(*) FROM user_follow
+                    WHERE user_follow.follower_id = "user".id
+                ) AS following_count,
+                (
+                    SELECT count(*) FROM post
+                    WHERE post.author_id = "user".id AND post.deleted_at IS NULL
+                ) AS posts_count
+            FROM "user"
+        ) AS actual_counts
+        WHERE "user".id = actual_counts.user_id
+            AND (
+                "user".followers_count != actual_counts.followers_count
+                OR "user".following_count != actual_counts.following_count
+                OR "user".posts_count != actual_counts.posts_count
+            )
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for counter in reversed(COUNTERS):
+        op.drop_column("user", counter)
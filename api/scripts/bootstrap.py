@@ -0,0 +1,50 @@
+"""Prepare the database before the server starts, the app itself never does.
+
+    poetry run python -m scripts.bootstrap           # migrate, then seed
+    poetry run python -m scripts.bootstrap migrate   # extensions and tables
+    poetry run python -m scripts.bootstrap seed      # SEED_FAKE_DATA / SEED_DEFAULT_ADMIN
+
+Every step is idempotent, run it once per deploy rather than once per worker.
+"""
+
+import argparse
+import time
+
+from app.database import init_db
+
+
+def migrate() -> None:
+    """Create the database extensions and the missing tables"""
+    print("🏗️  Migrating database schema...")
+    init_db()
+    print("✅ Database schema migration completed")
+
+
+def seed() -> None:
+    """Seed the fake data and the default admin user, when enabled"""
+    # Imported here: the fixtures are large and only seeding needs them
+    from scripts.seed_default_admin import seed_default_admin_if_needed
+    from scripts.seed_fake_data import seed_fake_data_if_needed
+
+    seed_fake_data_if_needed()
+    seed_default_admin_if_needed()
+
+
+def bootstrap(command: str = "all") -> None:
+    """Run a bootstrap command: migrate, seed, or all of them"""
+    started_at = time.perf_counter()
+    if command in ("migrate", "all"):
+        migrate()
+    if command in ("seed", "all"):
+        seed()
+    print(f"⏱️  Bootstrap ({command}) took {(time.perf_counter() - started_at) * 1000:.0f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prepare the database for the app")
+    parser.add_argument("command", nargs="?", default="all", choices=["migrate", "seed", "all"])
+    bootstrap(parser.parse_args().command)
+
+
+if __name__ == "__main__":
+    main()
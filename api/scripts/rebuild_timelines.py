@@ -0,0 +1,15 @@
+from app.database import get_session
+from app.services.timeline_service import TimelineService
+
+
+def rebuild_timelines() -> None:
+    """Rebuild every home timeline from the follow graph and existing posts"""
+    print("🔁 Rebuilding home timelines...")
+    with get_session() as session:
+        TimelineService.rebuild(session)
+        session.commit()
+    print("✅ Home timelines rebuild completed")
+
+
+if __name__ == "__main__":
+    rebuild_timelines()
@@ -0,0 +1,16 @@
+from app.database import get_session
+from app.services.post_service import PostService
+from app.services.user_service import UserService
+
+
+def reconcile_counters() -> None:
+    """Recompute denormalized counters from their source tables"""
+    print("🔁 Reconciling counters...")
+    with get_session() as session:
+        fixed_posts = PostService.reconcile_likes_counts(session)
+        fixed_users = UserService.reconcile_counters(session)
+    print(f"✅ Counters reconcile completed. fixed_posts={fixed_posts} fixed_users={fixed_users}")
+
+
+if __name__ == "__main__":
+    reconcile_counters()
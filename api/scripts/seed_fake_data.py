@@ -5,6 +5,9 @@ from sqlmodel import select
 
 from app.database import get_session
 from app.models import Post, PostLike, Profile, User, UserFollow
+from app.services.post_service import PostService
+from app.services.timeline_service import TimelineService
+from app.services.user_service import UserService
 from app.utils.password import hash_password
 from fixtures.fake_data_fixtures import FOLLOWS_FIXTURES, POSTS_FIXTURES, USERS_FIXTURES
 
@@ -15,8 +18,11 @@ def seed_fake_data_if_needed() -> None:
     if os.getenv("SEED_FAKE_DATA", "").lower() in ("1", "true", "yes"):
         print("🌱 Seeding fake data...")
         _ensure_users(USERS_FIXTURES)
-        _ensure_posts(POSTS_FIXTURES)
-        _ensure_follows(FOLLOWS_FIXTURES)
+        posts_created = _ensure_posts(POSTS_FIXTURES)
+        follows_created = _ensure_follows(FOLLOWS_FIXTURES)
+        if posts_created or follows_created:
+            _rebuild_timelines()
+            _reconcile_counters()
         print("✅ Fake data seeding completed")
 
 
@@ -59,8 +65,8 @@ def _ensure_users(fixtures: Iterable[dict]) -> None:
     print(f"Users seed complete. created={created_count} skipped={skipped_count}")
 
 
-def _ensure_posts(fixtures: Iterable[dict]) -> None:
-    """Insert demo posts (and their likes) if they don't already exist."""
+def _ensure_posts(fixtures: Iterable[dict]) -> int:
+    """Insert demo posts (and their likes) if they don't already exist, return inserted rows."""
     posts_created = 0
     posts_skipped = 0
     likes_created = 0
@@ -127,8 +133,10 @@ def _ensure_posts(fixtures: Iterable[dict]) -> None:
         f"likes_missing_refs={likes_missing_refs}"
     )
 
+    return posts_created + likes_created
 
-def _ensure_follows(fixtures: Iterable[dict]) -> None:
+
+def _ensure_follows(fixtures: Iterable[dict]) -> int:
     """Insert follow relationships if they don't already exist."""
     created_count = 0
     skipped_count = 0
@@ -177,6 +185,26 @@ def _ensure_follows(fixtures: Iterable[dict]) -> None:
         f"created={created_count} skipped={skipped_count} missing_refs={missing_refs}"
     )
 
+    return created_count
+
+
+def _rebuild_timelines() -> None:
+    """Rebuild home timelines, seeded posts and follows bypass the fan-out on write."""
+    with get_session() as session:
+        TimelineService.rebuild(session)
+        session.commit()
+
+    print("Timelines rebuild complete.")
+
+
+def _reconcile_counters() -> None:
+    """Reconcile denormalized counters, seeded likes bypass like_post."""
+    with get_session() as session:
+        fixed_posts = PostService.reconcile_likes_counts(session)
+        fixed_users = UserService.reconcile_counters(session)
+
+    print(f"Counters reconcile complete. fixed_posts={fixed_posts} fixed_users={fixed_users}")
+
 
 # def main() -> None:
 #     ensure_users(USERS_FIXTURES)
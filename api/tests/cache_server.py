@@ -0,0 +1,48 @@
+"""In-process stand-in for the Redis compatible server of the network query cache."""
+
+import time
+from typing import Any
+
+
+class LocalCacheServer:
+    """Implement the few commands the network query cache backend sends."""
+
+    def __init__(self):
+        self.values: dict[str, tuple[float | None, Any]] = {}
+        self.commands: list[str] = []
+
+    def _read(self, key: str) -> Any:
+        expires_at, value = self.values.get(key, (None, None))
+        if expires_at is not None and expires_at < time.monotonic():
+            del self.values[key]
+            return None
+        return value
+
+    def get(self, key: str) -> Any:
+        self.commands.append("GET")
+        return self._read(key)
+
+    def mget(self, keys: list[str]) -> list[Any]:
+        self.commands.append("MGET")
+        return [self._read(key) for key in keys]
+
+    def set(self, key: str, value: Any, px: int | None = None) -> None:
+        self.commands.append("SET")
+        expires_at = time.monotonic() + px / 1000 if px is not None else None
+        self.values[key] = (expires_at, value)
+
+    def incr(self, key: str) -> int:
+        self.commands.append("INCR")
+        value = int(self._read(key) or 0) + 1
+        self.values[key] = (None, str(value).encode())
+        return value
+
+
+class UnreachableCacheServer:
+    """A cache server every command fails on."""
+
+    def __getattr__(self, name: str) -> Any:
+        def fail(*args: Any, **kwargs: Any) -> Any:
+            raise ConnectionError("Cache server unreachable")
+
+        return fail
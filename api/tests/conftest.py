@@ -1,7 +1,8 @@
 """Pytest configuration and fixtures for integration tests."""
 
 import os
-from collections.abc import Generator
+from collections.abc import Callable, Generator
+from contextlib import AbstractContextManager, contextmanager
 
 import pytest
 from faker import Faker
@@ -15,6 +16,8 @@ from testcontainers.postgres import PostgresContainer
 from app.models import UserCreate
 from app.services.auth_service import AuthService
 from app.utils.jwt import create_tokens
+from tests.cache_server import LocalCacheServer
+from tests.query_counter import QueryCounter
 
 os.environ["FLASK_ENV"] = "testing"
 
@@ -32,8 +35,13 @@ def postgres_container() -> Generator[PostgresContainer, None, None]:
         LogMessageWaitStrategy("database system is ready to accept connections")
     )
 
+    from app.config import TestingConfig
+
     with container:
-        os.environ["TEST_DATABASE_URL"] = container.get_connection_url()
+        database_url = container.get_connection_url()
+        os.environ["TEST_DATABASE_URL"] = database_url
+        # Test modules import the app, and with it the config, before the container is up
+        TestingConfig.DATABASE_URL = TestingConfig.SQLALCHEMY_DATABASE_URI = database_url
         yield container
 
 
@@ -54,13 +62,15 @@ def app(postgres_container: PostgresContainer) -> Generator[OpenAPI, None, None]
     """Create and configure a Flask app instance for testing.
 
     This fixture is session-scoped because the app configuration doesn't change
-    between tests. The database is already initialized with tables and extensions
-    when create_app() calls init_db().
+    between tests. The database is migrated (extensions and tables) first, as the
+    bootstrap command does before the server starts: create_app() never touches it.
 
     Depends on postgres_container to ensure PostgreSQL is running before app creation.
     """
     from app import create_app
+    from scripts.bootstrap import migrate
 
+    migrate()
     app = create_app()
 
     # Provide app context for the entire test session
@@ -75,9 +85,11 @@ def client(app: Flask) -> FlaskClient:
 
 
 @pytest.fixture(scope="function")
-def db_session() -> Generator[Session, None, None]:
+def db_session(app: Flask) -> Generator[Session, None, None]:
     """Provide a database session for direct DB access in tests.
 
+    Depends on app so the database is up and migrated, even for tests without a client.
+
     Note: This session is independent from sessions used by the test client.
     HTTP requests made via the client will use their own get_session() calls
     and commit independently.
@@ -88,6 +100,43 @@ def db_session() -> Generator[Session, None, None]:
         yield session
 
 
+@pytest.fixture(scope="function")
+def query_budget() -> Callable[[int], AbstractContextManager[QueryCounter]]:
+    """Fail the test when a block runs more SQL queries than its declared budget.
+
+    Usage: `with query_budget(3): client.get(...)`. Every statement sent through the
+    app engine is counted, so a lazy load per row (N+1) quickly goes over budget.
+    """
+    from app.database import get_engine
+
+    @contextmanager
+    def _query_budget(max_queries: int) -> Generator[QueryCounter, None, None]:
+        with QueryCounter(get_engine()) as counter:
+            yield counter
+
+        assert counter.count <= max_queries, (
+            f"{counter.count} queries executed, over the budget of {max_queries}:\n"
+            + "\n".join(counter.statements)
+        )
+
+    return _query_budget
+
+
+@pytest.fixture(scope="function")
+def cache_server() -> Generator[LocalCacheServer, None, None]:
+    """Install the network query cache on a local stand-in server for the test."""
+    from app.utils.query_cache import (
+        NetworkBackend,
+        install_query_cache,
+        uninstall_query_cache,
+    )
+
+    server = LocalCacheServer()
+    install_query_cache(NetworkBackend(server, ttl=60))
+    yield server
+    uninstall_query_cache()
+
+
 @pytest.fixture(scope="function")
 def sample_user_data(faker_instance: Faker) -> dict:
     """Generate realistic sample user data for testing."""
@@ -105,7 +154,8 @@ def create_user(db_session: Session, sample_user_data: dict):
     """Create a user in the database and return the User instance.
 
     This fixture returns a function that can be called multiple times
-    to create different users with different data.
+    to create different users with different data. Tests that only need
+    more users use other_user or create_other_user rather than their own data.
     """
 
     def _create_user(user_data: dict | None = None):
@@ -124,6 +174,33 @@ def created_user(create_user):
     return create_user()
 
 
+@pytest.fixture(scope="function")
+def create_other_user(create_user, faker_instance: Faker):
+    """Create users distinct from created_user, their username starting with a prefix.
+
+    This fixture returns a function, for tests that need several other users.
+    """
+
+    def _create_other_user(prefix: str = "other"):
+        """Create a user with random data and a prefixed username."""
+        return create_user(
+            {
+                "name": faker_instance.name(),
+                "username": prefix + str(faker_instance.random_int(min=1000, max=9999)),
+                "email": faker_instance.email(),
+                "password": faker_instance.password(length=12),
+            }
+        )
+
+    return _create_other_user
+
+
+@pytest.fixture(scope="function")
+def other_user(create_other_user):
+    """Create a second user, distinct from created_user."""
+    return create_other_user()
+
+
 @pytest.fixture(scope="function")
 def auth_tokens_for_user(app: Flask):
     """Generate JWT tokens for a given user.
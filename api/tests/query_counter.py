@@ -0,0 +1,28 @@
+"""SQL query counting helper for query budget assertions in tests."""
+
+from typing import Any
+
+from sqlalchemy import Engine, event
+
+
+class QueryCounter:
+    """Record the SQL statements an engine executes while the context is active."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.statements: list[str] = []
+
+    def _before_cursor_execute(self, *args: Any) -> None:
+        # (conn, cursor, statement, parameters, context, executemany)
+        self.statements.append(args[2])
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._before_cursor_execute)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
@@ -0,0 +1,33 @@
+"""Integration tests for response compression."""
+
+import gzip
+import json
+
+import pytest
+from flask.testing import FlaskClient
+
+
+@pytest.mark.integration
+def test_large_response_is_gzipped_when_accepted(client: FlaskClient):
+    """Test the OpenAPI document is gzipped for clients accepting gzip only."""
+    plain = client.get("/openapi/openapi.json")
+    assert plain.status_code == 200
+    assert "Content-Encoding" not in plain.headers
+
+    response = client.get("/openapi/openapi.json", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert len(response.data) < len(plain.data)
+    assert json.loads(gzip.decompress(response.data)) == plain.get_json()
+
+
+@pytest.mark.integration
+def test_small_response_is_not_compressed(client: FlaskClient):
+    """Test bodies under the size threshold are sent as is."""
+    response = client.get("/healthcheck", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert response.get_json()["status"] == "ok"
@@ -3,6 +3,8 @@
 import pytest
 from flask.testing import FlaskClient
 
+from app.routes import healthcheck_routes
+
 
 @pytest.mark.integration
 def test_healthcheck_get_ok(client: FlaskClient):
@@ -26,3 +28,32 @@ def test_healthcheck_post_ok(client: FlaskClient):
     json_data = response.get_json()
     assert json_data is not None
     assert json_data["status"] == "ok"
+
+
+@pytest.mark.integration
+def test_database_stats_report_pool_usage(
+    authenticated_client: FlaskClient, created_user, monkeypatch
+):
+    """Test GET /healthcheck/database reports pool checkouts and their wait times."""
+    monkeypatch.setattr(healthcheck_routes.config, "FIRST_ADMIN_USERNAME", created_user.username)
+
+    response = authenticated_client.get("/healthcheck/database")
+    assert response.status_code == 200
+
+    pool = response.get_json()["pool"]
+    assert pool["size"] > 0
+    assert pool["checkouts"] > 0
+    assert sum(pool["wait_histogram"].values()) == pool["checkouts"]
+    assert pool["hold_time"] > 0
+
+
+@pytest.mark.integration
+def test_database_stats_are_only_for_the_admin(authenticated_client: FlaskClient):
+    """Test GET /healthcheck/database refuses non-admin and anonymous users."""
+    response = authenticated_client.get("/healthcheck/database")
+    assert response.status_code == 403
+
+    authenticated_client.delete_cookie("access_token_cookie", domain="localhost")
+    authenticated_client.delete_cookie("refresh_token_cookie", domain="localhost")
+    response = authenticated_client.get("/healthcheck/database")
+    assert response.status_code == 401
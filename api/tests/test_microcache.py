@@ -0,0 +1,49 @@
+"""Unit tests for the route micro cache and its request coalescing."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.utils.microcache import MicroCache
+
+
+@pytest.mark.unit
+def test_concurrent_requests_share_one_computation():
+    """Test identical concurrent requests wait on a single computation, then hit."""
+    cache: MicroCache[str, str] = MicroCache(ttl=60, max_entries=8)
+    calls = []
+
+    def compute() -> str:
+        calls.append(1)
+        time.sleep(0.2)
+        return "profile"
+
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        results = list(executor.map(lambda _: cache.get_or_compute("key", compute), range(20)))
+
+    assert results == ["profile"] * 20
+    assert len(calls) == 1
+    assert cache.get_or_compute("key", compute) == "profile"
+    assert cache.stats() == {"hits": 1, "misses": 1, "coalesced": 19}
+
+
+@pytest.mark.unit
+def test_errors_reach_waiters_and_are_not_kept():
+    """Test waiters get the computation's error and the next request computes again."""
+    cache: MicroCache[str, str] = MicroCache(ttl=60, max_entries=8)
+
+    def fail() -> str:
+        time.sleep(0.1)
+        raise LookupError("missing")
+
+    def request() -> str:
+        try:
+            return cache.get_or_compute("key", fail)
+        except LookupError:
+            return "error"
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        assert list(executor.map(lambda _: request(), range(5))) == ["error"] * 5
+
+    assert cache.get_or_compute("key", lambda: "found") == "found"
@@ -0,0 +1,406 @@
+"""Integration tests for post routes."""
+
+import gzip
+import json
+from datetime import datetime
+from uuid import UUID
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlmodel import Session
+
+from app.models import PaginationQuery
+from app.routes import post_routes
+from app.services import post_service
+from app.services.post_service import FeedEngine, PostService
+from app.services.user_service import UserService
+
+
+@pytest.mark.integration
+def test_user_posts_cursor_pagination_walks_every_post_once(
+    authenticated_client: FlaskClient, created_user, db_session: Session
+):
+    """Test GET /posts/user/<username> can be walked page by page with nextCursor."""
+    for index in range(5):
+        PostService.create_post(db_session, created_user, f"Post number {index}")
+
+    response = authenticated_client.get(
+        f"/posts/user/{created_user.username}", query_string={"itemsPerPage": 2}
+    )
+    assert response.status_code == 200
+
+    json_data = response.get_json()
+    assert json_data["meta"]["totalCount"] == 5
+    assert json_data["meta"]["hasMore"] is True
+
+    seen_ids = [post["id"] for post in json_data["data"]]
+    cursor = json_data["meta"]["nextCursor"]
+
+    while cursor:
+        response = authenticated_client.get(
+            f"/posts/user/{created_user.username}",
+            query_string={"itemsPerPage": 2, "cursor": cursor},
+        )
+        assert response.status_code == 200
+
+        json_data = response.get_json()
+        seen_ids.extend(post["id"] for post in json_data["data"])
+        cursor = json_data["meta"]["nextCursor"]
+
+    assert len(seen_ids) == 5
+    assert len(set(seen_ids)) == 5
+    assert json_data["meta"]["hasMore"] is False
+
+
+@pytest.mark.integration
+def test_user_posts_invalid_cursor(authenticated_client: FlaskClient, created_user):
+    """Test GET /posts/user/<username> with a malformed cursor returns 400."""
+    response = authenticated_client.get(
+        f"/posts/user/{created_user.username}", query_string={"cursor": "not-a-cursor"}
+    )
+
+    assert response.status_code == 400
+
+    json_data = response.get_json()
+    assert json_data is not None
+    assert json_data["message"] == "Invalid pagination cursor"
+
+
+@pytest.mark.integration
+def test_feed_skips_total_count(
+    authenticated_client: FlaskClient, created_user, db_session: Session
+):
+    """Test GET /posts/feed reports hasMore without computing a total count."""
+    for index in range(3):
+        PostService.create_post(db_session, created_user, f"Feed post {index}")
+
+    response = authenticated_client.get("/posts/feed", query_string={"itemsPerPage": 2})
+
+    assert response.status_code == 200
+
+    json_data = response.get_json()
+    assert len(json_data["data"]) == 2
+    assert json_data["meta"]["hasMore"] is True
+    assert json_data["meta"].get("totalCount") is None
+
+
+@pytest.mark.integration
+def test_feed_follows_fan_out_on_write(
+    authenticated_client: FlaskClient,
+    created_user,
+    create_other_user,
+    db_session: Session,
+):
+    """Test GET /posts/feed shows followed authors' posts until unfollow or deletion."""
+    author = create_other_user("author")
+    UserService.follow_by_username(db_session, created_user.id, author.username)
+
+    kept_post = PostService.create_post(db_session, author, "Kept post")
+    deleted_post = PostService.create_post(db_session, author, "Deleted post")
+    PostService.delete_post(db_session, deleted_post.id, author.id)
+
+    response = authenticated_client.get("/posts/feed")
+    assert response.status_code == 200
+
+    feed_ids = [post["id"] for post in response.get_json()["data"]]
+    assert str(kept_post.id) in feed_ids
+    assert str(deleted_post.id) not in feed_ids
+
+    UserService.unfollow_by_username(db_session, created_user.id, author.username)
+
+    response = authenticated_client.get("/posts/feed")
+    assert response.status_code == 200
+
+    feed_ids = [post["id"] for post in response.get_json()["data"]]
+    assert str(kept_post.id) not in feed_ids
+
+
+@pytest.mark.integration
+def test_feed_engines_return_the_same_posts(created_user, create_other_user, db_session: Session):
+    """Test the lateral feed engine matches the timeline engine, page by page."""
+    for index in range(2):
+        author = create_other_user("author")
+        UserService.follow_by_username(db_session, created_user.id, author.username)
+        for post_index in range(3):
+            PostService.create_post(db_session, author, f"Author {index} post {post_index}")
+    PostService.create_post(db_session, created_user, "Own post")
+
+    pagination = PaginationQuery(items_per_page=3)
+    while True:
+        timeline_posts, timeline_meta = PostService.get_feed_posts(
+            db_session, created_user.id, pagination, engine=FeedEngine.TIMELINE
+        )
+        lateral_posts, lateral_meta = PostService.get_feed_posts(
+            db_session, created_user.id, pagination, engine=FeedEngine.LATERAL
+        )
+
+        assert [post.id for post in lateral_posts] == [post.id for post in timeline_posts]
+        assert lateral_meta.has_more == timeline_meta.has_more
+        assert lateral_meta.next_cursor == timeline_meta.next_cursor
+
+        if not timeline_meta.next_cursor:
+            break
+        pagination = PaginationQuery(items_per_page=3, cursor=timeline_meta.next_cursor)
+
+
+@pytest.mark.integration
+def test_like_and_unlike_maintain_likes_count(
+    authenticated_client: FlaskClient, created_user, db_session: Session
+):
+    """Test POST/DELETE /posts/<post_id>/like keep likesCount in sync, idempotently."""
+    post = PostService.create_post(db_session, created_user, "Likeable post")
+
+    response = authenticated_client.post(f"/posts/{post.id}/like")
+    assert response.status_code == 200
+    assert response.get_json()["likesCount"] == 1
+    assert response.get_json()["isLiked"] is True
+
+    response = authenticated_client.post(f"/posts/{post.id}/like")
+    assert response.status_code == 200
+    assert response.get_json()["likesCount"] == 1
+
+    response = authenticated_client.delete(f"/posts/{post.id}/like")
+    assert response.status_code == 200
+    assert response.get_json()["likesCount"] == 0
+    assert response.get_json()["isLiked"] is False
+
+    response = authenticated_client.delete(f"/posts/{post.id}/like")
+    assert response.status_code == 404
+
+    assert PostService.reconcile_likes_counts(db_session) == 0
+
+
+@pytest.mark.integration
+def test_feed_page_stays_within_query_budget(
+    authenticated_client: FlaskClient,
+    created_user,
+    create_other_user,
+    db_session: Session,
+    query_budget,
+):
+    """Test GET /posts/feed loads authors eagerly instead of one query per post."""
+    for index in range(3):
+        author = create_other_user("author")
+        UserService.follow_by_username(db_session, created_user.id, author.username)
+        for post_index in range(2):
+            PostService.create_post(db_session, author, f"Author {index} post {post_index}")
+
+    # Page version, page query and liked posts lookup
+    with query_budget(3):
+        response = authenticated_client.get("/posts/feed")
+
+    assert response.status_code == 200
+
+    posts = response.get_json()["data"]
+    assert len(posts) == 6
+    assert all(post["author"]["username"] for post in posts)
+
+
+@pytest.mark.integration
+def test_unchanged_feed_is_not_modified(
+    authenticated_client: FlaskClient, created_user, db_session: Session, query_budget
+):
+    """Test GET /posts/feed answers 304 to a current ETag, from the page version alone."""
+    post = PostService.create_post(db_session, created_user, "Polled post")
+
+    response = authenticated_client.get("/posts/feed")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    with query_budget(1):
+        response = authenticated_client.get("/posts/feed", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.get_data() == b""
+
+    # Likes only touch a counter, they still change the version
+    PostService.like_post(db_session, post.id, created_user.id)
+
+    response = authenticated_client.get("/posts/feed", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.get_json()["data"][0]["isLiked"] is True
+
+
+@pytest.mark.integration
+def test_compressed_feed_etag_is_revalidated(
+    authenticated_client: FlaskClient, created_user, db_session: Session
+):
+    """Test a gzipped feed page gets its own ETag, which revalidates the same way."""
+    for index in range(10):
+        PostService.create_post(db_session, created_user, f"Compressed feed post {index}")
+
+    headers = {"Accept-Encoding": "gzip"}
+    response = authenticated_client.get("/posts/feed", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    etag = response.headers["ETag"]
+    assert etag.endswith('-gzip"')
+
+    response = authenticated_client.get("/posts/feed", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
+@pytest.mark.integration
+def test_like_stays_within_query_budget(
+    authenticated_client: FlaskClient, created_user, db_session: Session, query_budget
+):
+    """Test POST /posts/<post_id>/like loads the post author without a lazy load."""
+    post = PostService.create_post(db_session, created_user, "Budgeted post")
+
+    # Post lookup, like insert, counter update and post reload
+    with query_budget(4):
+        response = authenticated_client.post(f"/posts/{post.id}/like")
+
+    assert response.status_code == 200
+    assert response.get_json()["author"]["id"] == str(created_user.id)
+
+
+@pytest.mark.integration
+def test_user_posts_rows_carry_author_and_viewer_flags(
+    authenticated_client: FlaskClient, created_user, db_session: Session
+):
+    """Test GET /posts/user/<username> builds posts with their author and isLiked."""
+    liked_post = PostService.create_post(db_session, created_user, "Liked post")
+    PostService.create_post(db_session, created_user, "Plain post")
+    PostService.like_post(db_session, liked_post.id, created_user.id)
+
+    response = authenticated_client.get(f"/posts/user/{created_user.username}")
+    assert response.status_code == 200
+
+    posts = {post["id"]: post for post in response.get_json()["data"]}
+    assert len(posts) == 2
+    assert all(post["author"]["username"] == created_user.username for post in posts.values())
+
+    liked = posts.pop(str(liked_post.id))
+    assert liked["isLiked"] is True
+    assert liked["likesCount"] == 1
+    [plain] = posts.values()
+    assert plain["isLiked"] is False
+
+
+@pytest.mark.integration
+def test_viewers_share_post_cores_but_not_flags(
+    app: Flask,
+    authenticated_client: FlaskClient,
+    created_user,
+    create_other_user,
+    auth_tokens_for_user,
+    db_session: Session,
+    query_budget,
+):
+    """Test a second viewer gets the posts' shared cores with their own isLiked."""
+    post = PostService.create_post(db_session, created_user, "Popular post")
+    PostService.like_post(db_session, post.id, created_user.id)
+
+    viewer = create_other_user("viewer")
+    viewer_client = app.test_client()
+    viewer_client.set_cookie(
+        key="access_token_cookie",
+        value=auth_tokens_for_user(viewer)["access_token_cookie"],
+        domain="localhost",
+    )
+
+    [own] = authenticated_client.get(f"/posts/user/{created_user.username}").get_json()["data"]
+
+    # Author lookup and page version, the posts themselves are not loaded again
+    with query_budget(2):
+        response = viewer_client.get(f"/posts/user/{created_user.username}")
+    [seen] = response.get_json()["data"]
+
+    assert own.pop("isLiked") is True
+    assert seen.pop("isLiked") is False
+    assert own == seen
+
+    # A new like changes the shared core
+    PostService.like_post(db_session, post.id, viewer.id)
+
+    [seen] = viewer_client.get(f"/posts/user/{created_user.username}").get_json()["data"]
+    assert seen["isLiked"] is True
+    assert seen["likesCount"] == 2
+
+
+@pytest.mark.integration
+def test_user_posts_json_encodes_uuid_and_iso_datetimes(
+    authenticated_client: FlaskClient, created_user, db_session: Session
+):
+    """Test list responses are JSON with string UUIDs and ISO 8601 datetimes."""
+    post = PostService.create_post(db_session, created_user, "Encoded post")
+
+    response = authenticated_client.get(f"/posts/user/{created_user.username}")
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/json"
+
+    [encoded_post] = response.get_json()["data"]
+    assert UUID(encoded_post["id"]) == post.id
+    assert datetime.fromisoformat(encoded_post["createdAt"]) == post.created_at
+
+
+@pytest.mark.integration
+def test_large_user_posts_pages_are_streamed(
+    authenticated_client: FlaskClient, created_user, db_session: Session, monkeypatch
+):
+    """Test GET /posts/user/<username> streams big pages with the same content and meta."""
+    for index in range(5):
+        PostService.create_post(db_session, created_user, f"Streamed post {index}")
+
+    buffered = authenticated_client.get(
+        f"/posts/user/{created_user.username}", query_string={"itemsPerPage": 3}
+    )
+    assert buffered.status_code == 200
+    # The test client wraps every body in an iterator, only a buffered body has a length
+    assert "Content-Length" in buffered.headers
+
+    monkeypatch.setattr(post_routes.config, "STREAM_MIN_ITEMS_PER_PAGE", 3)
+    monkeypatch.setattr(post_service.config, "STREAM_BATCH_SIZE", 2)
+    streamed = authenticated_client.get(
+        f"/posts/user/{created_user.username}", query_string={"itemsPerPage": 3}
+    )
+    assert streamed.status_code == 200
+    assert "Content-Length" not in streamed.headers
+
+    assert streamed.get_json() == buffered.get_json()
+    assert streamed.get_json()["meta"]["totalCount"] == 5
+    assert streamed.get_json()["meta"]["hasMore"] is True
+
+
+@pytest.mark.integration
+def test_streamed_user_posts_of_unknown_user(
+    authenticated_client: FlaskClient, created_user, monkeypatch
+):
+    """Test a streamed page still answers 404 when the user doesn't exist."""
+    monkeypatch.setattr(post_routes.config, "STREAM_MIN_ITEMS_PER_PAGE", 1)
+
+    response = authenticated_client.get("/posts/user/nobody_here")
+
+    assert response.status_code == 404
+
+
+@pytest.mark.integration
+def test_export_user_posts_as_ndjson(
+    authenticated_client: FlaskClient, created_user, db_session: Session
+):
+    """Test GET /posts/user/<username>/export streams every post, plain and gzipped."""
+    post_ids = {
+        str(PostService.create_post(db_session, created_user, f"Exported post {index}").id)
+        for index in range(3)
+    }
+
+    response = authenticated_client.get(f"/posts/user/{created_user.username}/export")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert "attachment" in response.headers["Content-Disposition"]
+
+    lines = response.get_data().splitlines()
+    assert {json.loads(line)["id"] for line in lines} == post_ids
+
+    response = authenticated_client.get(
+        f"/posts/user/{created_user.username}/export", query_string={"gzip": "true"}
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "application/gzip"
+    assert gzip.decompress(response.get_data()).splitlines() == lines
@@ -0,0 +1,175 @@
+"""Tests for the query-result cache, its backends and its table-version invalidation."""
+
+import time
+
+import pytest
+from flask.testing import FlaskClient
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, insert
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, col, func, select, update
+from werkzeug.exceptions import NotFound
+
+from app.database import get_engine
+from app.models import PaginationQuery, Post
+from app.services.post_service import PostService
+from app.services.user_service import UserService
+from app.utils.pagination import CountStrategy
+from app.utils.query_cache import (
+    MemoryBackend,
+    NetworkBackend,
+    install_query_cache,
+    uninstall_query_cache,
+)
+from tests.cache_server import UnreachableCacheServer
+from tests.query_counter import QueryCounter
+
+
+@pytest.mark.unit
+def test_memory_backend_expires_results_after_ttl():
+    """Test MemoryBackend forgets a result once its TTL is over."""
+    backend = MemoryBackend(max_entries=8, ttl=0.05)
+    backend.set("key", b"result")
+    assert backend.get("key") == b"result"
+
+    time.sleep(0.1)
+
+    assert backend.get("key") is None
+
+
+@pytest.mark.unit
+def test_memory_backend_evicts_least_recently_used_results():
+    """Test MemoryBackend keeps max_entries results, dropping the least recently read."""
+    backend = MemoryBackend(max_entries=2, ttl=60)
+    backend.set("first", b"1")
+    backend.set("second", b"2")
+    assert backend.get("first") == b"1"
+
+    backend.set("third", b"3")
+
+    assert backend.get("second") is None
+    assert backend.get("first") == b"1"
+    assert backend.get("third") == b"3"
+
+
+@pytest.mark.unit
+def test_memory_backend_version_bumps_invalidate_results():
+    """Test a commit writing a table bumps its version, its cached results are read again."""
+    metadata = MetaData()
+    notes = Table("note", metadata, Column("id", Integer, primary_key=True), Column("text", String))
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    metadata.create_all(engine)
+
+    backend = MemoryBackend(max_entries=8, ttl=60)
+    install_query_cache(backend)
+    try:
+        with Session(engine) as session:
+
+            def read_notes() -> list[str]:
+                statement = select(notes.c.text).execution_options(query_cache=True)
+                return list(session.exec(statement))
+
+            session.exec(insert(notes).values(text="first"))
+            session.commit()
+            assert backend.get_versions(["note"]) == [1]
+            assert read_notes() == ["first"]
+
+            with QueryCounter(engine) as counter:
+                assert read_notes() == ["first"]
+            assert counter.count == 0
+
+            session.exec(insert(notes).values(text="second"))
+            session.commit()
+            assert backend.get_versions(["note"]) == [2]
+
+            assert read_notes() == ["first", "second"]
+    finally:
+        uninstall_query_cache()
+
+
+@pytest.mark.integration
+def test_cached_user_is_invalidated_by_writes(
+    cache_server, created_user, db_session: Session, query_budget
+):
+    """Test get_by_username is served from the cache until the user table is written."""
+    UserService.get_by_username(db_session, created_user.username)
+
+    with query_budget(0):
+        user = UserService.get_by_username(db_session, created_user.username)
+    assert user.id == created_user.id
+
+    UserService.delete_by_id(db_session, created_user.id, created_user.username)
+
+    with pytest.raises(NotFound):
+        UserService.get_by_username(db_session, created_user.username)
+
+
+@pytest.mark.integration
+def test_cached_user_posts_see_new_posts(
+    cache_server, created_user, db_session: Session, query_budget
+):
+    """Test get_user_posts re-reads the page once a post is created."""
+    PostService.create_post(db_session, created_user, "First post")
+
+    def get_posts():
+        posts, _ = PostService.get_user_posts(
+            session=db_session,
+            current_user_id=created_user.id,
+            author=created_user,
+            pagination=PaginationQuery(),
+            count_strategy=CountStrategy.WINDOW,
+        )
+        return posts
+
+    assert len(get_posts()) == 1
+
+    # Only the viewer's like flags are read
+    with query_budget(1):
+        assert len(get_posts()) == 1
+
+    PostService.create_post(db_session, created_user, "Second post")
+
+    assert [post.content for post in get_posts()] == ["Second post", "First post"]
+    assert "INCR" in cache_server.commands
+
+
+@pytest.mark.integration
+def test_unreachable_cache_server_falls_back_to_the_database(created_user, db_session: Session):
+    """Test cache server errors never fail a read."""
+    install_query_cache(NetworkBackend(UnreachableCacheServer(), ttl=60))
+    try:
+        user = UserService.get_by_username(db_session, created_user.username)
+    finally:
+        uninstall_query_cache()
+
+    assert user.id == created_user.id
+
+
+@pytest.mark.integration
+def test_memory_cached_page_never_outlives_its_etag(
+    authenticated_client: FlaskClient, created_user, db_session: Session
+):
+    """Test a page cached per worker is not served under the ETag of a newer version."""
+    post = PostService.create_post(db_session, created_user, "Original post")
+
+    install_query_cache(MemoryBackend(max_entries=100, ttl=60))
+    try:
+        response = authenticated_client.get(f"/posts/user/{created_user.username}")
+        assert response.get_json()["data"][0]["content"] == "Original post"
+
+        # Written outside of any session, as by another worker: the versions are not bumped
+        with get_engine().begin() as connection:
+            connection.execute(
+                update(Post)
+                .where(col(Post.id) == post.id)
+                .values(content="Edited post", updated_at=func.now())
+            )
+
+        response = authenticated_client.get(
+            f"/posts/user/{created_user.username}",
+            headers={"If-None-Match": response.headers["ETag"]},
+        )
+    finally:
+        uninstall_query_cache()
+
+    assert response.status_code == 200
+    assert response.get_json()["data"][0]["content"] == "Edited post"
@@ -0,0 +1,72 @@
+"""Integration tests for the primary/replica read routing.
+
+The replica is a second, empty PostgreSQL instance rather than a streaming replica, so
+what a read returns tells which instance served it: the primary's writes never reach it.
+"""
+
+from collections.abc import Generator
+
+import pytest
+from flask.testing import FlaskClient
+from sqlalchemy import Engine
+from sqlmodel import SQLModel, create_engine
+from testcontainers.core.container import LogMessageWaitStrategy
+from testcontainers.postgres import PostgresContainer
+
+from app.database import READ_YOUR_WRITES_COOKIE, set_engine
+from tests.query_counter import QueryCounter
+
+
+@pytest.fixture(scope="module")
+def replica_engine(app) -> Generator[Engine, None, None]:
+    """Start a second PostgreSQL instance with the schema and route the replica reads to it."""
+    container = PostgresContainer("postgres:17", driver="psycopg2").waiting_for(
+        LogMessageWaitStrategy("database system is ready to accept connections")
+    )
+    with container:
+        engine = create_engine(container.get_connection_url())
+        with engine.begin() as conn:
+            conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS unaccent")
+        SQLModel.metadata.create_all(engine)
+
+        set_engine("replica", engine)
+        yield engine
+        set_engine("replica", None)
+        engine.dispose()
+
+
+@pytest.mark.integration
+def test_routed_reads_go_to_replica(
+    authenticated_client: FlaskClient, created_user, other_user, replica_engine: Engine
+):
+    """Test follow lists are read from the replica, profiles and writes from the primary."""
+    response = authenticated_client.post(f"/users/{other_user.username}/follow")
+    assert response.status_code == 200
+    authenticated_client.delete_cookie(READ_YOUR_WRITES_COOKIE, domain="localhost")
+
+    with QueryCounter(replica_engine) as counter:
+        response = authenticated_client.get(f"/users/{other_user.username}/followers")
+    assert response.status_code == 200
+    assert response.get_json()["data"] == []
+    assert counter.count > 0
+
+    with QueryCounter(replica_engine) as counter:
+        response = authenticated_client.get(f"/users/{other_user.username}")
+    assert response.status_code == 200
+    assert response.get_json()["followersCount"] == 1
+    assert counter.count == 0
+
+
+@pytest.mark.integration
+def test_client_reads_its_writes_until_replica_replays_them(
+    authenticated_client: FlaskClient, created_user, other_user, replica_engine: Engine
+):
+    """Test a client that just wrote reads from the primary while the replica lags."""
+    response = authenticated_client.post(f"/users/{other_user.username}/follow")
+    assert response.status_code == 200
+    assert authenticated_client.get_cookie(READ_YOUR_WRITES_COOKIE, domain="localhost")
+
+    response = authenticated_client.get(f"/users/{other_user.username}/followers")
+    assert response.status_code == 200
+    assert [user["id"] for user in response.get_json()["data"]] == [str(created_user.id)]
@@ -0,0 +1,58 @@
+"""Integration tests for the request-scoped session."""
+
+import pytest
+from flask import Flask, Response
+from flask.testing import FlaskClient
+from sqlmodel import Session, col, select, text
+
+from app.database import get_session, pool_stats
+from app.middlewares.unit_of_work import commit_request_session
+from app.models import UserFollow
+from app.services.user_service import UserService
+
+
+def _is_following(session: Session, follower_id, following_id) -> bool:
+    return (
+        session.exec(
+            select(UserFollow).where(
+                col(UserFollow.follower_id) == follower_id,
+                col(UserFollow.following_id) == following_id,
+            )
+        ).first()
+        is not None
+    )
+
+
+@pytest.mark.integration
+def test_write_request_commits_once_on_one_connection(
+    authenticated_client: FlaskClient, created_user, other_user, db_session: Session
+):
+    """Test a follow and the detail read after it share one transaction and connection."""
+    pool_stats.reset()
+    response = authenticated_client.post(f"/users/{other_user.username}/follow")
+    assert response.status_code == 200
+    assert response.get_json()["followersCount"] == 1
+
+    assert pool_stats.checkouts == 1
+    assert _is_following(db_session, created_user.id, other_user.id)
+
+
+@pytest.mark.integration
+def test_failed_request_rolls_back_its_writes(
+    app: Flask, created_user, other_user, db_session: Session
+):
+    """Test the writes of a request answered with an error are never committed."""
+    with app.test_request_context(method="POST"):
+        with get_session() as session:
+            UserService.follow_by_username(session, created_user.id, other_user.username)
+        commit_request_session(Response(status=500))
+
+    assert not _is_following(db_session, created_user.id, other_user.id)
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize(("method", "read_only"), [("GET", "on"), ("POST", "off")])
+def test_read_requests_run_read_only_transactions(app: Flask, method: str, read_only: str):
+    """Test GET requests read in READ ONLY transactions, writing requests don't."""
+    with app.test_request_context(method=method), get_session() as session:
+        assert session.exec(text("SHOW transaction_read_only")).one()[0] == read_only
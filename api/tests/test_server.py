@@ -0,0 +1,70 @@
+"""Integration tests for the preloaded server hooks."""
+
+import gc
+import os
+
+import pytest
+from sqlmodel import text
+
+from app.database import get_engine
+from app.utils.server import init_worker, memory_usage, prepare_fork, warm_worker
+
+
+@pytest.mark.integration
+def test_preloaded_heap_is_frozen_until_the_worker_starts():
+    """Test the master freezes its heap for the fork and the worker collects again."""
+    gc.disable()
+    try:
+        prepare_fork()
+        assert gc.get_freeze_count() > 0
+        assert not gc.isenabled()
+
+        init_worker()
+        assert gc.isenabled()
+    finally:
+        gc.unfreeze()
+        gc.enable()
+
+
+@pytest.mark.integration
+def test_forked_worker_opens_its_own_connections(app):
+    """Test a forked worker never reuses the connections of the process it forked from."""
+    with get_engine().connect() as connection:
+        parent_pid = connection.execute(text("SELECT pg_backend_pid()")).scalar_one()
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # Child: report the backend serving it, never return into pytest
+            status = 1
+            try:
+                os.close(read_fd)
+                init_worker()
+                warm_worker(started_at=0.0)
+                with get_engine().connect() as child_connection:
+                    child_pid = child_connection.execute(
+                        text("SELECT pg_backend_pid()")
+                    ).scalar_one()
+                os.write(write_fd, str(child_pid).encode())
+                status = 0
+            finally:
+                os._exit(status)
+
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            child_pid = int(pipe.read() or 0)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+        assert child_pid not in (0, parent_pid)
+
+        # The connection checked out across the fork still works in the parent
+        assert connection.execute(text("SELECT pg_backend_pid()")).scalar_one() == parent_pid
+
+
+@pytest.mark.integration
+def test_memory_usage_reports_private_memory():
+    """Test the worker memory report splits private memory from shared pages."""
+    usage = memory_usage()
+    if not usage:
+        pytest.skip("/proc/self/smaps_rollup is only available on Linux")
+    assert 0 < usage["uss"] <= usage["rss"]
@@ -0,0 +1,31 @@
+"""Integration tests for the app startup."""
+
+import sys
+
+import pytest
+
+from app.database import get_engine
+from tests.query_counter import QueryCounter
+
+
+@pytest.mark.integration
+def test_create_app_does_no_database_work(app):
+    """Test creating the app runs no SQL and leaves the seed fixtures unimported."""
+    from app import create_app
+
+    with QueryCounter(get_engine()) as counter:
+        create_app()
+
+    assert counter.count == 0, "\n".join(counter.statements)
+    assert "fixtures.fake_data_fixtures" not in sys.modules
+
+
+@pytest.mark.integration
+def test_create_app_records_startup_steps(app):
+    """Test the duration of each startup step is recorded on the app."""
+    startup = app.extensions["startup"]
+
+    assert set(startup) == {"imports", "app", "extensions", "routes", "total"}
+    assert startup["total"] >= sum(
+        duration for step, duration in startup.items() if step != "total"
+    )
@@ -0,0 +1,58 @@
+"""Integration tests for hot statements built once and served from the compiled cache."""
+
+import pytest
+from sqlmodel import Session
+
+from app.database import get_compiled_cache_stats, reset_compiled_cache_stats
+from app.models import PaginationQuery
+from app.services.post_service import PostService
+from app.services.user_service import UserService
+from app.utils.pagination import CountStrategy
+
+
+@pytest.mark.integration
+def test_search_with_other_terms_hits_the_compiled_cache(
+    created_user, other_user, db_session: Session
+):
+    """Test a search for another term reuses the compiled statements of the first one."""
+    # A matching term runs the viewer flags queries too, the count compiles on its second run
+    for _ in range(2):
+        users, _ = UserService.search(
+            db_session, created_user.id, other_user.username, PaginationQuery()
+        )
+        assert users
+
+    reset_compiled_cache_stats()
+    users, _ = UserService.search(
+        db_session, created_user.id, created_user.username, PaginationQuery()
+    )
+    assert users
+
+    stats = get_compiled_cache_stats()
+    assert stats.get("CACHE_MISS", 0) == 0
+    assert stats["hit_rate"] == 1
+
+
+@pytest.mark.integration
+def test_feed_pages_of_other_viewers_hit_the_compiled_cache(
+    created_user, other_user, db_session: Session
+):
+    """Test feed pages of another viewer, page and cursor reuse the compiled statements."""
+    for index in range(3):
+        PostService.create_post(db_session, created_user, f"Post {index}")
+    UserService.follow_by_username(db_session, other_user.id, created_user.username)
+
+    def read_feed(viewer_id, pagination: PaginationQuery):
+        return PostService.get_feed_posts(
+            db_session, viewer_id, pagination, count_strategy=CountStrategy.WINDOW
+        )
+
+    _, meta = read_feed(created_user.id, PaginationQuery(items_per_page=1))
+    read_feed(created_user.id, PaginationQuery(items_per_page=1, cursor=meta.next_cursor))
+
+    reset_compiled_cache_stats()
+    posts, meta = read_feed(other_user.id, PaginationQuery(items_per_page=2))
+    posts += read_feed(other_user.id, PaginationQuery(items_per_page=2, cursor=meta.next_cursor))[0]
+
+    assert [post.content for post in posts] == ["Post 2", "Post 1", "Post 0"]
+    assert get_compiled_cache_stats().get("CACHE_MISS", 0) == 0
@@ -0,0 +1,85 @@
+"""Integration tests for the user cards shared by the workers of a node."""
+
+import os
+from uuid import uuid4
+
+import pytest
+from flask.testing import FlaskClient
+from sqlmodel import Session
+from werkzeug.exceptions import NotFound
+
+from app.services.user_service import UserService
+from app.utils.user_cards import UserCard, UserCardTable, get_user_card
+
+
+@pytest.mark.integration
+def test_card_lookups_skip_the_database(created_user, db_session: Session, query_budget):
+    """Test get_card_by_username reads the database once, then the shared card."""
+    UserService.get_card_by_username(db_session, created_user.username)
+
+    with query_budget(0):
+        card = UserService.get_card_by_username(db_session, created_user.username)
+
+    assert card.id == created_user.id
+    assert card.name == created_user.name
+
+
+@pytest.mark.integration
+def test_card_is_invalidated_by_committed_writes(
+    authenticated_client: FlaskClient, other_user, db_session: Session
+):
+    """Test follows and account deletion invalidate the card once committed."""
+    UserService.get_card_by_username(db_session, other_user.username)
+
+    response = authenticated_client.post(f"/users/{other_user.username}/follow")
+    assert response.status_code == 200
+    assert get_user_card(other_user.username) is None
+
+    card = UserService.get_card_by_username(db_session, other_user.username)
+    assert card.followers_count == 1
+
+    UserService.delete_by_id(db_session, other_user.id, other_user.username)
+    assert get_user_card(other_user.username) is None
+
+    with pytest.raises(NotFound):
+        UserService.get_card_by_username(db_session, other_user.username)
+
+    response = authenticated_client.get(f"/posts/user/{other_user.username}")
+    assert response.status_code == 404
+
+
+@pytest.mark.integration
+def test_cards_are_shared_with_forked_workers(created_user, db_session: Session):
+    """Test a card filled by a forked process is read by its parent, and the reverse."""
+    table = UserCardTable(slots=64, ttl=60)
+    card = UserService.get_card_by_username(db_session, created_user.username)
+
+    pid = os.fork()
+    if pid == 0:
+        table.set(card, table.stamp(card.username))
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+    assert table.get(created_user.username) == card
+
+    table.invalidate([card.username])
+    assert table.get(created_user.username) is None
+    assert table.stats() == {"hits": 1, "misses": 1, "stale": 1, "fills": 0}
+    table.close()
+
+
+@pytest.mark.unit
+def test_card_read_before_a_commit_is_not_shared():
+    """Test a card stamped before a commit invalidating it is never published."""
+    table = UserCardTable(slots=64, ttl=60)
+    card = UserCard(uuid4(), "racer", "Racer", None, 0, 0, 0)
+
+    stamp = table.stamp(card.username)
+    # A soft delete or a follow commits between the SELECT and set()
+    table.invalidate([card.username])
+    table.set(card, stamp)
+    assert table.get(card.username) is None
+
+    table.set(card, table.stamp(card.username))
+    assert table.get(card.username) == card
+    table.close()
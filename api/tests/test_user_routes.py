@@ -0,0 +1,212 @@
+"""Integration tests for user routes."""
+
+import json
+
+import pytest
+from flask.testing import FlaskClient
+from sqlmodel import Session
+
+from app.routes.user_routes import user_detail_cache
+from app.services.post_service import PostService
+from app.services.user_service import UserService
+
+
+@pytest.mark.integration
+def test_follow_and_unfollow_maintain_counters(
+    authenticated_client: FlaskClient, created_user, other_user, db_session: Session
+):
+    """Test POST/DELETE /users/<username>/follow keep follow counters in sync."""
+    response = authenticated_client.post(f"/users/{other_user.username}/follow")
+    assert response.status_code == 200
+
+    json_data = response.get_json()
+    assert json_data["followersCount"] == 1
+    assert json_data["isFollowing"] is True
+
+    # Following twice is idempotent
+    response = authenticated_client.post(f"/users/{other_user.username}/follow")
+    assert response.status_code == 200
+    assert response.get_json()["followersCount"] == 1
+
+    response = authenticated_client.get(f"/users/{created_user.username}")
+    assert response.status_code == 200
+    assert response.get_json()["followingCount"] == 1
+
+    response = authenticated_client.delete(f"/users/{other_user.username}/follow")
+    assert response.status_code == 200
+
+    json_data = response.get_json()
+    assert json_data["followersCount"] == 0
+    assert json_data["isFollowing"] is False
+
+    assert UserService.reconcile_counters(db_session) == 0
+
+
+@pytest.mark.integration
+def test_posts_count_follows_create_and_delete(
+    authenticated_client: FlaskClient, created_user, db_session: Session
+):
+    """Test GET /users/<username> reports postsCount maintained by create and delete."""
+    post = PostService.create_post(db_session, created_user, "Counted post")
+    PostService.create_post(db_session, created_user, "Another counted post")
+    PostService.delete_post(db_session, post.id, created_user.id)
+
+    response = authenticated_client.get(f"/users/{created_user.username}")
+
+    assert response.status_code == 200
+    assert response.get_json()["postsCount"] == 1
+
+
+@pytest.mark.integration
+def test_followers_list_overlays_viewer_flags(
+    authenticated_client: FlaskClient, created_user, other_user, db_session: Session
+):
+    """Test GET /users/<username>/followers reports the viewer's follow flags per user."""
+    UserService.follow_by_username(db_session, other_user.id, created_user.username)
+
+    response = authenticated_client.get(f"/users/{created_user.username}/followers")
+    assert response.status_code == 200
+
+    [follower] = response.get_json()["data"]
+    assert follower["id"] == str(other_user.id)
+    assert follower["isFollowing"] is False
+    assert follower["isFollowedBy"] is True
+
+    UserService.follow_by_username(db_session, created_user.id, other_user.username)
+
+    response = authenticated_client.get(f"/users/{created_user.username}/followers")
+    assert response.status_code == 200
+
+    [follower] = response.get_json()["data"]
+    assert follower["isFollowing"] is True
+    assert follower["isFollowedBy"] is True
+
+
+@pytest.mark.integration
+def test_user_detail_stays_within_query_budget(
+    authenticated_client: FlaskClient, other_user, query_budget
+):
+    """Test GET /users/<username> loads the profile with the user."""
+    # Version with both follow flags, then user with profile
+    with query_budget(2):
+        response = authenticated_client.get(f"/users/{other_user.username}")
+
+    assert response.status_code == 200
+    assert "profile" in response.get_json()
+
+
+@pytest.mark.integration
+def test_deleted_user_detail_says_the_account_is_deleted(
+    authenticated_client: FlaskClient, other_user, db_session: Session
+):
+    """Test GET /users/<username> tells a deleted account apart from an unknown user."""
+    UserService.delete_by_id(db_session, other_user.id, other_user.username)
+
+    response = authenticated_client.get(f"/users/{other_user.username}")
+    assert response.status_code == 404
+    assert response.get_json()["message"] == (
+        f"This account ({other_user.username}) has been deleted."
+    )
+
+
+@pytest.mark.integration
+def test_unchanged_user_detail_is_not_modified(
+    authenticated_client: FlaskClient, created_user, other_user, db_session: Session, query_budget
+):
+    """Test GET /users/<username> answers 304 until the user or the viewer's flags change."""
+    response = authenticated_client.get(f"/users/{other_user.username}")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+    # Only the version is read, even once the profile left the micro cache
+    user_detail_cache.delete(other_user.username)
+    with query_budget(1):
+        response = authenticated_client.get(
+            f"/users/{other_user.username}", headers={"If-None-Match": etag}
+        )
+    assert response.status_code == 304
+
+    UserService.follow_by_username(db_session, created_user.id, other_user.username)
+
+    response = authenticated_client.get(
+        f"/users/{other_user.username}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.get_json()["isFollowing"] is True
+
+
+@pytest.mark.integration
+def test_micro_cached_user_detail_keeps_viewer_flags(
+    client: FlaskClient,
+    created_user,
+    other_user,
+    auth_tokens_for_user,
+    db_session: Session,
+    query_budget,
+):
+    """Test viewers of a micro-cached profile each get their own follow flags."""
+    UserService.follow_by_username(db_session, created_user.id, other_user.username)
+
+    def get_detail_as(user):
+        for name, value in auth_tokens_for_user(user).items():
+            client.set_cookie(key=name, value=value, domain="localhost")
+        return client.get(f"/users/{other_user.username}").get_json()
+
+    assert get_detail_as(created_user)["isFollowing"] is True
+
+    # The profile is reused, only its version with the viewer's flags is read
+    with query_budget(1):
+        detail = get_detail_as(other_user)
+    assert detail["isFollowing"] is False
+    assert detail["username"] == other_user.username
+
+
+@pytest.mark.integration
+def test_micro_cached_user_detail_never_outlives_its_version(
+    authenticated_client: FlaskClient, created_user, other_user, db_session: Session
+):
+    """Test a profile changed by another worker is reloaded rather than sent with a new ETag."""
+    response = authenticated_client.get(f"/users/{other_user.username}")
+    assert response.get_json()["followersCount"] == 0
+
+    # Written without going through this worker's routes, its micro cache is left as is
+    UserService.follow_by_username(db_session, created_user.id, other_user.username)
+
+    response = authenticated_client.get(f"/users/{other_user.username}")
+    assert response.status_code == 200
+    assert response.get_json()["followersCount"] == 1
+    assert response.get_json()["isFollowing"] is True
+
+
+@pytest.mark.integration
+def test_export_followers_as_ndjson(
+    authenticated_client: FlaskClient, created_user, other_user, db_session: Session
+):
+    """Test GET /users/<username>/followers/export streams one follower per line."""
+    UserService.follow_by_username(db_session, other_user.id, created_user.username)
+
+    response = authenticated_client.get(f"/users/{created_user.username}/followers/export")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+
+    [line] = response.get_data().splitlines()
+    assert json.loads(line)["id"] == str(other_user.id)
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize(
+    "export_path",
+    ["/posts/user/{}/export", "/users/{}/followers/export", "/users/{}/following/export"],
+)
+def test_exports_of_unknown_or_deleted_users_are_not_found(
+    authenticated_client: FlaskClient, other_user, db_session: Session, export_path: str
+):
+    """Test every export answers 404 rather than an empty download for a missing user."""
+    response = authenticated_client.get(export_path.format("nobody-at-all"))
+    assert response.status_code == 404
+
+    UserService.delete_by_id(db_session, other_user.id, other_user.username)
+
+    response = authenticated_client.get(export_path.format(other_user.username))
+    assert response.status_code == 404
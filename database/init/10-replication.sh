@@ -0,0 +1,3 @@
+#!/bin/sh
+# Let the read replica (docker compose --profile replica) stream the WAL of this server
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -90,6 +90,23 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
+    "/healthcheck/database": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        /** @description Connection pool and compiled statement cache statistics of this worker */
+        get: operations["healthcheck_database_stats_healthcheck_database_get"];
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
     "/posts": {
         parameters: {
             query?: never;
@@ -126,6 +143,25 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
+    "/posts/user/{username}/export": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path: {
+                username: string;
+            };
+            cookie?: never;
+        };
+        /** @description Export all posts of a user as newline-delimited JSON */
+        get: operations["posts_export_user_posts_posts_user__string_username__export_get"];
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
     "/posts/{post_id}": {
         parameters: {
             query?: never;
@@ -294,6 +330,44 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
+    "/users/{username}/followers/export": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path: {
+                username: string;
+            };
+            cookie?: never;
+        };
+        /** @description Export all followers of a user as newline-delimited JSON */
+        get: operations["user_export_user_followers_route_users__string_username__followers_export_get"];
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
+    "/users/{username}/following/export": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path: {
+                username: string;
+            };
+            cookie?: never;
+        };
+        /** @description Export all users followed by a user as newline-delimited JSON */
+        get: operations["user_export_user_following_route_users__string_username__following_export_get"];
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
 }
 export type webhooks = Record<string, never>;
 export interface components {
@@ -408,6 +482,11 @@ export interface components {
              * @default 0
              */
             followingCount: number;
+            /**
+             * Postscount
+             * @default 0
+             */
+            postsCount: number;
         };
         /** UserCreate */
         UserCreate: {
@@ -445,6 +524,17 @@ export interface components {
             /** Status */
             status: string;
         };
+        /** DatabaseStatsResponse */
+        DatabaseStatsResponse: {
+            /** Pool */
+            pool: {
+                [key: string]: unknown;
+            };
+            /** Compiledcache */
+            compiledCache: {
+                [key: string]: unknown;
+            };
+        };
         /** PostPublic */
         PostPublic: {
             /**
@@ -501,10 +591,24 @@ export interface components {
              * @default 24
              */
             itemsPerPage: number;
-            /** Totalcount */
-            totalCount: number;
+            /**
+             * Cursor
+             * @description Opaque cursor returned as nextCursor, takes precedence over page
+             * @default null
+             */
+            cursor: string | null;
+            /**
+             * Totalcount
+             * @default null
+             */
+            totalCount: number | null;
             /** Hasmore */
             hasMore: boolean;
+            /**
+             * Nextcursor
+             * @default null
+             */
+            nextCursor: string | null;
         };
         /** UserDetail */
         UserDetail: {
@@ -557,6 +661,11 @@ export interface components {
              * @default 0
              */
             followingCount: number;
+            /**
+             * Postscount
+             * @default 0
+             */
+            postsCount: number;
             profile: components["schemas"]["ProfileBase"];
         };
         /** ProfileBase */
@@ -640,6 +749,7 @@ export type UserCreate = components['schemas']['UserCreate'];
 export type LoginCredentials = components['schemas']['LoginCredentials'];
 export type ApiBaseModel = components['schemas']['ApiBaseModel'];
 export type HealthcheckResponse = components['schemas']['HealthcheckResponse'];
+export type DatabaseStatsResponse = components['schemas']['DatabaseStatsResponse'];
 export type PostPublic = components['schemas']['PostPublic'];
 export type PostCreate = components['schemas']['PostCreate'];
 export type PostList = components['schemas']['PostList'];
@@ -928,6 +1038,51 @@ export interface operations {
             };
         };
     };
+    healthcheck_database_stats_healthcheck_database_get: {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            /** @description OK */
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["DatabaseStatsResponse"];
+                };
+            };
+            /** @description Unprocessable Content */
+            422: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ErrorResponse"];
+                };
+            };
+            "4XX": {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ErrorResponseWithDefaultDetailsNone"];
+                };
+            };
+            "5XX": {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ErrorResponseWithDefaultDetailsNone"];
+                };
+            };
+        };
+    };
     posts_create_post_posts_post: {
         parameters: {
             query?: never;
@@ -984,6 +1139,8 @@ export interface operations {
                 page?: number;
                 /** @description Number of items per page */
                 itemsPerPage?: number;
+                /** @description Opaque cursor returned as nextCursor, takes precedence over page */
+                cursor?: string | null;
             };
             header?: never;
             path: {
@@ -1029,6 +1186,47 @@ export interface operations {
             };
         };
     };
+    posts_export_user_posts_posts_user__string_username__export_get: {
+        parameters: {
+            query?: {
+                /** @description Download the export as a gzip compressed file */
+                gzip?: boolean;
+            };
+            header?: never;
+            path: {
+                username: string;
+            };
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            /** @description Unprocessable Content */
+            422: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ErrorResponse"];
+                };
+            };
+            "4XX": {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ErrorResponseWithDefaultDetailsNone"];
+                };
+            };
+            "5XX": {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ErrorResponseWithDefaultDetailsNone"];
+                };
+            };
+        };
+    };
     posts_delete_post_posts__uuid_post_id__delete: {
         parameters: {
             query?: never;
@@ -1177,6 +1375,8 @@ export interface operations {
                 page?: number;
                 /** @description Number of items per page */
                 itemsPerPage?: number;
+                /** @description Opaque cursor returned as nextCursor, takes precedence over page */
+                cursor?: string | null;
             };
             header?: never;
             path?: never;
@@ -1366,6 +1566,8 @@ export interface operations {
                 page?: number;
                 /** @description Number of items per page */
                 itemsPerPage?: number;
+                /** @description Opaque cursor returned as nextCursor, takes precedence over page */
+                cursor?: string | null;
                 /** @description Search query */
                 q?: string;
             };
@@ -1512,6 +1714,8 @@ export interface operations {
                 page?: number;
                 /** @description Number of items per page */
                 itemsPerPage?: number;
+                /** @description Opaque cursor returned as nextCursor, takes precedence over page */
+                cursor?: string | null;
             };
             header?: never;
             path: {
@@ -1564,6 +1768,8 @@ export interface operations {
                 page?: number;
                 /** @description Number of items per page */
                 itemsPerPage?: number;
+                /** @description Opaque cursor returned as nextCursor, takes precedence over page */
+                cursor?: string | null;
             };
             header?: never;
             path: {
@@ -1609,4 +1815,86 @@ export interface operations {
             };
         };
     };
+    user_export_user_followers_route_users__string_username__followers_export_get: {
+        parameters: {
+            query?: {
+                /** @description Download the export as a gzip compressed file */
+                gzip?: boolean;
+            };
+            header?: never;
+            path: {
+                username: string;
+            };
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            /** @description Unprocessable Content */
+            422: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ErrorResponse"];
+                };
+            };
+            "4XX": {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ErrorResponseWithDefaultDetailsNone"];
+                };
+            };
+            "5XX": {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ErrorResponseWithDefaultDetailsNone"];
+                };
+            };
+        };
+    };
+    user_export_user_following_route_users__string_username__following_export_get: {
+        parameters: {
+            query?: {
+                /** @description Download the export as a gzip compressed file */
+                gzip?: boolean;
+            };
+            header?: never;
+            path: {
+                username: string;
+            };
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            /** @description Unprocessable Content */
+            422: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ErrorResponse"];
+                };
+            };
+            "4XX": {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ErrorResponseWithDefaultDetailsNone"];
+                };
+            };
+            "5XX": {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ErrorResponseWithDefaultDetailsNone"];
+                };
+            };
+        };
+    };
 }